@@ -0,0 +1,160 @@
+"""Compact numeric artifact for the compiled model.
+
+export_lean() writes the LeanPredictor (see backend/lean.py) and the SHAP
+background rows to a single uncompressed .npz. load_lean() memory-maps the
+arrays straight out of that file, so a worker can serve /predict without
+unpickling the sklearn/xgboost/catboost objects or even importing them.
+
+CLI usage:
+    python -m backend.artifacts export            # writes models/lean_model.npz
+    python -m backend.artifacts info
+"""
+import argparse
+import json
+import sys
+import zipfile
+
+import numpy as np
+
+from backend import lean
+
+FORMAT_VERSION = 2
+SPEC_KEY = "__spec__"
+
+NODE_TYPES = {
+    cls.__name__: cls
+    for cls in (
+        lean.LinearNode, lean.FlatTrees, lean.TreeEnsembleNode, lean.XGBNode, lean.CatBoostNode, lean.MLPNode,
+        lean.KNNNode, lean.SVRNode, lean.StackingNode, lean.LeanPredictor,
+    )
+}
+
+
+def _encode(value, arrays, path):
+    """JSON-able spec for value, moving every numpy array into arrays."""
+    if isinstance(value, (np.ndarray, np.generic)):
+        arrays[path] = np.asarray(value)
+        return {"__array__": path}
+    if type(value).__name__ in NODE_TYPES:
+        state = {
+            key: _encode(item, arrays, f"{path}.{key}")
+            for key, item in vars(value).items()
+            # The sklearn estimator is what this format exists to avoid
+            if key != "estimator"
+        }
+        return {"__node__": type(value).__name__, "state": state}
+    if isinstance(value, lean.SklearnNode):
+        raise lean.UnsupportedModel(f"{type(value.estimator).__name__} has no compiled form to export")
+    if isinstance(value, (list, tuple)):
+        return [_encode(item, arrays, f"{path}.{i}") for i, item in enumerate(value)]
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    raise TypeError(f"Cannot export {type(value).__name__} at {path}")
+
+
+def _decode(spec, arrays):
+    if isinstance(spec, dict) and "__array__" in spec:
+        array = arrays[spec["__array__"]]
+        return array[()] if array.ndim == 0 else array
+    if isinstance(spec, dict) and "__node__" in spec:
+        obj = NODE_TYPES[spec["__node__"]].__new__(NODE_TYPES[spec["__node__"]])
+        vars(obj).update({key: _decode(item, arrays) for key, item in spec["state"].items()})
+        if isinstance(obj, lean.LeanPredictor):
+            obj.estimator = None
+        return obj
+    if isinstance(spec, list):
+        return [_decode(item, arrays) for item in spec]
+    return spec
+
+
+def export_lean(predictor, path, background=None, source_version=None):
+    """Write predictor (+ optional background rows) to an uncompressed .npz."""
+    arrays = {}
+    spec = {
+        "format_version": FORMAT_VERSION,
+        "source_version": source_version,
+        "predictor": _encode(predictor, arrays, "p"),
+        "background": None if background is None else _encode(np.asarray(background, dtype=np.float64), arrays, "background"),
+    }
+    arrays[SPEC_KEY] = np.frombuffer(json.dumps(spec).encode("utf-8"), dtype=np.uint8)
+    # Uncompressed, so load_lean() can map the members in place
+    np.savez(path, **arrays)
+
+
+def export_pickles(model_path, scaler_path, background_path, path, version=None):
+    """Compile a pickled model/scaler pair and export it; raises if it can't be compiled."""
+    from backend import inference
+
+    model, scaler = inference.load_sklearn_artifacts(model_path, scaler_path)
+    background = inference.load_background(background_path)
+    predictor = inference.build_predictor(model, scaler, background, strict=True)
+    version = version or inference.artifact_version(model_path, scaler_path)
+    export_lean(predictor, path, background=background, source_version=version)
+    return type(model).__name__, version
+
+
+def _mmap_npz(path):
+    """Memory-map every member of an uncompressed .npz without copying."""
+    arrays = {}
+    with zipfile.ZipFile(path) as zf, open(path, "rb") as raw:
+        for info in zf.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{path} member {info.filename} is compressed; re-export it")
+            # Local file header: 30 fixed bytes + name + extra field
+            raw.seek(info.header_offset + 26)
+            name_len, extra_len = np.frombuffer(raw.read(4), dtype="<u2")
+            raw.seek(info.header_offset + 30 + int(name_len) + int(extra_len))
+            version = np.lib.format.read_magic(raw)
+            read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+            shape, fortran, dtype = read_header(raw)
+            offset = raw.tell()
+            key = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if int(np.prod(shape)) == 0:
+                arrays[key] = np.empty(shape, dtype=dtype)
+            else:
+                # Plain ndarray view over the mapping, so results of arithmetic aren't memmaps
+                arrays[key] = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape,
+                                        order="F" if fortran else "C").view(np.ndarray)
+    return arrays
+
+
+def load_lean(path, mmap=True):
+    """Load (predictor, background, spec metadata) from an exported .npz."""
+    if mmap:
+        arrays = _mmap_npz(path)
+    else:
+        with np.load(path) as data:
+            arrays = {key: data[key] for key in data.files}
+    spec = json.loads(bytes(arrays.pop(SPEC_KEY)).decode("utf-8"))
+    if spec.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported lean artifact format {spec.get('format_version')}")
+    predictor = _decode(spec["predictor"], arrays)
+    background = None if spec["background"] is None else _decode(spec["background"], arrays)
+    return predictor, background, {"source_version": spec.get("source_version")}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export/inspect the compiled model artifact.")
+    parser.add_argument("command", choices=["export", "info"])
+    parser.add_argument("--output", help="Artifact path (default: backend/models/lean_model.npz)")
+    args = parser.parse_args(argv)
+
+    from backend import inference
+
+    path = args.output or inference.LEAN_ARTIFACT_PATH
+    if args.command == "export":
+        name, version = export_pickles(inference.MODEL_PATH, inference.SCALER_PATH, inference.BACKGROUND_PATH, path)
+        print(f"Exported {name} (version {version}) -> {path}", file=sys.stderr)
+    else:
+        predictor, background, meta = load_lean(path)
+        print(json.dumps({
+            "path": str(path),
+            "source_version": meta["source_version"],
+            "current_version": inference.BUNDLED_VERSION,
+            "root": type(predictor.root).__name__,
+            "background_rows": None if background is None else len(background),
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import asyncio
+import os
+
+import numpy as np
+
+# Opt-in: coalesce concurrent single-row /predict calls into one model call
+MICROBATCH_ENABLED = os.getenv("PREDICT_MICROBATCH", "0") == "1"
+BATCH_WINDOW_MS = float(os.getenv("PREDICT_BATCH_WINDOW_MS", "2"))
+MAX_BATCH_SIZE = int(os.getenv("PREDICT_MAX_BATCH", "64"))
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class MicroBatcher:
+    """Gathers rows that arrive within a short window and scores them together.
+
+    The first queued row opens a window of window_ms; the batch is flushed
+    when the window closes or max_batch rows have arrived, whichever comes
+    first. predict_fn runs in a worker thread so the event loop keeps
+    accepting requests meanwhile.
+    """
+
+    def __init__(self, predict_fn, window_ms=BATCH_WINDOW_MS, max_batch=MAX_BATCH_SIZE):
+        self.predict_fn = predict_fn
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue = None
+        self._worker = None
+        self.batches = 0
+        self.rows = 0
+        self.histogram = {bound: 0 for bound in BATCH_SIZE_BUCKETS}
+        self.histogram["+Inf"] = 0
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, row):
+        """Queue one feature row and wait for its prediction."""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            # Requests that gave up while queued don't need an answer
+            batch = [(row, future) for row, future in batch if not future.done()]
+            if not batch:
+                continue
+            self._record(len(batch))
+
+            try:
+                features = np.vstack([row for row, _ in batch])
+                results = await loop.run_in_executor(None, self.predict_fn, features)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def _record(self, size):
+        self.batches += 1
+        self.rows += size
+        for bound in BATCH_SIZE_BUCKETS:
+            if size <= bound:
+                self.histogram[bound] += 1
+                break
+        else:
+            self.histogram["+Inf"] += 1
+
+    async def stop(self):
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+
+    def stats(self):
+        return {
+            "enabled": True,
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": round(self.rows / self.batches, 2) if self.batches else 0.0,
+            "batch_size_histogram": {str(k): v for k, v in self.histogram.items()},
+        }
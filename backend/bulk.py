@@ -0,0 +1,188 @@
+"""Chunked bulk scoring for CSV/Parquet files in the admission_data.csv schema.
+
+Rows are read, scored and written one chunk at a time, so memory stays
+bounded by the chunk size rather than the file size.
+
+CLI usage:
+    python -m backend.bulk applicants.csv -o scored.csv --chunk-size 50000
+"""
+import argparse
+import io
+import sys
+
+import numpy as np
+
+from backend import inference
+from backend.inference import FEATURE_FIELDS, predict_probabilities
+
+DEFAULT_CHUNK_SIZE = 50_000
+OUTPUT_COLUMN = "probability"
+# Why a row was left unscored; empty for scored rows
+ERROR_COLUMN = "error"
+
+# Inclusive range of each model input, as the frontend accepts them
+FEATURE_RANGES = {
+    "gre_score": (260, 340),
+    "toefl_score": (0, 120),
+    "university_rating": (1, 5),
+    "sop": (1, 5),
+    "lor": (1, 5),
+    "cgpa": (0, 10),
+    "research": (0, 1),
+}
+
+# Accepted header spellings (after strip + lower) for each model input;
+# the dataset's own headers carry trailing spaces, e.g. "LOR "
+COLUMN_ALIASES = {
+    "gre score": "gre_score",
+    "toefl score": "toefl_score",
+    "university rating": "university_rating",
+    "sop": "sop",
+    "lor": "lor",
+    "cgpa": "cgpa",
+    "research": "research",
+}
+COLUMN_ALIASES.update({field: field for field in FEATURE_FIELDS})
+
+
+def resolve_columns(columns):
+    """Map each model input to the matching column name in the file."""
+    found = {}
+    for col in columns:
+        field = COLUMN_ALIASES.get(str(col).strip().lower())
+        if field and field not in found:
+            found[field] = col
+    missing = [field for field in FEATURE_FIELDS if field not in found]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+    return [found[field] for field in FEATURE_FIELDS]
+
+
+def detect_format(name, explicit=None):
+    if explicit:
+        return explicit.lower()
+    return "parquet" if str(name).lower().endswith((".parquet", ".pq")) else "csv"
+
+
+def iter_chunks(source, fmt="csv", chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield DataFrames of at most chunk_size rows from a path or file object."""
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(source)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    elif fmt == "csv":
+        import pandas as pd
+
+        yield from pd.read_csv(source, chunksize=chunk_size)
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+
+def check_rows(frame):
+    """(features, errors) for the model input columns of frame, in FEATURE_FIELDS order.
+
+    Cells are coerced to numbers; errors[i] says why row i can't be
+    scored (a missing/non-numeric cell or a value out of range) and is ""
+    for rows that can.
+    """
+    import pandas as pd
+
+    features = frame.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+    low, high = np.array([FEATURE_RANGES[field] for field in FEATURE_FIELDS], dtype=np.float64).T
+    missing = ~np.isfinite(features)
+    out_of_range = ~missing & ((features < low) | (features > high))
+    errors = np.full(len(features), "", dtype=object)
+    for i in np.flatnonzero((missing | out_of_range).any(axis=1)):
+        errors[i] = "; ".join(
+            f"{field} is missing or not a number" if missing[i, j]
+            else f"{field} must be between {FEATURE_RANGES[field][0]} and {FEATURE_RANGES[field][1]}"
+            for j, field in enumerate(FEATURE_FIELDS) if missing[i, j] or out_of_range[i, j]
+        )
+    return features, errors
+
+
+def score_chunks(chunks, model=None):
+    """Append the probability and error columns to every chunk.
+
+    Invalid rows are kept, with an empty probability and the reason in
+    the error column, rather than failing the file part-way through. The
+    whole file is scored by one model version, even if another is
+    activated part-way through.
+    """
+    model = model or inference.current()
+    feature_cols = None
+    for chunk in chunks:
+        if feature_cols is None:
+            feature_cols = resolve_columns(chunk.columns)
+        features, errors = check_rows(chunk[feature_cols])
+        valid = errors == ""
+        probabilities = np.full(len(chunk), np.nan)
+        if valid.any():
+            probabilities[valid] = predict_probabilities(features[valid], model)
+        chunk[OUTPUT_COLUMN] = probabilities
+        chunk[ERROR_COLUMN] = errors
+        yield chunk
+
+
+def iter_csv_bytes(scored_chunks):
+    """Encode scored chunks as CSV, writing the header only once."""
+    header = True
+    for chunk in scored_chunks:
+        buf = io.StringIO()
+        chunk.to_csv(buf, index=False, header=header)
+        header = False
+        yield buf.getvalue().encode("utf-8")
+
+
+def score_file(input_path, output_path, fmt=None, out_fmt=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Score input_path into output_path chunk by chunk; returns the row count."""
+    fmt = detect_format(input_path, fmt)
+    out_fmt = detect_format(output_path, out_fmt)
+    rows = 0
+    scored = score_chunks(iter_chunks(input_path, fmt, chunk_size))
+
+    if out_fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for chunk in scored:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, table.schema)
+                writer.write_table(table)
+                rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        with open(output_path, "w", newline="") as f:
+            for chunk in scored:
+                chunk.to_csv(f, index=False, header=rows == 0)
+                rows += len(chunk)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-score applicant files with the admission model.")
+    parser.add_argument("input", help="CSV or Parquet file in the admission_data.csv schema")
+    parser.add_argument("-o", "--output", help="Output file (.csv or .parquet); defaults to stdout as CSV")
+    parser.add_argument("--format", choices=["csv", "parquet"], help="Input format (default: by extension)")
+    parser.add_argument("--output-format", choices=["csv", "parquet"], help="Output format (default: by extension)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per chunk")
+    args = parser.parse_args(argv)
+
+    if args.output:
+        rows = score_file(args.input, args.output, args.format, args.output_format, args.chunk_size)
+        print(f"Scored {rows} rows -> {args.output}", file=sys.stderr)
+    else:
+        fmt = detect_format(args.input, args.format)
+        for data in iter_csv_bytes(score_chunks(iter_chunks(args.input, fmt, args.chunk_size))):
+            sys.stdout.buffer.write(data)
+
+
+if __name__ == "__main__":
+    main()
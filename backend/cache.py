@@ -0,0 +1,215 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from cachetools import LRUCache, TTLCache
+
+
+def content_key(text, version):
+    """Content address for a text under a given prompt/model version."""
+    normalized = " ".join(text.split())
+    return hashlib.sha256(f"{version}\0{normalized}".encode("utf-8")).hexdigest()
+
+
+class SQLiteStore:
+    """Tiny key -> JSON store so cached results survive restarts."""
+
+    def __init__(self, path, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time()),
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class _Inflight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class ResultCache:
+    """In-memory LRU+TTL cache with an optional SQLite layer underneath.
+
+    get_or_compute() also coalesces concurrent misses for the same key, so
+    a burst of identical requests makes a single upstream call. That call
+    runs in its own task: a caller that goes away (a client disconnect)
+    leaves it running for the others, and it is only cancelled once every
+    caller waiting on it has gone.
+    """
+
+    def __init__(self, maxsize=1024, ttl=7 * 24 * 3600, db_path=None):
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.store = SQLiteStore(db_path, ttl) if db_path else None
+        self._inflight = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        if self.store is not None:
+            value = self.store.get(key)
+            if value is not None:
+                self.disk_hits += 1
+                self.memory[key] = value
+                return value
+        return None
+
+    def set(self, key, value):
+        self.memory[key] = value
+        if self.store is not None:
+            self.store.set(key, value)
+
+    async def get_or_compute(self, key, compute, cacheable=lambda value: True):
+        """Return the cached value or await compute(); only cacheable results are stored."""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        entry = self._inflight.get(key)
+        if entry is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            entry = self._inflight[key] = _Inflight(asyncio.ensure_future(self._compute(key, compute, cacheable)))
+            entry.task.add_done_callback(lambda task: self._forget(key, entry))
+
+        entry.waiters += 1
+        try:
+            return await asyncio.shield(entry.task)
+        finally:
+            entry.waiters -= 1
+            if entry.waiters == 0 and not entry.task.done():
+                # The last caller is gone; later callers start afresh
+                self._forget(key, entry)
+                entry.task.cancel()
+
+    async def _compute(self, key, compute, cacheable):
+        value = await compute()
+        if cacheable(value):
+            self.set(key, value)
+        return value
+
+    def _forget(self, key, entry):
+        if self._inflight.get(key) is entry:
+            del self._inflight[key]
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses + self.coalesced
+        return {
+            "size": len(self.memory),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round((lookups - self.misses) / lookups, 4) if lookups else 0.0,
+            "persistent": self.store is not None,
+        }
+
+
+def quantize(values, decimals):
+    """Round each value to its precision; None if that would change any value.
+
+    Inputs already on the UI's grid (integer scores, 0.1 slider steps) map
+    to a hashable key, anything finer bypasses the cache so results stay exact.
+    """
+    key = tuple(round(float(v), d) for v, d in zip(values, decimals))
+    if any(abs(k - float(v)) > 1e-9 for k, v in zip(key, values)):
+        return None
+    return key
+
+
+class ProfileCache:
+    """Bounded LRU of per-profile results, tied to one model version.
+
+    Entries are namespaced by kind ("predict", "explain"). The cache takes
+    the version of its first user and keeps it until clear() is called on
+    activation of a new model; requests still holding another version just
+    miss, so they can't flush results for the active one.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.entries = LRUCache(maxsize=maxsize) if maxsize > 0 else None
+        self.version = None
+        self.counts = {}
+        self.invalidations = 0
+        # Sync routes hit this from several threadpool workers at once
+        self._lock = threading.Lock()
+
+    def _matches(self, version):
+        if self.version is None:
+            self.version = version
+        return version == self.version
+
+    def get(self, kind, key, version):
+        if self.entries is None or key is None:
+            return None
+        with self._lock:
+            value = self.entries.get((kind, key)) if self._matches(version) else None
+            counts = self.counts.setdefault(kind, {"hits": 0, "misses": 0})
+            counts["hits" if value is not None else "misses"] += 1
+        return value
+
+    def set(self, kind, key, version, value):
+        if self.entries is None or key is None:
+            return
+        with self._lock:
+            # A result computed by a model swapped out mid-request is dropped
+            if self._matches(version):
+                self.entries[(kind, key)] = value
+
+    def clear(self, version=None):
+        """Drop every entry, e.g. when a new model version is activated."""
+        if self.entries is None:
+            return
+        with self._lock:
+            self.entries.clear()
+            if self.version is not None:
+                self.invalidations += 1
+            self.version = version
+
+    def stats(self):
+        out = {
+            "enabled": self.entries is not None,
+            "size": len(self.entries) if self.entries is not None else 0,
+            "maxsize": self.maxsize,
+            "model_version": self.version,
+            "invalidations": self.invalidations,
+        }
+        for kind, counts in self.counts.items():
+            lookups = counts["hits"] + counts["misses"]
+            out[kind] = dict(counts, hit_ratio=round(counts["hits"] / lookups, 4) if lookups else 0.0)
+        return out
@@ -0,0 +1,166 @@
+"""Content negotiation and compression for prediction and explanation responses.
+
+The body format follows the Accept header:
+
+    application/json                      default; encoded with orjson when installed
+    application/msgpack                   MessagePack (needs msgpack)
+    application/vnd.apache.arrow.stream   Arrow IPC stream, one row per profile (needs pyarrow)
+
+and bodies of at least COMPRESS_MIN_BYTES are compressed with the best
+coding the client lists in Accept-Encoding: zstd (needs zstandard) or gzip.
+Formats whose package is missing are simply not offered; a client that
+accepts nothing available gets 406.
+
+Responses for large batches are encoded and compressed on the CPU pool so
+a 100k-row body doesn't hold up the event loop.
+"""
+import gzip
+import importlib.util
+import io
+import json
+import os
+
+import numpy as np
+from fastapi import HTTPException
+from fastapi.responses import Response
+
+from backend.executor import cpu_pool, Overloaded
+from backend.metrics import stage
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+ALIASES = {"application/x-msgpack": MSGPACK, "application/vnd.msgpack": MSGPACK}
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+# Level 1 compresses these float-heavy bodies nearly as well as 6, several times faster
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "1"))
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", "3"))
+# Responses with at least this many rows are encoded on the CPU pool
+OFFLOAD_ROWS = 1000
+
+HAS_ORJSON = importlib.util.find_spec("orjson") is not None
+HAS_MSGPACK = importlib.util.find_spec("msgpack") is not None
+HAS_ARROW = importlib.util.find_spec("pyarrow") is not None
+HAS_ZSTD = importlib.util.find_spec("zstandard") is not None
+
+
+def parse_accept(header):
+    """Values of an Accept / Accept-Encoding header, highest q first, q=0 dropped."""
+    items = []
+    for i, part in enumerate(header.split(",")):
+        value, *params = part.split(";")
+        value = value.strip().lower()
+        q = 1.0
+        for param in params:
+            name, _, number = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(number)
+                except ValueError:
+                    q = 0.0
+        if value and q > 0:
+            items.append((-q, i, value))
+    return [value for _, _, value in sorted(items)]
+
+
+def choose_format(accept, tabular=True):
+    """Media type to answer with, or None when nothing acceptable is available."""
+    if not accept:
+        return JSON
+    for value in parse_accept(accept):
+        value = ALIASES.get(value, value)
+        if value in (JSON, "*/*", "application/*"):
+            return JSON
+        if value == MSGPACK and HAS_MSGPACK:
+            return MSGPACK
+        if value == ARROW and HAS_ARROW and tabular:
+            return ARROW
+    return None
+
+
+def choose_coding(accept_encoding):
+    """'zstd', 'gzip' or None, in the client's order of preference."""
+    if not accept_encoding:
+        return None
+    for value in parse_accept(accept_encoding):
+        if value == "zstd" and HAS_ZSTD:
+            return "zstd"
+        if value == "gzip":
+            return "gzip"
+        if value == "*":
+            return "zstd" if HAS_ZSTD else "gzip"
+    return None
+
+
+def _plain(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+def encode(payload, media_type, columns=None):
+    """Body bytes for payload; Arrow bodies are built from columns()."""
+    if media_type == JSON:
+        if HAS_ORJSON:
+            import orjson
+
+            return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY, default=_plain)
+        return json.dumps(payload, default=_plain, separators=(",", ":")).encode("utf-8")
+    if media_type == MSGPACK:
+        import msgpack
+
+        return msgpack.packb(payload, default=_plain, use_bin_type=True)
+    if media_type == ARROW:
+        import pyarrow as pa
+
+        table = pa.table(columns())
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue()
+    raise ValueError(f"Unsupported media type: {media_type}")
+
+
+def compress(body, coding):
+    if coding == "zstd":
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    if coding == "gzip":
+        return gzip.compress(body, GZIP_LEVEL)
+    return body
+
+
+def render(accept, accept_encoding, payload, columns=None, headers=None):
+    """The negotiated Response; raises 406 if no acceptable format is available."""
+    media_type = choose_format(accept, tabular=columns is not None)
+    if media_type is None:
+        raise HTTPException(status_code=406, detail=f"Can serve {JSON}, {MSGPACK} or {ARROW}")
+    with stage("response_encode"):
+        body = encode(payload, media_type, columns)
+    headers = {**(headers or {}), "Vary": "Accept, Accept-Encoding"}
+    coding = choose_coding(accept_encoding) if len(body) >= COMPRESS_MIN_BYTES else None
+    if coding is not None:
+        with stage("response_compress"):
+            body = compress(body, coding)
+        headers["Content-Encoding"] = coding
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+async def negotiate(request, payload, columns=None, headers=None, rows=1):
+    """render() for an async handler; large responses are built on the CPU pool.
+
+    columns is a callable returning {name: values} for Arrow, or None if
+    the payload has no table form.
+    """
+    args = (request.headers.get("accept"), request.headers.get("accept-encoding"), payload, columns, headers)
+    if rows >= OFFLOAD_ROWS:
+        try:
+            return await cpu_pool.run(render, *args)
+        except Overloaded:
+            # The result is already computed; encoding it here beats throwing it away
+            pass
+    return render(*args)
@@ -0,0 +1,155 @@
+"""Bounded thread pool for CPU-heavy request work.
+
+Explanations, what-if grids, large batches, bulk files and ingestion run
+here instead of in Starlette's shared threadpool, so a burst of them
+queues behind CPU_POOL_WORKERS threads rather than occupying every thread
+that /predict and the cheap routes need. At most CPU_POOL_QUEUE jobs wait
+for a thread; past that, submit() fails fast with Overloaded and the API
+answers 503 with Retry-After instead of letting latency grow without bound.
+Work the API has already committed to, like the rest of a streamed
+response, uses run_waiting() instead: it waits for a slot, and gets freed
+slots before new requests do.
+
+Threads rather than processes: the model, scaler and SHAP explainer live
+in each worker process already, and NumPy/SHAP release the GIL for most
+of their time.
+"""
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+CPU_WORKERS = int(os.getenv("CPU_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Jobs allowed to wait for a free thread before new ones are rejected
+CPU_QUEUE_LIMIT = int(os.getenv("CPU_POOL_QUEUE", "32"))
+# Retry-After sent with 503s when the pool is full
+RETRY_AFTER_SECONDS = int(os.getenv("CPU_POOL_RETRY_AFTER", "1"))
+
+
+class Overloaded(Exception):
+    """The pool is running and queueing as many jobs as it allows."""
+
+    def __init__(self, pool, retry_after=RETRY_AFTER_SECONDS):
+        super().__init__(f"The {pool} pool is busy; retry in {retry_after}s")
+        self.pool = pool
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """ThreadPoolExecutor that rejects work once workers + max_queue jobs are pending."""
+
+    def __init__(self, name, workers=CPU_WORKERS, max_queue=CPU_QUEUE_LIMIT):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix=f"{name}-pool")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        # (loop, future) of run_waiting() calls waiting for a slot
+        self._waiters = deque()
+        self.completed = 0
+        self.rejected = 0
+
+    def _enter(self):
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue or self._waiters:
+                self.rejected += 1
+                raise Overloaded(self.name)
+            self._pending += 1
+
+    async def _enter_waiting(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._pending < self.workers + self.max_queue and not self._waiters:
+                self._pending += 1
+                return
+            waiter = loop.create_future()
+            self._waiters.append((loop, waiter))
+        try:
+            # _release() hands its slot straight to the first waiter
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            else:
+                with self._lock:
+                    if (loop, waiter) in self._waiters:
+                        self._waiters.remove((loop, waiter))
+            raise
+
+    def _release(self):
+        with self._lock:
+            while self._waiters:
+                loop, waiter = self._waiters.popleft()
+                try:
+                    loop.call_soon_threadsafe(self._hand_over, waiter)
+                except RuntimeError:
+                    # Its loop is closed
+                    continue
+                return
+            self._pending -= 1
+
+    def _hand_over(self, waiter):
+        if waiter.done():
+            # Cancelled while the slot was on its way; pass it on
+            self._release()
+        else:
+            waiter.set_result(None)
+
+    def _call(self, fn):
+        with self._lock:
+            self._running += 1
+        try:
+            return fn()
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def _done(self, future):
+        with self._lock:
+            self.completed += 1
+        self._release()
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on the pool with the caller's contextvars.
+
+        Raises Overloaded without queueing when the pool is full. A job that
+        hasn't started is dropped if the awaiting request is cancelled.
+        """
+        self._enter()
+        return await self._submit(fn, args, kwargs)
+
+    async def run_waiting(self, fn, *args, **kwargs):
+        """run(), but waits for a slot instead of raising Overloaded."""
+        await self._enter_waiting()
+        return await self._submit(fn, args, kwargs)
+
+    async def _submit(self, fn, args, kwargs):
+        ctx = contextvars.copy_context()
+        try:
+            future = self._pool.submit(self._call, functools.partial(ctx.run, fn, *args, **kwargs))
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._done)
+        return await asyncio.wrap_future(future)
+
+    def stats(self):
+        with self._lock:
+            running, pending, waiting = self._running, self._pending, len(self._waiters)
+        return {
+            "workers": self.workers,
+            "running": running,
+            "queued": pending - running,
+            "waiting": waiting,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+cpu_pool = BoundedExecutor("cpu")
@@ -0,0 +1,116 @@
+import os
+import threading
+from math import factorial
+
+import numpy as np
+
+from backend import inference
+from backend.metrics import stage
+
+# k-means centres X_train.pkl is summarized to for non-linear models; each
+# explained row costs 2^n_features model rows per centre
+BACKGROUND_SIZE = int(os.getenv("SHAP_BACKGROUND_SIZE", "4"))
+
+
+def is_linear(estimator):
+    """True when predict() is coef_ . x + intercept_ with a single output."""
+    coef = getattr(estimator, "coef_", None)
+    return (
+        coef is not None
+        and np.ndim(coef) == 1
+        and hasattr(estimator, "intercept_")
+        and np.ndim(estimator.intercept_) == 0
+    )
+
+
+def summarize(background, k, iterations=50, seed=0):
+    """(centres, weights): k-means of the background rows, weighted by cluster size."""
+    rng = np.random.RandomState(seed)
+    k = min(k, len(background))
+    # k-means++ seeding, so the summary is deterministic and spread out
+    centres = background[[rng.randint(len(background))]]
+    for _ in range(1, k):
+        dist = ((background[:, None, :] - centres[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+        centres = np.vstack([centres, background[rng.choice(len(background), p=dist / dist.sum())]])
+    for _ in range(iterations):
+        label = ((background[:, None, :] - centres[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+        moved = np.array([background[label == j].mean(axis=0) if (label == j).any() else centres[j] for j in range(k)])
+        if np.allclose(moved, centres):
+            break
+        centres = moved
+    return centres, np.bincount(label, minlength=k) / len(background)
+
+
+def shapley_matrix(n_features):
+    """(coalition masks, W) such that W @ f(coalitions) gives exact Shapley values.
+
+    Row j of masks says which features coalition j takes from the explained
+    row (the rest come from a background row).
+    """
+    masks = ((np.arange(2 ** n_features)[:, None] >> np.arange(n_features)) & 1).astype(bool)
+    sizes = masks.sum(axis=1)
+    weights = np.zeros((n_features, 2 ** n_features))
+    for i in range(n_features):
+        without = np.nonzero(~masks[:, i])[0]
+        w = np.array([factorial(s) * factorial(n_features - s - 1) for s in sizes[without]]) / factorial(n_features)
+        weights[i, without] -= w
+        weights[i, without | (1 << i)] += w
+    return masks, weights
+
+
+class AdmissionExplainer:
+    """SHAP attributions for scaled feature rows, built once per model.
+
+    Linear models use the closed form coef * (x - background mean), which is
+    exactly what SHAP's linear explainer computes under an independent
+    masker. Anything else gets exact interventional SHAP values, the ones
+    shap's ExactExplainer computes with an Independent masker, against a
+    k-means summary of the training data: all 2^7 coalitions per centre in
+    one predict() call.
+    """
+
+    def __init__(self, estimator, background):
+        self.estimator = estimator
+        self.background = np.asarray(background, dtype=np.float64)
+        self.linear = is_linear(estimator)
+
+        if self.linear:
+            self.coef = np.asarray(estimator.coef_, dtype=np.float64)
+            self.background_mean = self.background.mean(axis=0)
+            self.base_value = float(estimator.intercept_ + self.coef @ self.background_mean)
+        else:
+            self.centres, self.weights = summarize(self.background, BACKGROUND_SIZE)
+            self.masks, self.shapley = shapley_matrix(self.background.shape[1])
+            # Coalition 0 takes every feature from the background
+            self.base_value = float(self.weights @ estimator.predict(self.centres))
+
+    def explain(self, scaled_features):
+        """Return (contributions, base_values), one row per input row."""
+        scaled_features = np.asarray(scaled_features, dtype=np.float64)
+        with stage("shap_explain"):
+            if self.linear:
+                contributions = (scaled_features - self.background_mean) * self.coef
+                return contributions, np.full(len(scaled_features), self.base_value)
+
+            rows, n_features = scaled_features.shape
+            # (rows, centres, coalitions, features) mixes of each row and each centre
+            mixed = np.where(self.masks[None, None], scaled_features[:, None, None, :], self.centres[None, :, None, :])
+            values = np.asarray(self.estimator.predict(mixed.reshape(-1, n_features)), dtype=np.float64)
+            coalitions = np.tensordot(values.reshape(rows, len(self.centres), -1), self.weights, axes=([1], [0]))
+            return coalitions @ self.shapley.T, np.full(rows, self.base_value)
+
+
+_explainer_lock = threading.Lock()
+
+
+def get_explainer(model=None):
+    """The explainer for model (default: the active one), built on first use.
+
+    Building it lazily keeps the k-means summary off the startup path.
+    """
+    model = model or inference.current()
+    if model.explainer is None:
+        with _explainer_lock:
+            if model.explainer is None:
+                model.explainer = AdmissionExplainer(model.predictor.scaled_model, model.background)
+    return model.explainer
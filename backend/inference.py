@@ -0,0 +1,216 @@
+import functools
+import hashlib
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+from pathlib import Path
+
+from backend.lean import compile_model, check_parity, UnsupportedModel
+from backend.metrics import stage
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent
+MODEL_PATH = BASE_DIR / "models" / "admission_model.pkl"
+SCALER_PATH = BASE_DIR / "models" / "scaler.pkl"
+BACKGROUND_PATH = BASE_DIR / "models" / "X_train.pkl"
+# Compiled model + background written by `python -m backend.artifacts export`
+LEAN_ARTIFACT_PATH = BASE_DIR / "models" / "lean_model.npz"
+
+# Model input order; matches the columns of data/admission_data.csv
+FEATURE_FIELDS = ["gre_score", "toefl_score", "university_rating", "sop", "lor", "cgpa", "research"]
+FEATURE_NAMES = ["GRE", "TOEFL", "University", "SOP", "LOR", "CGPA", "Research"]
+# Decimal places each field is entered with in the UI (sliders step by 0.1)
+FEATURE_DECIMALS = [0, 0, 0, 1, 1, 1, 0]
+
+# Set LEAN_INFERENCE=0 to always go through sklearn
+LEAN_INFERENCE = os.getenv("LEAN_INFERENCE", "1") != "0"
+# Above this many rows sklearn's compiled loops beat the numpy node tables
+LEAN_MAX_ROWS = int(os.getenv("LEAN_MAX_ROWS", "96"))
+
+
+class SklearnPredictor:
+    """The pickled scaler + model behind the same interface as LeanPredictor."""
+
+    def __init__(self, model, scaler):
+        self.model = model
+        self.scaler = scaler
+        self.scaled_model = model
+
+    def transform(self, X):
+        return self.scaler.transform(X)
+
+    def predict_scaled(self, X_scaled):
+        return self.model.predict(X_scaled)
+
+    def predict(self, X):
+        return self.model.predict(self.scaler.transform(X))
+
+
+class LazyEstimator:
+    """Stands in for a pickled model; unpickles it on first predict()."""
+
+    def __init__(self, model_path=MODEL_PATH, scaler_path=SCALER_PATH):
+        self.model_path = model_path
+        self.scaler_path = scaler_path
+
+    def predict(self, X):
+        model, _ = load_sklearn_artifacts(self.model_path, self.scaler_path)
+        return model.predict(X)
+
+
+class LoadedModel:
+    """One servable model version: predictor, SHAP background and explainer.
+
+    Requests take a reference to the active LoadedModel once and use it
+    throughout, so a swap never mixes two versions within one response.
+    """
+
+    def __init__(self, version, predictor, background, source):
+        self.version = version
+        self.predictor = predictor
+        self.background = background
+        self.source = source
+        # Built on first use by backend.explain.get_explainer
+        self.explainer = None
+        self.loaded_at = time.time()
+
+    def info(self):
+        return {
+            "version": self.version,
+            "source": self.source,
+            "predictor": type(self.predictor).__name__,
+            "loaded_at": round(self.loaded_at, 3),
+        }
+
+
+# Small bound so models retired by a hot-swap can be freed
+@functools.lru_cache(maxsize=4)
+def load_sklearn_artifacts(model_path=MODEL_PATH, scaler_path=SCALER_PATH):
+    """Unpickle (model, scaler); this is what pulls in sklearn/xgboost/catboost."""
+    import joblib
+
+    return joblib.load(model_path), joblib.load(scaler_path)
+
+
+def load_background(path=BACKGROUND_PATH):
+    """Scaled training rows shipped alongside the model."""
+    import joblib
+
+    return joblib.load(path)
+
+
+def build_predictor(model, scaler, background=None, strict=False):
+    """Compile the model to numpy when possible, checking it against sklearn.
+
+    background is a matrix of scaled rows (e.g. X_train.pkl) used for the
+    parity check; any mismatch falls back to the sklearn pipeline unless
+    strict is set, in which case it raises.
+    """
+    if not LEAN_INFERENCE and not strict:
+        return SklearnPredictor(model, scaler)
+    try:
+        lean = compile_model(model, scaler, strict=strict, max_rows=LEAN_MAX_ROWS)
+        if background is not None:
+            raw = np.asarray(background, dtype=np.float64) * lean.scale + lean.mean
+            # Check in batches of at most max_rows so the compiled path is what gets tested
+            for start in range(0, len(raw), LEAN_MAX_ROWS):
+                check_parity(lean, model, scaler, raw[start:start + LEAN_MAX_ROWS])
+        if not lean.compiled:
+            logger.info("Lean predictor uses sklearn for part of %s", type(model).__name__)
+        return lean
+    except (UnsupportedModel, AssertionError) as e:
+        if strict:
+            raise
+        logger.warning("Falling back to sklearn inference: %s", e)
+        return SklearnPredictor(model, scaler)
+
+
+def artifact_version(*paths):
+    """Short content hash of the model artifacts, used to key caches."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def load_model(model_path=MODEL_PATH, scaler_path=SCALER_PATH, background_path=BACKGROUND_PATH,
+               lean_path=LEAN_ARTIFACT_PATH, version=None):
+    """Load one model version, preferring its memory-mapped lean artifact.
+
+    The artifact is only used when it was exported from these exact
+    pickles; otherwise the pickles are loaded and compiled in-process.
+    """
+    version = version or artifact_version(model_path, scaler_path)
+    if LEAN_INFERENCE and lean_path is not None and Path(lean_path).exists():
+        from backend.artifacts import load_lean
+
+        try:
+            lean, lean_background, meta = load_lean(lean_path)
+            if meta["source_version"] == version:
+                # Large batches still go to sklearn, loaded only if one arrives
+                lean.estimator = LazyEstimator(model_path, scaler_path)
+                lean.max_rows = LEAN_MAX_ROWS
+                return LoadedModel(version, lean, lean_background, str(lean_path))
+            logger.warning("%s is stale (built from %s, model is %s); re-run `python -m backend.artifacts export`",
+                           Path(lean_path).name, meta["source_version"], version)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Could not load %s: %s", Path(lean_path).name, e)
+
+    model, scaler = load_sklearn_artifacts(model_path, scaler_path)
+    background = load_background(background_path)
+    return LoadedModel(version, build_predictor(model, scaler, background), background, str(model_path))
+
+
+# Content hash of the pickles bundled in backend/models
+BUNDLED_VERSION = artifact_version(MODEL_PATH, SCALER_PATH)
+
+active = None
+_active_lock = threading.Lock()
+_swap_hooks = []
+
+
+def current():
+    """The model new requests should use, loading the default one on first call."""
+    if active is None:
+        with _active_lock:
+            if active is None:
+                from backend.registry import load_active
+
+                activate(load_active())
+    return active
+
+
+def activate(model):
+    """Serve model from now on; requests already holding the old one finish with it."""
+    global active
+    previous, active = active, model
+    if previous is not None and previous.version != model.version:
+        logger.info("Switched model %s -> %s", previous.version, model.version)
+    for hook in _swap_hooks:
+        hook(previous, model)
+
+
+def on_swap(hook):
+    """Register hook(previous, new), called after every activate()."""
+    _swap_hooks.append(hook)
+    return hook
+
+
+def predict_probabilities(features, model=None):
+    """Vectorized scale -> predict -> percent, clipped at 0 and rounded to 2dp."""
+    predictor = (model or current()).predictor
+    if getattr(predictor, "raw_linear", None) is not None:
+        # The scaler is folded into the weights, so there is no separate transform
+        with stage("model_predict"):
+            probs = predictor.predict(features) * 100
+    else:
+        with stage("scaler_transform"):
+            scaled = predictor.transform(features)
+        with stage("model_predict"):
+            probs = predictor.predict_scaled(scaled) * 100
+    return np.maximum(0, np.round(probs, 2))
@@ -0,0 +1,450 @@
+"""Pure-NumPy versions of the fitted scaler + model.
+
+compile_model() turns the pickled StandardScaler and estimator into a
+LeanPredictor made only of numpy arrays. Calling it skips sklearn's input
+validation and per-call dispatch, which dominate single-row latency.
+
+Supported estimators: LinearRegression-style linear models, sklearn
+decision trees and random forests, MLPRegressor, KNeighborsRegressor,
+SVR (rbf/linear), XGBRegressor, CatBoostRegressor and StackingRegressor
+built from these. Anything else is wrapped and called through its own
+predict() on the already-scaled array.
+"""
+import json
+import os
+import tempfile
+
+import numpy as np
+
+# Rows per block for SVR kernels, so bulk scoring doesn't allocate an
+# N x n_support_vectors matrix all at once
+BLOCK_ROWS = 4096
+# Rows walked through a tree ensemble at a time, so the (n_trees, rows)
+# node indices stay in cache
+TREE_BLOCK_ROWS = 256
+
+
+class LinearNode:
+    def __init__(self, coef, intercept):
+        self.coef_ = np.asarray(coef, dtype=np.float64)
+        self.intercept_ = float(intercept)
+
+    def predict(self, X):
+        return X @ self.coef_ + self.intercept_
+
+
+class FlatTrees:
+    """Tree node tables flattened to 1-D, to walk many trees and rows at once.
+
+    Takes (n_trees, n_nodes) tables padded past each tree's node count;
+    the padding is dropped. Built at compile time and exported, so the
+    tables are memory-mapped like every other array.
+    """
+
+    def __init__(self, feature, threshold, pass_child, fail_child, value, node_counts, missing_child=None):
+        n_trees, n_nodes = feature.shape
+        used = np.arange(n_nodes)[None, :] < np.asarray(node_counts)[:, None]
+        offsets = np.concatenate([[0], np.cumsum(node_counts)[:-1]]).astype(np.int32)[:, None]
+        index = (offsets + np.arange(n_nodes, dtype=np.int32)[None, :])[used]
+        first = np.broadcast_to(offsets, feature.shape)[used]
+        leaf = pass_child[used] == -1
+        # Node i has slots 2i (split test failed) and 2i + 1 (passed), so one
+        # add picks the branch; children[slot] is the next node's first slot
+        # and leaves point at themselves
+        fail = np.where(leaf, index, fail_child[used] + first)
+        passed = np.where(leaf, index, pass_child[used] + first)
+        self.roots = 2 * offsets
+        self.children = (2 * np.stack([fail, passed], axis=-1)).astype(np.int32).ravel()
+        self.feature = np.repeat(feature[used], 2).astype(np.int32)
+        self.threshold = np.repeat(threshold[used], 2)
+        self.value = np.repeat(value[used], 2)
+        self.missing = None
+        if missing_child is not None:
+            # Where a value is NaN: the default branch's first slot
+            self.missing = np.repeat(2 * np.where(leaf, index, missing_child[used] + first), 2).astype(np.int32)
+
+    def leaves(self, X, depth, test):
+        """(n_trees, n_rows) leaf values; test(x, threshold) is the split condition."""
+        n_rows, n_features = X.shape
+        cells = np.ascontiguousarray(X).ravel()
+        missing = self.missing is not None and np.isnan(cells).any()
+        out = np.empty((len(self.roots), n_rows), dtype=self.value.dtype)
+        for start in range(0, n_rows, TREE_BLOCK_ROWS):
+            stop = min(start + TREE_BLOCK_ROWS, n_rows)
+            block = cells[start * n_features:stop * n_features]
+            row_start = (np.arange(stop - start, dtype=np.int32) * np.int32(n_features))[None, :]
+            slot = np.repeat(self.roots, stop - start, axis=1)
+            for _ in range(depth):
+                x = np.take(block, np.take(self.feature, slot) + row_start)
+                step = np.take(self.children, slot + test(x, np.take(self.threshold, slot)))
+                slot = np.where(np.isnan(x), np.take(self.missing, slot), step) if missing else step
+            out[:, start:stop] = np.take(self.value, slot)
+        return out
+
+
+class TreeEnsembleNode:
+    """sklearn trees flattened into one node table and walked together."""
+
+    def __init__(self, trees):
+        n_nodes = max(t.node_count for t in trees)
+        shape = (len(trees), n_nodes)
+        left = np.full(shape, -1, dtype=np.int32)
+        right = np.full(shape, -1, dtype=np.int32)
+        feature = np.zeros(shape, dtype=np.int32)
+        threshold = np.zeros(shape, dtype=np.float64)
+        value = np.zeros(shape, dtype=np.float64)
+        for i, t in enumerate(trees):
+            n = t.node_count
+            left[i, :n] = t.children_left
+            right[i, :n] = t.children_right
+            # Leaves have feature -2; point them at column 0, the result is unused
+            feature[i, :n] = np.maximum(t.feature, 0)
+            threshold[i, :n] = t.threshold
+            value[i, :n] = t.value[:, 0, 0]
+        self.trees = FlatTrees(feature, threshold, left, right, value, [t.node_count for t in trees])
+        self.max_depth = max(t.max_depth for t in trees)
+
+    def predict(self, X):
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = X.astype(np.float32).astype(np.float64)
+        return self.trees.leaves(X, self.max_depth, np.less_equal).mean(axis=0)
+
+
+class XGBNode:
+    """XGBoost trees from the JSON dump, flattened into one node table."""
+
+    def __init__(self, booster, base_score):
+        dumps = [json.loads(d) for d in booster.get_dump(dump_format="json")]
+        flat = [self._flatten(tree) for tree in dumps]
+        node_counts = [max(nodes) + 1 for nodes in flat]
+        shape = (len(flat), max(node_counts))
+        feature = np.zeros(shape, dtype=np.int32)
+        split = np.zeros(shape, dtype=np.float32)
+        yes = np.full(shape, -1, dtype=np.int32)
+        no = np.full(shape, -1, dtype=np.int32)
+        missing = np.full(shape, -1, dtype=np.int32)
+        leaf = np.zeros(shape, dtype=np.float32)
+        self.max_depth = 0
+        for i, nodes in enumerate(flat):
+            for node_id, node in nodes.items():
+                if "leaf" in node:
+                    leaf[i, node_id] = node["leaf"]
+                    self.max_depth = max(self.max_depth, node["depth"])
+                else:
+                    feature[i, node_id] = int(node["split"].lstrip("f"))
+                    split[i, node_id] = node["split_condition"]
+                    yes[i, node_id] = node["yes"]
+                    no[i, node_id] = node["no"]
+                    missing[i, node_id] = node["missing"]
+        # Missing values follow each split's default branch
+        self.trees = FlatTrees(feature, split, yes, no, leaf, node_counts, missing_child=missing)
+        self.base_score = np.float32(base_score)
+
+    @staticmethod
+    def _flatten(tree):
+        nodes = {}
+        stack = [(tree, 0)]
+        while stack:
+            node, depth = stack.pop()
+            node["depth"] = depth
+            nodes[node["nodeid"]] = node
+            for child in node.get("children", ()):
+                stack.append((child, depth + 1))
+        return nodes
+
+    def predict(self, X):
+        leaves = self.trees.leaves(X.astype(np.float32), self.max_depth, np.less)
+        return (leaves.sum(axis=0, dtype=np.float32) + self.base_score).astype(np.float64)
+
+
+class CatBoostNode:
+    """CatBoost oblivious trees: each level is one (feature, border) split."""
+
+    def __init__(self, estimator):
+        fd, path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        try:
+            estimator.save_model(path, format="json")
+            with open(path) as f:
+                dump = json.load(f)
+        finally:
+            os.unlink(path)
+
+        flat_index = {f["feature_index"]: f["flat_feature_index"] for f in dump["features_info"]["float_features"]}
+        # Trees can differ in depth; pad shallow ones with always-false splits
+        depth = max(len(t["splits"]) for t in dump["oblivious_trees"])
+        n_trees = len(dump["oblivious_trees"])
+        self.features = np.zeros((n_trees, depth), dtype=np.int32)
+        self.borders = np.full((n_trees, depth), np.inf, dtype=np.float32)
+        self.leaves = np.zeros((n_trees, 2 ** depth), dtype=np.float64)
+        for i, tree in enumerate(dump["oblivious_trees"]):
+            for level, split in enumerate(tree["splits"]):
+                if split["split_type"] != "FloatFeature":
+                    raise UnsupportedModel(f"CatBoost split type {split['split_type']}")
+                self.features[i, level] = flat_index[split["float_feature_index"]]
+                self.borders[i, level] = split["border"]
+            n_leaves = len(tree["leaf_values"])
+            # Padded levels never fire, so only the first n_leaves slots are reachable
+            self.leaves[i, :n_leaves] = tree["leaf_values"]
+        scale, bias = dump.get("scale_and_bias", [1, [0]])
+        self.scale = float(scale)
+        self.bias = float(bias[0] if isinstance(bias, list) else bias)
+
+    def predict(self, X):
+        X = X.astype(np.float32)
+        # (n_rows, n_trees, depth) comparisons -> leaf index per tree
+        bits = X[:, self.features] > self.borders
+        index = (bits << np.arange(bits.shape[2], dtype=np.int64)).sum(axis=2)
+        values = self.leaves[np.arange(len(self.leaves))[None, :], index]
+        return self.scale * values.sum(axis=1) + self.bias
+
+
+class MLPNode:
+    ACTIVATIONS = {
+        "relu": lambda z: np.maximum(z, 0),
+        "tanh": np.tanh,
+        "logistic": lambda z: 1 / (1 + np.exp(-z)),
+        "identity": lambda z: z,
+    }
+
+    def __init__(self, coefs, intercepts, activation, out_activation):
+        if activation not in self.ACTIVATIONS or out_activation not in self.ACTIVATIONS:
+            raise UnsupportedModel(f"MLP activation {activation}/{out_activation}")
+        self.coefs = [np.asarray(c, dtype=np.float64) for c in coefs]
+        self.intercepts = [np.asarray(b, dtype=np.float64) for b in intercepts]
+        self.activation = activation
+        self.out_activation = out_activation
+
+    def predict(self, X):
+        hidden = self.ACTIVATIONS[self.activation]
+        for coef, intercept in zip(self.coefs[:-1], self.intercepts[:-1]):
+            X = hidden(X @ coef + intercept)
+        out = self.ACTIVATIONS[self.out_activation](X @ self.coefs[-1] + self.intercepts[-1])
+        return out[:, 0]
+
+
+class KNNNode:
+    # Rows per (rows, n_train) distance matrix
+    BLOCK_ROWS = 512
+
+    def __init__(self, fit_X, y, k, weights):
+        if weights not in ("uniform", "distance"):
+            raise UnsupportedModel(f"KNN weights {weights}")
+        self.fit_X = np.asarray(fit_X, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64).reshape(-1)
+        self.k = int(k)
+        self.weights = weights
+
+    def predict(self, X):
+        out = np.empty(len(X))
+        for start in range(0, len(X), self.BLOCK_ROWS):
+            block = X[start:start + self.BLOCK_ROWS]
+            # Exact (x - f)^2 distances, summed one feature at a time
+            dist = (block[:, :1] - self.fit_X[:, 0]) ** 2
+            for j in range(1, self.fit_X.shape[1]):
+                dist += (block[:, j:j + 1] - self.fit_X[:, j]) ** 2
+            idx = self._nearest(dist)
+            neighbours = self.y[idx]
+            if self.weights == "uniform":
+                out[start:start + self.BLOCK_ROWS] = neighbours.mean(axis=1)
+            else:
+                d = np.sqrt(np.take_along_axis(dist, idx, axis=1))
+                with np.errstate(divide="ignore"):
+                    w = 1 / d
+                # Exact matches take all the weight, as in sklearn
+                exact = np.isinf(w)
+                w = np.where(exact.any(axis=1, keepdims=True), exact.astype(np.float64), w)
+                out[start:start + self.BLOCK_ROWS] = (w * neighbours).sum(axis=1) / w.sum(axis=1)
+        return out
+
+    def _nearest(self, dist):
+        """Indices of the k nearest training rows, in stable-argsort order.
+
+        Ties are broken by training-row order, which is what sklearn's
+        brute-force search does; a partition finds the k-th distance
+        without sorting every row.
+        """
+        k = self.k
+        if k >= dist.shape[1] or np.isnan(dist).any():
+            return np.argsort(dist, axis=1, kind="stable")[:, :k]
+        kth = np.partition(dist, k - 1, axis=1)[:, k - 1:k]
+        below = dist < kth
+        tied = dist == kth
+        # Rows tied at the k-th distance are taken earliest first
+        chosen = below | (tied & (np.cumsum(tied, axis=1) <= k - below.sum(axis=1, keepdims=True)))
+        idx = np.nonzero(chosen)[1].reshape(len(dist), k)
+        order = np.argsort(np.take_along_axis(dist, idx, axis=1), axis=1, kind="stable")
+        return np.take_along_axis(idx, order, axis=1)
+
+
+class SVRNode:
+    def __init__(self, kernel, gamma, support_vectors, dual_coef, intercept):
+        if kernel not in ("rbf", "linear"):
+            raise UnsupportedModel(f"SVR kernel {kernel}")
+        self.kernel = kernel
+        self.gamma = float(gamma)
+        self.sv = np.asarray(support_vectors, dtype=np.float64)
+        self.sv_sq = (self.sv ** 2).sum(axis=1)
+        self.dual_coef = np.asarray(dual_coef, dtype=np.float64).reshape(-1)
+        self.intercept = float(np.ravel(intercept)[0])
+
+    def predict(self, X):
+        if self.kernel == "linear":
+            return (X @ self.sv.T) @ self.dual_coef + self.intercept
+        out = np.empty(len(X))
+        for start in range(0, len(X), BLOCK_ROWS):
+            block = X[start:start + BLOCK_ROWS]
+            sq = (block ** 2).sum(axis=1)[:, None] - 2 * block @ self.sv.T + self.sv_sq
+            out[start:start + BLOCK_ROWS] = np.exp(-self.gamma * np.maximum(sq, 0)) @ self.dual_coef + self.intercept
+        return out
+
+
+class StackingNode:
+    def __init__(self, estimators, final, passthrough):
+        self.estimators = estimators
+        self.final = final
+        self.passthrough = passthrough
+
+    def predict(self, X):
+        preds = [est.predict(X) for est in self.estimators]
+        if self.passthrough:
+            preds.extend(X.T)
+        return self.final.predict(np.column_stack(preds))
+
+
+class SklearnNode:
+    """Fallback for estimators we can't compile: call their own predict()."""
+
+    def __init__(self, estimator):
+        self.estimator = estimator
+
+    def predict(self, X):
+        return np.asarray(self.estimator.predict(X), dtype=np.float64).reshape(-1)
+
+
+class UnsupportedModel(ValueError):
+    pass
+
+
+def compile_estimator(est, strict=False):
+    """Compile one fitted estimator (in scaled feature space) into a node."""
+    name = type(est).__name__
+    try:
+        if name == "StackingRegressor":
+            if any(method != "predict" for method in est.stack_method_):
+                raise UnsupportedModel("StackingRegressor with non-predict stack methods")
+            children = [compile_estimator(e, strict) for e in est.estimators_]
+            return StackingNode(children, compile_estimator(est.final_estimator_, strict), est.passthrough)
+        if name in ("DecisionTreeRegressor", "ExtraTreeRegressor"):
+            return TreeEnsembleNode([est.tree_])
+        if name in ("RandomForestRegressor", "ExtraTreesRegressor"):
+            return TreeEnsembleNode([t.tree_ for t in est.estimators_])
+        if name == "XGBRegressor":
+            if est.objective not in ("reg:squarederror", None):
+                raise UnsupportedModel(f"XGBoost objective {est.objective}")
+            booster = est.get_booster()
+            config = json.loads(booster.save_config())
+            base_score = float(config["learner"]["learner_model_param"]["base_score"])
+            return XGBNode(booster, base_score)
+        if name == "CatBoostRegressor":
+            return CatBoostNode(est)
+        if name == "MLPRegressor":
+            return MLPNode(est.coefs_, est.intercepts_, est.activation, est.out_activation_)
+        if name == "KNeighborsRegressor":
+            if est.effective_metric_ != "euclidean":
+                raise UnsupportedModel(f"KNN metric {est.effective_metric_}")
+            return KNNNode(est._fit_X, est._y, est.n_neighbors, est.weights)
+        if name == "SVR":
+            return SVRNode(est.kernel, est._gamma, est.support_vectors_, est.dual_coef_, est.intercept_)
+        coef = getattr(est, "coef_", None)
+        if coef is not None and np.ndim(coef) == 1 and np.ndim(getattr(est, "intercept_", None)) == 0:
+            return LinearNode(coef, est.intercept_)
+        raise UnsupportedModel(f"No compiled form for {name}")
+    except UnsupportedModel:
+        if strict:
+            raise
+        return SklearnNode(est)
+
+
+class LeanPredictor:
+    """StandardScaler + compiled model, operating on raw feature rows.
+
+    The node tables win on the small batches that dominate request traffic
+    but lose to sklearn's C loops on large ones. When the original
+    estimator is available, batches above max_rows go back to it.
+    """
+
+    def __init__(self, mean, scale, root, estimator=None, max_rows=None):
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.root = root
+        self.estimator = estimator
+        self.max_rows = max_rows
+        self.raw_linear = None
+        if isinstance(root, LinearNode):
+            # Fold the scaler into the weights: w.(x - m)/s + b = (w/s).x + (b - w.m/s)
+            coef = root.coef_ / self.scale
+            self.raw_linear = LinearNode(coef, root.intercept_ - coef @ self.mean)
+
+    @property
+    def compiled(self):
+        """False when any part fell back to calling sklearn."""
+        def walk(node):
+            if isinstance(node, SklearnNode):
+                return False
+            if isinstance(node, StackingNode):
+                return all(walk(n) for n in node.estimators) and walk(node.final)
+            return True
+        return walk(self.root)
+
+    @property
+    def scaled_model(self):
+        """The model in scaled feature space, as SHAP sees it."""
+        return self.root if isinstance(self.root, LinearNode) else ScaledModel(self)
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+
+    def predict_scaled(self, X_scaled):
+        if self.estimator is not None and self.max_rows is not None and len(X_scaled) > self.max_rows:
+            return np.asarray(self.estimator.predict(X_scaled), dtype=np.float64).reshape(-1)
+        return self.root.predict(X_scaled)
+
+    def predict(self, X):
+        if self.raw_linear is not None:
+            return self.raw_linear.predict(np.asarray(X, dtype=np.float64))
+        return self.predict_scaled(self.transform(X))
+
+
+class ScaledModel:
+    def __init__(self, lean):
+        self.lean = lean
+
+    def predict(self, X_scaled):
+        return self.lean.predict_scaled(np.asarray(X_scaled, dtype=np.float64))
+
+
+def compile_model(model, scaler, strict=False, max_rows=None):
+    """Build a LeanPredictor from a fitted StandardScaler and estimator.
+
+    With max_rows set, batches larger than that are handed back to the
+    original sklearn estimator.
+    """
+    if type(scaler).__name__ != "StandardScaler":
+        raise UnsupportedModel(f"No compiled form for scaler {type(scaler).__name__}")
+    mean = scaler.mean_ if scaler.with_mean else np.zeros(scaler.n_features_in_)
+    scale = scaler.scale_ if scaler.with_std else np.ones(scaler.n_features_in_)
+    return LeanPredictor(mean, scale, compile_estimator(model, strict), estimator=model, max_rows=max_rows)
+
+
+def check_parity(lean, model, scaler, X, atol=1e-6):
+    """Max abs difference between the lean and sklearn predictions on raw rows X.
+
+    Raises AssertionError if it exceeds atol.
+    """
+    expected = model.predict(scaler.transform(X))
+    actual = lean.predict(X)
+    diff = float(np.max(np.abs(expected - actual))) if len(X) else 0.0
+    if diff > atol:
+        raise AssertionError(f"Lean predictor differs from sklearn by {diff:.3g} (atol={atol})")
+    return diff
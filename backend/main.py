@@ -1,19 +1,174 @@
-from fastapi import FastAPI, Query, HTTPException
-from pydantic import BaseModel
-import pandas as pd
+from fastapi import FastAPI, Query, HTTPException, UploadFile, File, Depends, Response, Header, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse, PlainTextResponse, FileResponse, JSONResponse
+from starlette.background import BackgroundTask
+from starlette.datastructures import Headers, MutableHeaders
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional
 import numpy as np
-import joblib
-from pathlib import Path
+import asyncio
+from contextlib import asynccontextmanager
 import os
-import shap
+import shutil
+import tempfile
+import threading
+import time
 
-from backend.utils import score_sop
+from backend.utils import score_sop_cached, cached_sop_score, sop_cache, model_stats, close_client, groq_gate
+from backend.universities import UniversityIndex
+from backend import bulk
+from backend.explain import get_explainer
+from backend.batching import MicroBatcher, MICROBATCH_ENABLED
+from backend import inference
+from backend.inference import BASE_DIR, FEATURE_FIELDS, FEATURE_NAMES, FEATURE_DECIMALS, predict_probabilities
+from backend.cache import ProfileCache, quantize
+from backend.registry import RegistryWatcher, load_version
+from backend import online
+from backend import metrics
+from backend.metrics import stage, mark_parsed
+from backend import profiling
+from backend.executor import cpu_pool, Overloaded
+from backend import ratelimit, encoding
+from backend.ratelimit import RateLimiter, Rejected
 
-app = FastAPI()
+MODEL_VERSION_HEADER = "X-Model-Version"
+# "X-Profile: 1" plus a valid X-Admin-Token profiles that request; the response names the file
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+# Never sampled: scrapes and the profile downloads themselves
+UNPROFILED_PREFIXES = ("/metrics", "/health", "/admin")
 
-BASE_DIR = Path(__file__).resolve().parent
-model = joblib.load(BASE_DIR / "models" / "admission_model.pkl")
-scaler = joblib.load(BASE_DIR / "models" / "scaler.pkl")
+def predict_with_version(features):
+    """Probabilities plus the version that produced them, for the micro-batcher."""
+    model = inference.current()
+    return [(prob, model.version) for prob in predict_probabilities(features, model)]
+
+batcher = MicroBatcher(predict_with_version) if MICROBATCH_ENABLED else None
+# Largest probability grid /whatif will evaluate in one request
+WHATIF_MAX_CELLS = int(os.getenv("WHATIF_MAX_CELLS", "20000"))
+# Most profiles /explain/batch will explain in one request; each can take ~100ms of CPU
+EXPLAIN_BATCH_MAX_ROWS = int(os.getenv("EXPLAIN_BATCH_MAX_ROWS", "200"))
+# Results for profiles on the UI's input grid; PREDICTION_CACHE_SIZE=0 disables it
+profile_cache = ProfileCache(int(os.getenv("PREDICTION_CACHE_SIZE", "4096")))
+# Shared secret for POST /ingest; the endpoint is disabled while unset
+INGEST_TOKEN = os.getenv("INGEST_TOKEN")
+# Shared secret for /admin endpoints and the X-Profile header; both are disabled while unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+# Requests per minute, per process; 0 disables a limit
+rate_limiters = {
+    "sop_key": RateLimiter("SOP scoring per API key", float(os.getenv("SOP_RATE_PER_KEY", "30"))),
+    "sop_client": RateLimiter("SOP scoring per client", float(os.getenv("SOP_RATE_PER_CLIENT", "60"))),
+    "explain_client": RateLimiter("explanations per client", float(os.getenv("EXPLAIN_RATE_PER_CLIENT", "600"))),
+}
+# Paths to exercise before serving, e.g. "predict,explain"; empty skips warm-up
+WARMUP = [step.strip() for step in os.getenv("BACKEND_WARMUP", "predict").split(",") if step.strip()]
+
+def warm_up(model, steps=WARMUP):
+    """Run one dummy request through each step so the first real one isn't slow."""
+    features = np.array([[320, 110, 3, 3.5, 3.5, 8.5, 1]], dtype=np.float64)
+    for step in steps:
+        if step == "predict":
+            predict_probabilities(features, model)
+        elif step == "explain":
+            get_explainer(model).explain(model.predictor.transform(features))
+
+# Loaded at import so a broken model fails startup rather than the first request
+inference.current()
+registry_watcher = RegistryWatcher(warm_up=warm_up)
+
+@inference.on_swap
+def invalidate_model_caches(previous, model):
+    profile_cache.clear(model.version)
+
+@asynccontextmanager
+async def lifespan(app):
+    if WARMUP:
+        await run_in_threadpool(warm_up, inference.current())
+    registry_watcher.start()
+    yield
+    await registry_watcher.stop()
+    if batcher is not None:
+        await batcher.stop()
+    await close_client()
+
+app = FastAPI(lifespan=lifespan)
+
+@app.exception_handler(Overloaded)
+async def overloaded(request, exc):
+    """Shed load the CPU pool can't queue instead of letting latency pile up."""
+    return JSONResponse(status_code=503, content={"detail": str(exc)},
+                        headers={"Retry-After": str(exc.retry_after)})
+
+@app.exception_handler(Rejected)
+async def rate_limited(request, exc):
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail},
+                        headers={"Retry-After": str(exc.retry_after)})
+
+def admin_authorized(token):
+    return bool(ADMIN_TOKEN) and token == ADMIN_TOKEN
+
+class InstrumentRequests:
+    """Request metrics, a sampled profile when asked for or picked by
+    PROFILE_SAMPLE_RATE, and the X-Model-Version header.
+
+    One pure ASGI layer: every @app.middleware("http") adds a
+    BaseHTTPMiddleware hop, about a millisecond per request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        metrics.request_started()
+        metrics.HTTP_IN_FLIGHT.inc()
+        request_headers = Headers(scope=scope)
+        profile = None
+        if not scope["path"].startswith(UNPROFILED_PREFIXES) and profiling.should_profile(
+                request_headers.get(PROFILE_HEADER) == "1" and admin_authorized(request_headers.get("X-Admin-Token"))):
+            profile = profiling.start()
+        start = time.perf_counter()
+        status = 500
+
+        def route():
+            # Route templates, not raw paths, so label cardinality stays bounded
+            matched = scope.get("route")
+            return matched.path if matched is not None else "unmatched"
+
+        async def send_with_headers(message):
+            nonlocal status, profile
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                # Routes that used a model already set this to the version they used
+                if MODEL_VERSION_HEADER not in headers:
+                    headers[MODEL_VERSION_HEADER] = inference.current().version
+                if profile is not None:
+                    headers[PROFILE_ID_HEADER] = await run_in_threadpool(
+                        profiling.finish, profile, scope["method"], route(), status, time.perf_counter() - start)
+                    profile = None
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            duration = time.perf_counter() - start
+            metrics.HTTP_IN_FLIGHT.dec()
+            metrics.HTTP_REQUEST_SECONDS.observe(duration, scope["method"], route(), str(status))
+            if profile is not None:
+                await run_in_threadpool(profiling.finish, profile, scope["method"], route(), status, duration)
+
+app.add_middleware(InstrumentRequests)
+
+def active_model(response: Response):
+    """Pin the request to the active model and report its version."""
+    model = inference.current()
+    response.headers[MODEL_VERSION_HEADER] = model.version
+    return model
+
+universities = UniversityIndex.load(BASE_DIR.parent / "data" / "UpdatedWorldUniRank23.xlsx")
 
 class StudentProfile(BaseModel):
     gre_score: float
@@ -24,21 +179,403 @@ class StudentProfile(BaseModel):
     cgpa: float
     research: int
 
+class ProfileColumns(BaseModel):
+    """Columnar batch: one equal-length list per StudentProfile field."""
+    gre_score: List[float]
+    toefl_score: List[float]
+    university_rating: List[int]
+    sop: List[float]
+    lor: List[float]
+    cgpa: List[float]
+    research: List[int]
+
+    @model_validator(mode="after")
+    def check_lengths(self):
+        lengths = {len(getattr(self, field)) for field in FEATURE_FIELDS}
+        if len(lengths) > 1:
+            raise ValueError("All feature columns must have the same length")
+        return self
+
+class ProfileBatch(BaseModel):
+    profiles: Optional[List[StudentProfile]] = None
+    columns: Optional[ProfileColumns] = None
+
+    @model_validator(mode="after")
+    def check_one_payload(self):
+        if (self.profiles is None) == (self.columns is None):
+            raise ValueError("Provide exactly one of 'profiles' or 'columns'")
+        return self
+
+    def to_matrix(self):
+        with stage("array_build"):
+            return self._to_matrix()
+
+    def _to_matrix(self):
+        if self.columns is not None:
+            return np.column_stack([
+                np.asarray(getattr(self.columns, field), dtype=np.float64) for field in FEATURE_FIELDS
+            ]).reshape(-1, len(FEATURE_FIELDS))
+        return np.array([
+            [getattr(p, field) for field in FEATURE_FIELDS] for p in self.profiles
+        ], dtype=np.float64).reshape(-1, len(FEATURE_FIELDS))
+
+class Sweep(BaseModel):
+    """One what-if axis: explicit values, or start..stop (inclusive) by step."""
+    feature: str
+    values: Optional[List[float]] = None
+    start: Optional[float] = None
+    stop: Optional[float] = None
+    step: Optional[float] = None
+
+    @model_validator(mode="after")
+    def check_axis(self):
+        if self.feature not in FEATURE_FIELDS:
+            raise ValueError(f"Unknown feature '{self.feature}'; expected one of {FEATURE_FIELDS}")
+        if self.values is None:
+            if None in (self.start, self.stop, self.step) or self.step <= 0 or self.stop < self.start:
+                raise ValueError("Give 'values' or a 'start' <= 'stop' with a positive 'step'")
+            if (self.stop - self.start) / self.step >= WHATIF_MAX_CELLS:
+                raise ValueError(f"Sweep over '{self.feature}' has too many points")
+        elif not self.values:
+            raise ValueError("'values' must not be empty")
+        return self
+
+    def points(self):
+        if self.values is not None:
+            return np.asarray(self.values, dtype=np.float64)
+        n = int(np.floor((self.stop - self.start) / self.step + 1e-9)) + 1
+        return np.round(self.start + self.step * np.arange(n), 6)
+
+class WhatIfRequest(BaseModel):
+    profile: StudentProfile
+    sweeps: List[Sweep]
+
+    @model_validator(mode="after")
+    def check_sweeps(self):
+        if not 1 <= len(self.sweeps) <= 2:
+            raise ValueError("Provide one or two sweeps")
+        if len({sweep.feature for sweep in self.sweeps}) != len(self.sweeps):
+            raise ValueError("Sweeps must vary different features")
+        return self
+
+class LabelledProfile(StudentProfile):
+    """A profile with its observed admission outcome."""
+    chance_of_admit: float = Field(ge=0, le=1)
+
+class IngestRequest(BaseModel):
+    rows: List[LabelledProfile]
+    # Serving the linear fit replaces whatever model is active, ensemble included
+    activate: bool = False
+
 class SOPText(BaseModel):
     sop: str
     api_key: str
 
+class AnalyzeRequest(StudentProfile):
+    """A profile plus the SOP text, for the combined /analyze call."""
+    sop_text: str = ""
+    api_key: Optional[str] = None
+
+def enter_handler():
+    """First call in each handler: times request parsing and lets the profiler sample this thread."""
+    mark_parsed()
+    profiling.attach()
+
+async def admit_explain(request, rows=1):
+    """Per-client limit on explanations, charged per profile explained."""
+    await rate_limiters["explain_client"].acquire(ratelimit.client_key(request), cost=max(1, rows))
+
+async def admit_sop(request, api_key):
+    """Per-client then per-key limits on SOP scoring; raises Rejected (429) when exceeded.
+
+    Only charged for SOPs that miss the cache, i.e. that would call Groq.
+    """
+    await rate_limiters["sop_client"].acquire(ratelimit.client_key(request))
+    await rate_limiters["sop_key"].acquire(ratelimit.api_key_id(api_key))
+
+def profile_features(profile):
+    """One-row feature matrix in FEATURE_FIELDS order."""
+    with stage("array_build"):
+        return np.array([[getattr(profile, field) for field in FEATURE_FIELDS]], dtype=np.float64)
+
+def scale_features(model, features):
+    with stage("scaler_transform"):
+        return model.predictor.transform(features)
+
 @app.post("/predict")
-def predict_admission(profile: StudentProfile):
-    features = np.array([[
-        profile.gre_score, profile.toefl_score, profile.university_rating,
-        profile.sop, profile.lor, profile.cgpa, profile.research
-    ]])
+async def predict_admission(profile: StudentProfile, request: Request, model=Depends(active_model)):
+    enter_handler()
+    features = profile_features(profile)
     
-    scaled_features = scaler.transform(features)
-    prob = model.predict(scaled_features)[0] * 100
-    
-    return {"probability": max(0, round(prob, 2))}
+    key = quantize(features[0], FEATURE_DECIMALS)
+    cached = profile_cache.get("predict", key, model.version)
+    if cached is not None:
+        return await respond_prediction(request, cached, model.version)
+
+    version = model.version
+    if batcher is not None:
+        # The batch runs on whichever model is active when it flushes
+        prob, version = await batcher.submit(features)
+        prob = float(prob)
+    else:
+        prob = float((await run_in_threadpool(profiling.bind(predict_probabilities), features, model))[0])
+    profile_cache.set("predict", key, version, prob)
+    return await respond_prediction(request, prob, version)
+
+
+async def respond_prediction(request, prob, version):
+    return await encoding.negotiate(request, {"probability": prob}, lambda: {"probability": [prob]},
+                                    {MODEL_VERSION_HEADER: version})
+
+
+@app.post("/predict/batch")
+async def predict_admission_batch(batch: ProfileBatch, request: Request, model=Depends(active_model)):
+    """Probabilities for every profile; large results are best fetched as Arrow or MessagePack.
+
+    Batches above LEAN_MAX_ROWS run on the CPU pool, like /whatif, so they
+    queue (or get 503) there instead of filling the request threadpool.
+    """
+    enter_handler()
+    features = batch.to_matrix()
+    if not len(features):
+        probabilities = np.empty(0)
+    elif len(features) > inference.LEAN_MAX_ROWS:
+        probabilities = await cpu_pool.run(profiling.bind(predict_probabilities), features, model)
+    else:
+        probabilities = await run_in_threadpool(profiling.bind(predict_probabilities), features, model)
+    return await encoding.negotiate(request, {"count": len(features), "probabilities": probabilities},
+                                    lambda: {"probability": probabilities},
+                                    {MODEL_VERSION_HEADER: model.version}, rows=len(features))
+
+
+@app.post("/predict/bulk")
+async def predict_admission_bulk(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|parquet)$"),
+    chunk_size: int = Query(bulk.DEFAULT_CHUNK_SIZE, ge=1, le=1_000_000),
+    model=Depends(active_model)
+):
+    """Score an uploaded CSV/Parquet file, streaming scored CSV back chunk by chunk.
+
+    Each chunk is scored on the CPU pool, so a large upload takes one pool
+    thread at a time and the next chunk isn't read until the previous one
+    has been sent. Only the first chunk can be refused with 503; once the
+    response has started, later chunks wait for a pool slot.
+    """
+    enter_handler()
+    fmt = bulk.detect_format(file.filename or "", format)
+    # FastAPI closes the upload once this handler returns, before the body
+    # has streamed, so spool it to a temp file that the stream owns
+    tmp = tempfile.NamedTemporaryFile(suffix="." + fmt, delete=False)
+    with tmp:
+        await run_in_threadpool(shutil.copyfileobj, file.file, tmp)
+
+    blocks = bulk.iter_csv_bytes(bulk.score_chunks(bulk.iter_chunks(tmp.name, fmt, chunk_size), model))
+    # A chunk may still be scoring on the pool when the client disconnects
+    lock = threading.Lock()
+
+    def next_block():
+        with lock:
+            return next(blocks, None)
+
+    def close():
+        with lock:
+            blocks.close()
+        os.unlink(tmp.name)
+
+    try:
+        first = await cpu_pool.run(profiling.bind(next_block))
+    except ValueError as e:
+        close()
+        raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        close()
+        raise
+    if first is None:
+        close()
+        raise HTTPException(status_code=400, detail="Uploaded file contains no rows")
+
+    async def stream():
+        block = first
+        while block is not None:
+            yield block
+            # The 200 is already sent: a 503 now would just cut the file short
+            block = await cpu_pool.run_waiting(next_block)
+
+    # A background task rather than the generator's finally: that never runs
+    # if the client disconnects before the first block is sent
+    return StreamingResponse(
+        stream(),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="scored.csv"', MODEL_VERSION_HEADER: model.version},
+        background=BackgroundTask(close),
+    )
+
+
+@app.post("/whatif")
+async def what_if(whatif: WhatIfRequest, request: Request, model=Depends(active_model)):
+    """Probability grid over one or two swept features, in a single model call.
+
+    All other features stay at the base profile's values. With two sweeps,
+    probabilities[i][j] is for sweeps[0] value i and sweeps[1] value j.
+    """
+    enter_handler()
+    axes = [sweep.points() for sweep in whatif.sweeps]
+    shape = tuple(len(axis) for axis in axes)
+    if int(np.prod(shape)) > WHATIF_MAX_CELLS:
+        raise HTTPException(status_code=400, detail=f"Grid of {int(np.prod(shape))} cells exceeds {WHATIF_MAX_CELLS}")
+
+    base = [getattr(whatif.profile, field) for field in FEATURE_FIELDS]
+    key = quantize(base, FEATURE_DECIMALS)
+    cache_key = None if key is None else (key, tuple((s.feature, tuple(a.tolist())) for s, a in zip(whatif.sweeps, axes)))
+    cached = profile_cache.get("whatif", cache_key, model.version)
+    if cached is None:
+        cached = await cpu_pool.run(profiling.bind(what_if_grid), whatif.sweeps, axes, base, model)
+        profile_cache.set("whatif", cache_key, model.version, cached)
+    return await encoding.negotiate(request, cached, lambda: what_if_columns(cached),
+                                    {MODEL_VERSION_HEADER: model.version}, rows=int(np.prod(shape)))
+
+
+def what_if_grid(sweeps, axes, base, model):
+    """The /whatif response for an already validated grid."""
+    shape = tuple(len(axis) for axis in axes)
+    with stage("array_build"):
+        features = np.tile(np.asarray(base, dtype=np.float64), (int(np.prod(shape)), 1))
+        grids = np.meshgrid(*axes, indexing="ij")
+        for sweep, grid in zip(sweeps, grids):
+            features[:, FEATURE_FIELDS.index(sweep.feature)] = grid.ravel()
+
+    probabilities = predict_probabilities(features, model).reshape(shape)
+    return {
+        "features": [sweep.feature for sweep in sweeps],
+        "axes": [axis.tolist() for axis in axes],
+        "base_probability": float(predict_probabilities(np.asarray([base], dtype=np.float64), model)[0]),
+        "probabilities": probabilities.tolist()
+    }
+
+
+def what_if_columns(result):
+    """Long-format table of a /whatif result: one row per grid cell."""
+    grids = np.meshgrid(*[np.asarray(axis, dtype=np.float64) for axis in result["axes"]], indexing="ij")
+    columns = {feature: grid.ravel() for feature, grid in zip(result["features"], grids)}
+    columns["probability"] = np.asarray(result["probabilities"], dtype=np.float64).ravel()
+    return columns
+
+
+@app.post("/ingest")
+async def ingest_outcomes(request: IngestRequest, x_ingest_token: Optional[str] = Header(None)):
+    """Fold new admission outcomes into the linear model and publish the result.
+
+    Only the new rows are processed. The new version is only published, not
+    served: activating it replaces the active model, e.g. the shipped
+    stacking ensemble, with a plain linear fit. Pass "activate": true to
+    serve it anyway; this worker switches right away and the others on
+    their next poll.
+    """
+    enter_handler()
+    if not INGEST_TOKEN or x_ingest_token != INGEST_TOKEN:
+        raise HTTPException(status_code=403, detail="Ingestion is disabled or the token is wrong")
+    if not request.rows:
+        raise HTTPException(status_code=400, detail="No rows to ingest")
+    return await cpu_pool.run(profiling.bind(ingest_rows), request)
+
+
+def ingest_rows(request):
+    X = np.array([[getattr(row, field) for field in FEATURE_FIELDS] for row in request.rows], dtype=np.float64)
+    y = np.array([row.chance_of_admit for row in request.rows], dtype=np.float64)
+    result = online.ingest(X, y, activate=request.activate)
+    if request.activate:
+        model = load_version(result["version"])
+        warm_up(model)
+        inference.activate(model)
+    return result
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Stage timers, cache and Groq figures in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@metrics.register_collector
+def collect_app_metrics():
+    """Figures the app already tracks elsewhere, read only when scraped."""
+    model = inference.current()
+    sop = sop_cache.stats()
+    predictions = profile_cache.stats()
+    lookups = [
+        ({"cache": "sop", "kind": "sop", "result": "hit"}, sop["hits"]),
+        ({"cache": "sop", "kind": "sop", "result": "disk_hit"}, sop["disk_hits"]),
+        ({"cache": "sop", "kind": "sop", "result": "coalesced"}, sop["coalesced"]),
+        ({"cache": "sop", "kind": "sop", "result": "miss"}, sop["misses"]),
+    ]
+    ratios = [({"cache": "sop", "kind": "sop"}, sop["hit_ratio"])]
+    for kind in ("predict", "explain", "whatif"):
+        if kind in predictions:
+            lookups += [
+                ({"cache": "prediction", "kind": kind, "result": "hit"}, predictions[kind]["hits"]),
+                ({"cache": "prediction", "kind": kind, "result": "miss"}, predictions[kind]["misses"]),
+            ]
+            ratios.append(({"cache": "prediction", "kind": kind}, predictions[kind]["hit_ratio"]))
+    groq = model_stats.snapshot()
+    out = [
+        ("admission_model_info", "gauge", "Served model version", [({"version": model.version}, 1)]),
+        ("admission_model_swaps_total", "counter", "Registry hot-swaps in this worker", [({}, registry_watcher.swaps)]),
+        ("admission_cache_lookups_total", "counter", "Cache lookups by outcome", lookups),
+        ("admission_cache_hit_ratio", "gauge", "Hits / lookups since start", ratios),
+        ("admission_cache_entries", "gauge", "Entries held in memory",
+         [({"cache": "sop"}, sop["size"]), ({"cache": "prediction"}, predictions["size"])]),
+        ("admission_groq_attempts_total", "counter", "Groq attempts per model",
+         [({"model": m}, entry["attempts"]) for m, entry in groq.items()]),
+        ("admission_groq_successes_total", "counter", "Successful Groq attempts per model",
+         [({"model": m}, entry["successes"]) for m, entry in groq.items()]),
+    ]
+    pool = cpu_pool.stats()
+    out += [
+        ("admission_cpu_pool_jobs", "gauge", "CPU pool jobs by state",
+         [({"state": "running"}, pool["running"]), ({"state": "queued"}, pool["queued"]),
+          ({"state": "waiting"}, pool["waiting"])]),
+        ("admission_cpu_pool_completed_total", "counter", "CPU pool jobs finished", [({}, pool["completed"])]),
+        ("admission_cpu_pool_rejected_total", "counter", "CPU pool jobs rejected with 503", [({}, pool["rejected"])]),
+    ]
+    limits = {name: limiter.stats() for name, limiter in rate_limiters.items()}
+    gate = groq_gate.stats()
+    out += [
+        ("admission_rate_limit_requests_total", "counter", "Rate-limited requests by outcome",
+         [({"limiter": name, "result": result}, stats[result])
+          for name, stats in limits.items() for result in ("admitted", "delayed", "rejected")]),
+        ("admission_groq_gate_requests", "gauge", "SOP scorings calling Groq or queued for a slot",
+         [({"state": "in_flight"}, gate["in_flight"]), ({"state": "queued"}, gate["queued"])]),
+        ("admission_groq_gate_rejected_total", "counter", "SOP scorings rejected with 503", [({}, gate["rejected"])]),
+    ]
+    if batcher is not None:
+        stats = batcher.stats()
+        out += [
+            ("admission_predict_batch_queue_depth", "gauge", "Rows waiting for a micro-batch", [({}, stats["queue_depth"])]),
+            ("admission_predict_batches_total", "counter", "Micro-batches run", [({}, stats["batches"])]),
+            ("admission_predict_batch_rows_total", "counter", "Rows scored in micro-batches", [({}, stats["rows"])]),
+        ]
+    return out
+
+
+@app.get("/admin/profiles")
+def list_request_profiles(x_admin_token: Optional[str] = Header(None)):
+    """Recently captured request profiles, newest first."""
+    if not admin_authorized(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled or the token is wrong")
+    return {"sample_rate": profiling.SAMPLE_RATE, "profiles": profiling.list_profiles()}
+
+
+@app.get("/admin/profiles/{name}")
+def download_request_profile(name: str, x_admin_token: Optional[str] = Header(None)):
+    """One profile in collapsed-stack format, ready for flamegraph.pl or speedscope."""
+    if not admin_authorized(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled or the token is wrong")
+    try:
+        path = profiling.profile_path(name)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"No profile named '{name}'")
+    return FileResponse(path, media_type="text/plain; charset=utf-8", filename=name)
 
 
 @app.get("/health")
@@ -48,35 +585,88 @@ def health_check():
     return {
         "status": "ok",
         "backend": "fastapi",
-        "groq_key_configured": groq_present
+        "groq_key_configured": groq_present,
+        "model": inference.current().info(),
+        "model_registry": registry_watcher.stats(),
+        "sop_cache": sop_cache.stats(),
+        "groq_models": model_stats.snapshot(),
+        "prediction_cache": profile_cache.stats(),
+        "cpu_pool": cpu_pool.stats(),
+        "rate_limits": {name: limiter.stats() for name, limiter in rate_limiters.items()},
+        "groq_gate": groq_gate.stats(),
+        "predict_batching": batcher.stats() if batcher is not None else {"enabled": False}
     }
 
 @app.post("/explain")
-def explain_prediction(profile: StudentProfile):
-    features = np.array([[
-        profile.gre_score, profile.toefl_score, profile.university_rating,
-        profile.sop, profile.lor, profile.cgpa, profile.research
-    ]])
-    
-    scaled_features = scaler.transform(features)
-    explainer = shap.Explainer(model.predict, masker=shap.maskers.Independent(data=np.zeros((1, 7))))
-    shap_values = explainer(scaled_features)
-    
-    feature_names = ["GRE", "TOEFL", "University", "SOP", "LOR", "CGPA", "Research"]
-    contributions = dict(zip(feature_names, shap_values.values[0]))
-    
+async def explain_prediction(profile: StudentProfile, request: Request, model=Depends(active_model)):
+    enter_handler()
+    await admit_explain(request)
+    explanation = await explain_profile(profile_features(profile), model)
+    return await encoding.negotiate(request, explanation, lambda: explanation_columns([explanation]),
+                                    {MODEL_VERSION_HEADER: model.version})
+
+
+@app.post("/explain/batch")
+async def explain_prediction_batch(batch: ProfileBatch, request: Request, model=Depends(active_model)):
+    enter_handler()
+    features = batch.to_matrix()
+    if len(features) > EXPLAIN_BATCH_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Batch of {len(features)} profiles exceeds {EXPLAIN_BATCH_MAX_ROWS}")
+    await admit_explain(request, rows=len(features))
+    # One explainer pass over the whole matrix instead of one call per row
+    explanations = await cpu_pool.run(profiling.bind(explain_features), features, model) if len(features) else []
+    return await encoding.negotiate(request, {"count": len(features), "explanations": explanations},
+                                    lambda: explanation_columns(explanations),
+                                    {MODEL_VERSION_HEADER: model.version}, rows=len(features))
+
+
+def explain_features(features, model):
+    """Explanations for every row, from a single scaling + explainer pass."""
+    values, base_values = get_explainer(model).explain(scale_features(model, features))
+    return format_explanations(values, base_values)
+
+
+async def explain_profile(features, model):
+    """Cached explanation of one row; cache misses run the explainer on the CPU pool."""
+    key = quantize(features[0], FEATURE_DECIMALS)
+    explanation = profile_cache.get("explain", key, model.version)
+    if explanation is None:
+        explanation = (await cpu_pool.run(profiling.bind(explain_features), features, model))[0]
+        profile_cache.set("explain", key, model.version, explanation)
+    return explanation
+
+
+def format_explanations(values, base_values):
+    """Build the /explain response for each row of SHAP values."""
+    values = np.asarray(values)
+    base_values = np.asarray(base_values)
+    # SHAP values are additive, so this equals model.predict without a second call
+    base_scores = np.round(base_values * 100, 2)
+    final_scores = np.round((base_values + values.sum(axis=1)) * 100, 2)
     # Generate suggestions for weak areas
-    suggestions = []
-    for feature, impact in contributions.items():
-        if impact < -0.05:
-            suggestions.append(get_suggestion(feature))
-    
-    return {
-        "base_score": round(shap_values.base_values[0] * 100, 2),
-        "final_score": round(model.predict(scaled_features)[0] * 100, 2),
-        "contributions": contributions,
-        "suggestions": suggestions or ["Your profile looks competitive!"]
+    weak = values < -0.05
+
+    results = []
+    for i in range(len(values)):
+        suggestions = [get_suggestion(FEATURE_NAMES[j]) for j in np.flatnonzero(weak[i])]
+        results.append({
+            "base_score": float(base_scores[i]),
+            "final_score": float(final_scores[i]),
+            "contributions": dict(zip(FEATURE_NAMES, values[i].tolist())),
+            "suggestions": suggestions or ["Your profile looks competitive!"]
+        })
+    return results
+
+def explanation_columns(explanations):
+    """Arrow columns for explanations: scores, one contribution column per feature, suggestions."""
+    columns = {
+        "base_score": [e["base_score"] for e in explanations],
+        "final_score": [e["final_score"] for e in explanations],
     }
+    for name in FEATURE_NAMES:
+        columns[f"contribution_{name}"] = [e["contributions"][name] for e in explanations]
+    columns["suggestions"] = [e["suggestions"] for e in explanations]
+    return columns
 
 def get_suggestion(feature):
     suggestions = {
@@ -91,59 +681,104 @@ def get_suggestion(feature):
     return suggestions.get(feature, "Focus on strengthening this area")
 
 @app.get("/university")
-def get_university_rating(name: str = Query(...)):
-    df = pd.read_excel(BASE_DIR.parent / "data" / "UpdatedWorldUniRank23.xlsx")
-    
-    result = df[df['University Name'].str.lower() == name.lower()]
-    
-    if result.empty:
+async def get_university_rating(name: str = Query(...)):
+    enter_handler()
+    record = universities.lookup(name)
+
+    if record is None:
         return {"name": name, "rating": 1, "found": False}
-    
-    row = result.iloc[0]
-    rank_str = str(row.get("Rank", "1000"))
-    
-    # Parse rank (handle ranges like "101-150")
-    try:
-        if "-" in rank_str:
-            low, high = map(int, rank_str.split("-"))
-            rank = (low + high) // 2
-        else:
-            rank = int(rank_str)
-    except:
-        rank = 1000
-    
-    # Convert rank to rating
-    if rank <= 100:
-        rating = 5
-    elif rank <= 250:
-        rating = 4
-    elif rank <= 500:
-        rating = 3
-    else:
-        rating = 2
-    
+
     return {
         "name": name,
-        "rating": rating,
-        "rank": rank_str,
-        "country": str(row.get("Country", "Unknown")),
+        "rating": record["rating"],
+        "rank": record["rank_str"],
+        "country": record["country"],
         "found": True
     }
 
+@app.get("/university/search")
+async def search_universities(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=50)):
+    enter_handler()
+    matches = universities.search(q, limit=limit)
+    return {
+        "query": q,
+        "results": [
+            {
+                "name": record["name"],
+                "score": score,
+                "rating": record["rating"],
+                "rank": record["rank_str"],
+                "country": record["country"]
+            }
+            for record, score in matches
+        ]
+    }
+
 @app.post("/sop")
-def evaluate_sop(data: SOPText):
+async def evaluate_sop(data: SOPText, request: Request):
+    enter_handler()
     if not data.api_key or data.api_key == "":
         raise HTTPException(status_code=400, detail="Groq API key not provided")
 
+    return await run_sop_scoring(data.sop, data.api_key, request)
+
+
+async def run_sop_scoring(text, api_key, request, degrade=False):
+    """SOP scores, rate limited per client and key on a cache miss.
+
+    Over a limit, raises Rejected, or with degrade returns the usual error
+    object so the rest of a combined response still goes out.
+    """
     # Always return a consistent JSON structure to the frontend so UI doesn't crash
     try:
-        result = score_sop(data.sop, data.api_key)
+        result = cached_sop_score(text)
+        if result is None:
+            # Charged to this caller even when it joins another's in-flight call,
+            # so each request is judged by its own client's and key's limits
+            await admit_sop(request, api_key)
+            result = await score_sop_cached(text, api_key)
         # Ensure keys exist
         if not isinstance(result, dict):
             return {"scores": {}, "average": 0, "error": "Invalid result from scorer"}
         result.setdefault("scores", {})
         result.setdefault("average", 0)
         return result
+    except Rejected as e:
+        if not degrade:
+            raise
+        return {"scores": {}, "average": 0, "error": f"SOP scoring skipped: {e.detail}"}
     except Exception as e:
         # Return an error object rather than raising HTTPException to keep frontend stable
-        return {"scores": {}, "average": 0, "error": f"SOP scoring failed: {str(e)}"}
\ No newline at end of file
+        return {"scores": {}, "average": 0, "error": f"SOP scoring failed: {str(e)}"}
+
+
+@app.post("/analyze")
+async def analyze_profile(data: AnalyzeRequest, request: Request, model=Depends(active_model)):
+    """Prediction, explanation and SOP scores in one round-trip.
+
+    The SOP call is network-bound and the model work is CPU-bound, so they
+    run concurrently and the response takes about as long as the slower one.
+    An SOP over its rate limit doesn't fail the request: the prediction and
+    explanation are returned with the reason in sop_scores.error.
+    """
+    enter_handler()
+    await admit_explain(request)
+    features = profile_features(data)
+    model_task = explain_profile(features, model)
+
+    if not data.api_key:
+        sop_scores = {"scores": {}, "average": 0, "error": "Groq API key not provided"}
+        explanation = await model_task
+    elif not data.sop_text.strip():
+        sop_scores = {"scores": {}, "average": 0, "error": "SOP text not provided"}
+        explanation = await model_task
+    else:
+        sop_task = run_sop_scoring(data.sop_text, data.api_key, request, degrade=True)
+        explanation, sop_scores = await asyncio.gather(model_task, sop_task)
+
+    return {
+        # SHAP values are additive, so the final score is the prediction
+        "prediction": {"probability": max(0, explanation["final_score"])},
+        "explanation": explanation,
+        "sop_scores": sop_scores
+    }
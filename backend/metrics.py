@@ -0,0 +1,196 @@
+"""Process-local metrics rendered in the Prometheus text exposition format.
+
+Recording a sample is a perf_counter pair, a bisect and a few additions
+under an uncontended lock; nothing is formatted until /metrics is
+scraped. Values that already live elsewhere (cache stats, Groq model
+stats, RSS) are not tracked here at all: collectors registered with
+register_collector read them at scrape time.
+
+With several workers each process reports its own numbers; the pid is
+on admission_worker_info so scrapes from different workers can be told apart.
+"""
+import bisect
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+# METRICS_ENABLED=0 turns every timer into a no-op
+ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+
+# Seconds; spans the sub-millisecond model calls up to slow Groq attempts
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_metrics = []
+_collectors = []
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for v in values)
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # One count per bucket (non-cumulative), plus sum and count
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        with self._lock:
+            items = [(k, (list(v[0]), v[1], v[2])) for k, v in self._values.items()]
+        lines = self.header()
+        names = self.labelnames + ("le",)
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + (_format_value(float(bound)),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("admission_stage_seconds", "Time spent in each hot-path stage", ["stage"])
+GROQ_ATTEMPT_SECONDS = Histogram("admission_groq_attempt_seconds", "Duration of each Groq model attempt",
+                                 ["model", "outcome"])
+HTTP_REQUEST_SECONDS = Histogram("admission_http_request_seconds", "End-to-end request latency",
+                                 ["method", "route", "status"])
+HTTP_IN_FLIGHT = Gauge("admission_http_requests_in_flight", "Requests currently being handled")
+
+_request_start = ContextVar("request_start", default=None)
+
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        STAGE_SECONDS.observe(time.perf_counter() - self.start, self.name)
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name):
+    """Context manager timing one stage into admission_stage_seconds."""
+    return _Stage(name) if ENABLED else _NULL_STAGE
+
+
+def request_started():
+    """Called by the HTTP middleware; starts the clock mark_parsed() reads."""
+    _request_start.set(time.perf_counter())
+
+
+def mark_parsed():
+    """Record routing + body read + pydantic validation, from request start to handler entry."""
+    start = _request_start.get()
+    if ENABLED and start is not None:
+        STAGE_SECONDS.observe(time.perf_counter() - start, "request_parse")
+
+
+def register_collector(collect):
+    """collect() -> [(name, kind, help, [(labels dict, value), ...])], called per scrape."""
+    _collectors.append(collect)
+    return collect
+
+
+def _process_samples():
+    samples = [
+        ("admission_worker_info", "gauge", "Process serving this scrape", [({"pid": str(os.getpid())}, 1)]),
+        ("process_cpu_seconds_total", "counter", "User + system CPU time", [({}, time.process_time())]),
+    ]
+    try:
+        with open("/proc/self/statm") as f:
+            rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        samples.append(("process_resident_memory_bytes", "gauge", "Resident set size", [({}, rss)]))
+    except (OSError, ValueError, AttributeError):
+        import resource
+
+        # Peak rather than current RSS where /proc is unavailable; KiB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        samples.append(("process_max_resident_memory_bytes", "gauge", "Peak resident set size",
+                        [({}, peak if os.uname().sysname == "Darwin" else peak * 1024)]))
+    return samples
+
+
+def render():
+    """The full exposition text for one scrape."""
+    lines = []
+    for metric in _metrics:
+        lines += metric.render()
+    for collect in [_process_samples] + _collectors:
+        for name, kind, documentation, samples in collect():
+            lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,356 @@
+"""Incremental updates of a linear model from new admission outcomes.
+
+The state kept between updates is a set of sufficient statistics over
+every labelled row seen so far: row count, feature means, the feature
+co-moment matrix and the feature/target cross-moments. New rows are
+merged in with Chan's parallel update, so an update costs O(rows * d^2)
+in the new rows only. From those statistics the StandardScaler (running
+mean/variance) and the least-squares or ridge fit on scaled features are
+exactly what a full refit over the whole history would give.
+
+A fixed-size reservoir sample of raw rows is kept alongside, to serve as
+the SHAP background of each published version.
+
+CLI usage:
+    python -m backend.online init                 # statistics from the history CSV
+    python -m backend.online ingest new_outcomes.csv
+    python -m backend.online status
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+from backend import bulk
+from backend.inference import BASE_DIR, FEATURE_FIELDS
+
+logger = logging.getLogger(__name__)
+
+STATE_PATH = Path(os.getenv("ONLINE_STATE_PATH", BASE_DIR / "models" / "online_state.npz"))
+# The bundled training data, which the history starts out as a copy of
+SEED_DATA_PATH = BASE_DIR.parent / "data" / "admission_data.csv"
+# History that new rows are appended to; also the source for `init`. Not
+# tracked by git, so ingesting never modifies the bundled CSV
+DATA_PATH = Path(os.getenv("ONLINE_DATA_PATH", BASE_DIR / "models" / "admission_history.csv"))
+# Ridge penalty on scaled features; 0 is ordinary least squares
+RIDGE_ALPHA = float(os.getenv("ONLINE_RIDGE_ALPHA", "1.0"))
+RESERVOIR_SIZE = 400
+
+LABEL_ALIASES = {"chance of admit", "chance_of_admit"}
+
+_lock = threading.Lock()
+
+
+class SufficientStats:
+    """Mergeable mean/co-moment statistics of features X and target y."""
+
+    def __init__(self, n, mean, comoment, y_mean, cross, y_comoment):
+        self.n = int(n)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.comoment = np.asarray(comoment, dtype=np.float64)
+        self.y_mean = float(y_mean)
+        self.cross = np.asarray(cross, dtype=np.float64)
+        self.y_comoment = float(y_comoment)
+
+    @classmethod
+    def from_arrays(cls, X, y):
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        mean = X.mean(axis=0)
+        y_mean = float(y.mean())
+        Xc = X - mean
+        yc = y - y_mean
+        return cls(len(X), mean, Xc.T @ Xc, y_mean, Xc.T @ yc, float(yc @ yc))
+
+    def merge(self, other):
+        """Statistics of both row sets combined (Chan et al. pairwise update)."""
+        if self.n == 0:
+            return other
+        if other.n == 0:
+            return self
+        n = self.n + other.n
+        weight = self.n * other.n / n
+        delta = other.mean - self.mean
+        y_delta = other.y_mean - self.y_mean
+        return SufficientStats(
+            n,
+            self.mean + delta * other.n / n,
+            self.comoment + other.comoment + np.outer(delta, delta) * weight,
+            self.y_mean + y_delta * other.n / n,
+            self.cross + other.cross + delta * y_delta * weight,
+            self.y_comoment + other.y_comoment + y_delta * y_delta * weight,
+        )
+
+    @property
+    def var(self):
+        # Population variance, as StandardScaler uses
+        return np.diag(self.comoment) / self.n
+
+    @property
+    def scale(self):
+        scale = np.sqrt(self.var)
+        # StandardScaler leaves constant features unscaled
+        return np.where(scale < 10 * np.finfo(np.float64).eps, 1.0, scale)
+
+    def solve(self, alpha=RIDGE_ALPHA):
+        """(coef, intercept) of the linear fit on standardized features."""
+        scale = self.scale
+        gram = self.comoment / np.outer(scale, scale)
+        coef = np.linalg.solve(gram + alpha * np.eye(len(scale)), self.cross / scale)
+        # Scaled features have zero mean over the history, so the intercept is y's mean
+        return coef, self.y_mean
+
+    def to_arrays(self):
+        return {
+            "n": np.asarray(self.n), "mean": self.mean, "comoment": self.comoment,
+            "y_mean": np.asarray(self.y_mean), "cross": self.cross, "y_comoment": np.asarray(self.y_comoment),
+        }
+
+
+class OnlineState:
+    """Sufficient statistics plus a reservoir sample of raw rows, persisted as .npz."""
+
+    def __init__(self, stats, reservoir, alpha=RIDGE_ALPHA, seed=0):
+        self.stats = stats
+        self.reservoir = np.asarray(reservoir, dtype=np.float64).reshape(-1, len(FEATURE_FIELDS))
+        self.alpha = alpha
+        self.seed = seed
+
+    @classmethod
+    def from_arrays(cls, X, y, alpha=RIDGE_ALPHA):
+        state = cls(SufficientStats.from_arrays(X, y), np.empty((0, len(FEATURE_FIELDS))), alpha)
+        state._sample(X, seen_before=0)
+        return state
+
+    def _sample(self, X, seen_before):
+        """Reservoir sampling (Algorithm R) over the stream of raw rows."""
+        rng = np.random.default_rng([self.seed, seen_before])
+        reservoir = list(self.reservoir)
+        for i, row in enumerate(X, start=seen_before):
+            if len(reservoir) < RESERVOIR_SIZE:
+                reservoir.append(row)
+            else:
+                j = int(rng.integers(0, i + 1))
+                if j < RESERVOIR_SIZE:
+                    reservoir[j] = row
+        self.reservoir = np.asarray(reservoir, dtype=np.float64).reshape(-1, len(FEATURE_FIELDS))
+
+    def update(self, X, y):
+        seen_before = self.stats.n
+        self.stats = self.stats.merge(SufficientStats.from_arrays(X, y))
+        self._sample(X, seen_before)
+
+    def save(self, path=STATE_PATH):
+        path = Path(path)
+        tmp_path = path.with_name(f".{path.stem}.{os.getpid()}.tmp.npz")
+        np.savez(tmp_path, reservoir=self.reservoir, alpha=np.asarray(self.alpha),
+                 seed=np.asarray(self.seed), **self.stats.to_arrays())
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path=STATE_PATH):
+        with np.load(path) as data:
+            stats = SufficientStats(data["n"], data["mean"], data["comoment"], data["y_mean"],
+                                    data["cross"], data["y_comoment"])
+            return cls(stats, data["reservoir"], float(data["alpha"]), int(data["seed"]))
+
+    def to_sklearn(self):
+        """(model, scaler, background) equivalent to refitting on the whole history."""
+        from sklearn.linear_model import LinearRegression, Ridge
+        from sklearn.preprocessing import StandardScaler
+
+        scaler = StandardScaler()
+        scaler.mean_ = self.stats.mean.copy()
+        scaler.var_ = self.stats.var
+        scaler.scale_ = self.stats.scale
+        scaler.n_samples_seen_ = self.stats.n
+        scaler.n_features_in_ = len(FEATURE_FIELDS)
+
+        model = LinearRegression() if self.alpha == 0 else Ridge(alpha=self.alpha)
+        model.coef_, model.intercept_ = self.stats.solve(self.alpha)
+        model.n_features_in_ = len(FEATURE_FIELDS)
+        return model, scaler, scaler.transform(self.reservoir)
+
+    def summary(self):
+        coef, intercept = self.stats.solve(self.alpha)
+        return {
+            "rows": self.stats.n,
+            "alpha": self.alpha,
+            "feature_means": dict(zip(FEATURE_FIELDS, self.stats.mean.round(6).tolist())),
+            "coef": dict(zip(FEATURE_FIELDS, coef.round(6).tolist())),
+            "intercept": round(intercept, 6),
+            "reservoir_rows": len(self.reservoir),
+        }
+
+
+def read_labelled(path, chunk_size=bulk.DEFAULT_CHUNK_SIZE):
+    """Yield (X, y) chunks from a CSV/Parquet file in the admission_data.csv schema."""
+    feature_cols = label_col = None
+    for chunk in bulk.iter_chunks(path, bulk.detect_format(path), chunk_size):
+        if feature_cols is None:
+            feature_cols = bulk.resolve_columns(chunk.columns)
+            label_col = next((c for c in chunk.columns if str(c).strip().lower() in LABEL_ALIASES), None)
+            if label_col is None:
+                raise ValueError("Missing label column 'Chance of Admit'")
+        yield chunk[feature_cols].to_numpy(dtype=np.float64), chunk[label_col].to_numpy(dtype=np.float64)
+
+
+def validate(X, y):
+    X = np.asarray(X, dtype=np.float64).reshape(-1, len(FEATURE_FIELDS))
+    y = np.asarray(y, dtype=np.float64).reshape(-1)
+    if len(X) != len(y):
+        raise ValueError("Feature and label row counts differ")
+    if not (np.isfinite(X).all() and np.isfinite(y).all()):
+        raise ValueError("Rows contain missing or non-finite values")
+    if ((y < 0) | (y > 1)).any():
+        raise ValueError("'Chance of Admit' must be between 0 and 1")
+    return X, y
+
+
+def append_rows(X, y, data_path=DATA_PATH):
+    """Append labelled rows to the history CSV, keeping its header and column order."""
+    with open(data_path, newline="") as f:
+        header = next(csv.reader(f))
+    order = bulk.resolve_columns(header)
+    label = next(c for c in header if c.strip().lower() in LABEL_ALIASES)
+    # The bundled CSV has no trailing newline; without one the first new row joins the last line
+    with open(data_path, "rb") as f:
+        missing_newline = False
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            missing_newline = f.read(1) not in (b"\n", b"\r")
+    with open(data_path, "a", newline="") as f:
+        if missing_newline:
+            f.write("\n")
+        writer = csv.writer(f)
+        for row, target in zip(X, y):
+            values = dict(zip(order, row))
+            values[label] = target
+            writer.writerow([f"{values[c]:g}" for c in header])
+
+
+def ensure_history(data_path=DATA_PATH):
+    """Create the history as a copy of the bundled CSV if it doesn't exist yet."""
+    data_path = Path(data_path)
+    if data_path.exists():
+        return
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=data_path.parent, suffix=".tmp")
+    os.close(fd)
+    shutil.copyfile(SEED_DATA_PATH, tmp)
+    os.replace(tmp, data_path)
+
+
+@contextmanager
+def _exclusive(path):
+    """Serialize updates across threads and, where supported, worker processes."""
+    with _lock:
+        try:
+            import fcntl
+        except ImportError:
+            yield
+            return
+        with open(Path(path).with_suffix(".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def init_state(data_path=DATA_PATH, state_path=STATE_PATH, alpha=RIDGE_ALPHA):
+    """Build the statistics from the full history; needed once."""
+    ensure_history(data_path)
+    state = None
+    for X, y in read_labelled(data_path):
+        X, y = validate(X, y)
+        if state is None:
+            state = OnlineState.from_arrays(X, y, alpha)
+        else:
+            state.update(X, y)
+    if state is None:
+        raise ValueError(f"{data_path} has no rows")
+    state.save(state_path)
+    return state
+
+
+def publish_state(state, activate=False):
+    """Write the current fit as a registry version; returns its manifest.
+
+    The version is only served if activate is set: it is a plain linear fit,
+    less accurate than the shipped ensemble it would replace.
+    """
+    import joblib
+
+    from backend import registry
+
+    model, scaler, background = state.to_sklearn()
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [Path(tmp) / name for name in ("admission_model.pkl", "scaler.pkl", "X_train.pkl")]
+        for obj, path in zip((model, scaler, background), paths):
+            joblib.dump(obj, path)
+        return registry.publish(*paths, activate=activate,
+                                metadata={"source": "online", "family": "linear", **state.summary()})
+
+
+def ingest(X, y, state_path=STATE_PATH, data_path=DATA_PATH, publish=True, activate=False):
+    """Fold new labelled rows into the model; cost is proportional to len(X)."""
+    X, y = validate(X, y)
+    with _exclusive(state_path):
+        if Path(state_path).exists():
+            state = OnlineState.load(state_path)
+        else:
+            logger.info("No online state yet; building it from %s", data_path)
+            state = init_state(data_path, state_path)
+        if len(X):
+            if data_path is not None:
+                ensure_history(data_path)
+                append_rows(X, y, data_path)
+            state.update(X, y)
+            state.save(state_path)
+        result = {"rows_added": len(X), **state.summary()}
+        if publish:
+            result["version"] = publish_state(state, activate)["version"]
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incrementally update the linear admission model.")
+    parser.add_argument("--state", default=str(STATE_PATH), help="Statistics file")
+    parser.add_argument("--data", default=str(DATA_PATH), help="History CSV (admission_data.csv schema)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    init = sub.add_parser("init", help="Rebuild the statistics from the history CSV")
+    init.add_argument("--alpha", type=float, default=RIDGE_ALPHA, help="Ridge penalty (0 = least squares)")
+    ing = sub.add_parser("ingest", help="Append new labelled rows and update the model")
+    ing.add_argument("input", help="CSV or Parquet file of new outcomes")
+    ing.add_argument("--no-publish", action="store_true", help="Update the statistics only")
+    ing.add_argument("--activate", action="store_true", help="Also serve the published version")
+    sub.add_parser("status", help="Show the current fit")
+    args = parser.parse_args(argv)
+
+    if args.command == "init":
+        state = init_state(args.data, args.state, args.alpha)
+        print(json.dumps(state.summary(), indent=2))
+    elif args.command == "ingest":
+        result = None
+        for X, y in read_labelled(args.input):
+            result = ingest(X, y, args.state, args.data, publish=False)
+        if result is None:
+            raise SystemExit(f"{args.input} has no rows")
+        if not args.no_publish:
+            result["version"] = publish_state(OnlineState.load(args.state), args.activate)["version"]
+        print(json.dumps(result, indent=2))
+    else:
+        print(json.dumps(OnlineState.load(args.state).summary(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
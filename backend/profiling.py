@@ -0,0 +1,236 @@
+"""Opt-in sampling profiler that writes one flamegraph file per request.
+
+While at least one request is being profiled, a daemon thread snapshots
+sys._current_frames() every PROFILE_INTERVAL_MS and counts the stacks of
+the threads attached to each profiled request: whichever thread runs the
+handler (the event loop for async handlers, a threadpool thread for sync
+ones) and threads running work passed through bind(). Nothing runs for
+requests that aren't profiled.
+
+Profiles are written in the collapsed-stack ("folded") format, one
+`frame;frame;frame count` line per distinct stack, which flamegraph.pl,
+inferno and speedscope read directly:
+
+    flamegraph.pl profiles/<name>.folded > explain.svg
+
+The event loop thread is shared by every in-flight request, so samples
+taken on it while other async requests run are attributed to each
+profiled request; time spent waiting on Groq shows up as the loop's
+selector frames.
+"""
+import functools
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", Path(__file__).resolve().parent.parent / "profiles"))
+# Fraction of requests profiled without being asked to; 0 profiles only on request
+SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", "2")) / 1000
+# Most recent profiles kept on disk; older ones are deleted as new ones are written
+KEEP = max(1, int(os.getenv("PROFILE_KEEP", "50")))
+
+SUFFIX = ".folded"
+NAME_PATTERN = re.compile(r"^(\d{8}T\d{6}\d{6})-([a-z]+)-([\w.]*)-(\d{3})-(\d+)ms-([0-9a-f]{8})\.folded$")
+
+_current = ContextVar("profile", default=None)
+_labels = {}
+
+
+def _label(code):
+    """Flamegraph frame name for a code object, e.g. `explain (backend/explain.py:88)`."""
+    label = _labels.get(code)
+    if label is None:
+        path = code.co_filename
+        for marker in ("site-packages" + os.sep, "backend" + os.sep, "benchmarks" + os.sep):
+            i = path.rfind(marker)
+            if i >= 0:
+                path = path[i + (len(marker) if marker.startswith("site") else 0):]
+                break
+        else:
+            path = os.path.basename(path)
+        name = getattr(code, "co_qualname", code.co_name)
+        label = _labels[code] = f"{name} ({path}:{code.co_firstlineno})".replace(";", ":")
+    return label
+
+
+def _stack(frame, thread_name):
+    frames = []
+    while frame is not None:
+        frames.append(_label(frame.f_code))
+        frame = frame.f_back
+    frames.append(f"thread:{thread_name}")
+    return ";".join(reversed(frames))
+
+
+class RequestProfile:
+    """Stack counts for one request and the threads currently working on it."""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex[:8]
+        self.threads = {}
+        self.counts = Counter()
+        self.started = time.time()
+
+    def attach(self):
+        thread = threading.current_thread()
+        self.threads[thread.ident] = thread.name
+
+    def detach(self):
+        self.threads.pop(threading.get_ident(), None)
+
+    def sample(self, frames):
+        for ident, name in list(self.threads.items()):
+            frame = frames.get(ident)
+            if frame is not None:
+                self.counts[_stack(frame, name)] += 1
+
+    def folded(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+
+class Sampler:
+    """One background thread sampling every active profile; idle when there are none."""
+
+    def __init__(self, interval=INTERVAL):
+        self.interval = interval
+        self._profiles = set()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def add(self, profile):
+        with self._cond:
+            self._profiles.add(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def remove(self, profile):
+        with self._cond:
+            self._profiles.discard(profile)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._profiles:
+                    self._cond.wait()
+                profiles = list(self._profiles)
+            frames = sys._current_frames()
+            for profile in profiles:
+                profile.sample(frames)
+            del frames
+            time.sleep(self.interval)
+
+
+sampler = Sampler()
+
+
+def should_profile(requested=False):
+    """Profile this request: it asked to be, or it falls in the sampled fraction."""
+    return requested or (SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE)
+
+
+def start():
+    """Start profiling the current request; threads join it through attach() and bind()."""
+    profile = RequestProfile()
+    _current.set(profile)
+    sampler.add(profile)
+    return profile
+
+
+def attach():
+    """Attach the calling thread to the current request's profile, if it has one."""
+    profile = _current.get()
+    if profile is not None:
+        profile.attach()
+
+
+def bind(fn):
+    """fn, attached to the current request's profile for the duration of each call.
+
+    For work handed to another thread (run_in_threadpool), which would
+    otherwise not be sampled.
+    """
+    profile = _current.get()
+    if profile is None:
+        return fn
+
+    @functools.wraps(fn)
+    def profiled(*args, **kwargs):
+        profile.attach()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.detach()
+
+    return profiled
+
+
+def _slug(route):
+    return re.sub(r"[^\w.]+", "_", route).strip("_")
+
+
+def finish(profile, method, route, status, duration, directory=PROFILE_DIR):
+    """Stop sampling and write the profile; returns the file name."""
+    sampler.remove(profile)
+    profile.threads.clear()
+    stamp = datetime.fromtimestamp(profile.started, timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    name = f"{stamp}-{method.lower()}-{_slug(route)}-{status}-{round(duration * 1000)}ms-{profile.id}{SUFFIX}"
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp = directory / f".{name}.tmp"
+    tmp.write_text(profile.folded())
+    os.replace(tmp, directory / name)
+    prune(directory)
+    return name
+
+
+def prune(directory=PROFILE_DIR, keep=KEEP):
+    for path in sorted(Path(directory).glob("*" + SUFFIX))[:-keep]:
+        path.unlink(missing_ok=True)
+
+
+def list_profiles(directory=PROFILE_DIR):
+    """Recent profiles, newest first, described from their file names."""
+    directory = Path(directory)
+    if not directory.is_dir():
+        return []
+    profiles = []
+    for path in sorted(directory.glob("*" + SUFFIX), reverse=True):
+        match = NAME_PATTERN.match(path.name)
+        if match is None:
+            continue
+        stamp, method, route, status, duration, _ = match.groups()
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            continue
+        profiles.append({
+            "name": path.name,
+            "created": datetime.strptime(stamp, "%Y%m%dT%H%M%S%f").replace(tzinfo=timezone.utc).isoformat(),
+            "method": method.upper(),
+            "route": "/" + route.replace("_", "/"),
+            "status": int(status),
+            "duration_ms": int(duration),
+            "bytes": size,
+        })
+    return profiles
+
+
+def profile_path(name, directory=PROFILE_DIR):
+    """Path of a stored profile; FileNotFoundError for unknown or malformed names."""
+    if NAME_PATTERN.match(name) is None:
+        raise FileNotFoundError(name)
+    path = Path(directory) / name
+    if not path.is_file():
+        raise FileNotFoundError(name)
+    return path
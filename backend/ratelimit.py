@@ -0,0 +1,201 @@
+"""In-process admission control: per-key token buckets and concurrency gates.
+
+RateLimiter keeps one token bucket per key (a hashed API key, a client
+address). A request that finds the bucket empty waits for its token if
+that takes at most RATE_LIMIT_MAX_WAIT seconds and fewer than
+RATE_LIMIT_MAX_QUEUE requests are already waiting on that key; otherwise
+it is rejected at once with 429 and a Retry-After of when a token will be
+free. AdmissionGate caps how many requests do some expensive thing at
+once (e.g. calls to Groq), with a bounded queue past which it answers 503.
+
+Everything here runs on the event loop thread, so there are no locks.
+State is per process: with several workers each enforces its own limits.
+"""
+import asyncio
+import hashlib
+import math
+import os
+import time
+from collections import OrderedDict, deque
+
+BURST = int(os.getenv("RATE_LIMIT_BURST", "10"))
+MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "2"))
+MAX_QUEUE = int(os.getenv("RATE_LIMIT_MAX_QUEUE", "16"))
+# Buckets kept per limiter; the least recently used key is forgotten past this
+MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))
+# Behind a reverse proxy, identify clients by the first X-Forwarded-For hop
+TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "0") == "1"
+
+
+class Rejected(Exception):
+    """Turned into a 429/503 response with a Retry-After header."""
+
+    def __init__(self, status_code, detail, retry_after):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+def client_key(request):
+    """Address of the client that sent request."""
+    if TRUST_PROXY:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client is not None else "unknown"
+
+
+def api_key_id(api_key):
+    """Stable, non-reversible id for an API key, so raw keys aren't kept in memory."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated", "waiting")
+
+    def __init__(self, tokens, now):
+        self.tokens = tokens
+        self.updated = now
+        self.waiting = 0
+
+
+class RateLimiter:
+    """Token bucket per key: per_minute sustained, bursts of up to burst requests.
+
+    per_minute=0 disables the limiter.
+    """
+
+    def __init__(self, name, per_minute, burst=BURST, max_wait=MAX_WAIT, max_queue=MAX_QUEUE, max_keys=MAX_KEYS):
+        self.name = name
+        self.rate = per_minute / 60
+        self.burst = max(1, burst)
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self.admitted = 0
+        self.delayed = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self):
+        return self.rate > 0
+
+    def _bucket(self, key, now):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(self.burst, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+        return bucket
+
+    async def acquire(self, key, cost=1):
+        """Take cost tokens for key, waiting briefly if they are about to free up.
+
+        A request costing more than the burst is let through once the bucket
+        is full, leaving it in debt that later requests wait out.
+        """
+        if not self.enabled:
+            return
+        bucket = self._bucket(key, time.monotonic())
+        # Negative balances are tokens already promised to waiting requests
+        bucket.tokens -= cost
+        shortfall = -bucket.tokens - max(0, cost - self.burst)
+        if shortfall <= 0:
+            self.admitted += 1
+            return
+        wait = shortfall / self.rate
+        if wait > self.max_wait or bucket.waiting >= self.max_queue:
+            bucket.tokens += cost
+            self.rejected += 1
+            raise Rejected(429, f"Rate limit exceeded for {self.name}; retry in {math.ceil(wait)}s", wait)
+
+        bucket.waiting += 1
+        try:
+            await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            bucket.tokens = min(self.burst, bucket.tokens + cost)
+            raise
+        finally:
+            bucket.waiting -= 1
+        self.delayed += 1
+        self.admitted += 1
+
+    def stats(self):
+        return {
+            "per_minute": round(self.rate * 60, 3),
+            "burst": self.burst,
+            "keys": len(self._buckets),
+            "admitted": self.admitted,
+            "delayed": self.delayed,
+            "rejected": self.rejected,
+        }
+
+
+class AdmissionGate:
+    """At most limit holders at once; up to max_queue more wait in FIFO order, the rest get 503.
+
+    limit=0 disables the gate.
+    """
+
+    def __init__(self, name, limit, max_queue, retry_after=1):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self._waiters = deque()
+        self.rejected = 0
+
+    async def acquire(self):
+        if (self.limit <= 0 or self.in_flight < self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise Rejected(503, f"Too many {self.name} requests in progress", self.retry_after)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # release() hands its slot straight to the next waiter
+            await waiter
+        except asyncio.CancelledError:
+            if not waiter.cancelled():
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    async def run(self, coro):
+        """Await coro while holding a slot."""
+        try:
+            await self.acquire()
+        except BaseException:
+            coro.close()
+            raise
+        try:
+            return await coro
+        finally:
+            self.release()
+
+    def stats(self):
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+        }
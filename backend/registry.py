@@ -0,0 +1,271 @@
+"""Versioned model registry with background hot-swap.
+
+Layout (MODEL_REGISTRY_DIR, default backend/models/registry):
+
+    ACTIVE                  # name of the version workers should serve
+    <version>/
+        manifest.json       # files, their hashes, creation time, metadata
+        admission_model.pkl
+        scaler.pkl
+        X_train.pkl         # SHAP background
+        lean_model.npz      # memory-mapped compiled model (when exportable)
+
+A version is the content hash of its model + scaler pickles, so
+publishing the same pair twice is a no-op. Switching ACTIVE is a single
+atomic file replace; each worker's RegistryWatcher notices it, loads and
+warms the new version off the event loop, then swaps it in.
+
+CLI usage:
+    python -m backend.registry publish --model m.pkl --scaler s.pkl --background X_train.pkl
+    python -m backend.registry activate <version>
+    python -m backend.registry list
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+from backend import inference
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_DIR = Path(os.getenv("MODEL_REGISTRY_DIR", inference.BASE_DIR / "models" / "registry"))
+# Seconds between checks of ACTIVE; 0 disables hot-swap
+POLL_SECONDS = float(os.getenv("MODEL_REGISTRY_POLL", "5"))
+
+MANIFEST_NAME = "manifest.json"
+ACTIVE_NAME = "ACTIVE"
+MODEL_FILE = "admission_model.pkl"
+SCALER_FILE = "scaler.pkl"
+BACKGROUND_FILE = "X_train.pkl"
+LEAN_FILE = "lean_model.npz"
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_atomic(path, text):
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(text)
+    tmp_path.replace(path)
+
+
+def read_manifest(version, registry_dir=REGISTRY_DIR):
+    with open(Path(registry_dir) / version / MANIFEST_NAME) as f:
+        return json.load(f)
+
+
+def active_version(registry_dir=REGISTRY_DIR):
+    """Version named in ACTIVE, or None when the registry isn't in use."""
+    try:
+        return (Path(registry_dir) / ACTIVE_NAME).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def list_versions(registry_dir=REGISTRY_DIR):
+    """Manifests of every published version, oldest first."""
+    manifests = []
+    for manifest_path in Path(registry_dir).glob(f"*/{MANIFEST_NAME}"):
+        with open(manifest_path) as f:
+            manifests.append(json.load(f))
+    return sorted(manifests, key=lambda m: m["created_at"])
+
+
+def set_active(version, registry_dir=REGISTRY_DIR):
+    """Point ACTIVE at an already published version."""
+    read_manifest(version, registry_dir)
+    _write_atomic(Path(registry_dir) / ACTIVE_NAME, version + "\n")
+
+
+def publish(model_path, scaler_path, background_path=None, registry_dir=REGISTRY_DIR, activate=True, metadata=None):
+    """Copy a model/scaler pair into the registry and return its manifest.
+
+    The version directory is staged under a temporary name and renamed
+    into place, so watchers never see a half-written version.
+    """
+    registry_dir = Path(registry_dir)
+    version = inference.artifact_version(model_path, scaler_path)
+    target = registry_dir / version
+
+    if not (target / MANIFEST_NAME).exists():
+        registry_dir.mkdir(parents=True, exist_ok=True)
+        staging = registry_dir / f".{version}.{os.getpid()}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir()
+        files = {"model": MODEL_FILE, "scaler": SCALER_FILE, "background": BACKGROUND_FILE}
+        shutil.copyfile(model_path, staging / MODEL_FILE)
+        shutil.copyfile(scaler_path, staging / SCALER_FILE)
+        # Without one of its own, a version reuses the bundled training rows
+        shutil.copyfile(background_path or inference.BACKGROUND_PATH, staging / BACKGROUND_FILE)
+
+        from backend.artifacts import export_pickles
+        from backend.lean import UnsupportedModel
+
+        try:
+            export_pickles(staging / MODEL_FILE, staging / SCALER_FILE, staging / BACKGROUND_FILE,
+                           staging / LEAN_FILE, version)
+            files["lean"] = LEAN_FILE
+        except (UnsupportedModel, AssertionError, TypeError) as e:
+            logger.warning("Publishing %s without a lean artifact: %s", version, e)
+
+        manifest = {
+            "version": version,
+            "created_at": time.time(),
+            "files": files,
+            "sha256": {name: _sha256(staging / filename) for name, filename in files.items()},
+            "metadata": metadata or {},
+        }
+        (staging / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2))
+        try:
+            staging.rename(target)
+        except OSError:
+            # Another process published the same version first
+            shutil.rmtree(staging, ignore_errors=True)
+
+    if activate:
+        set_active(version, registry_dir)
+    return read_manifest(version, registry_dir)
+
+
+def load_version(version, registry_dir=REGISTRY_DIR):
+    """Load a published version after checking its files against the manifest."""
+    version_dir = Path(registry_dir) / version
+    manifest = read_manifest(version, registry_dir)
+    files = manifest["files"]
+    for name in ("model", "scaler"):
+        if _sha256(version_dir / files[name]) != manifest["sha256"][name]:
+            raise ValueError(f"{version}/{files[name]} does not match its manifest")
+    return inference.load_model(
+        version_dir / files["model"],
+        version_dir / files["scaler"],
+        version_dir / files["background"] if "background" in files else inference.BACKGROUND_PATH,
+        version_dir / files["lean"] if "lean" in files else None,
+        version=version,
+    )
+
+
+def load_active(registry_dir=REGISTRY_DIR):
+    """The ACTIVE registry version, or the bundled model if there is none."""
+    version = active_version(registry_dir)
+    if version is not None:
+        try:
+            return load_version(version, registry_dir)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Could not load registry version %s, using bundled model: %s", version, e)
+    return inference.load_model()
+
+
+class RegistryWatcher:
+    """Polls ACTIVE and hot-swaps the served model when it changes.
+
+    The new version is loaded and passed to warm_up in a worker thread;
+    only once that succeeds is it activated, so requests never wait on a
+    cold model. A version that fails to load is remembered and not
+    retried by this worker.
+    """
+
+    def __init__(self, registry_dir=REGISTRY_DIR, poll_seconds=POLL_SECONDS, warm_up=None):
+        self.registry_dir = Path(registry_dir)
+        self.poll_seconds = poll_seconds
+        self.warm_up = warm_up
+        self._task = None
+        self.swaps = 0
+        self.failed = {}
+        self.last_check = None
+
+    def _prepare(self, version):
+        model = load_version(version, self.registry_dir)
+        if self.warm_up is not None:
+            self.warm_up(model)
+        return model
+
+    async def check(self):
+        """Swap in the ACTIVE version if it differs from the served one."""
+        self.last_check = time.time()
+        version = active_version(self.registry_dir)
+        if version is None or version == inference.current().version or version in self.failed:
+            return False
+        try:
+            model = await asyncio.get_running_loop().run_in_executor(None, self._prepare, version)
+        except Exception as e:
+            logger.error("Not switching to model %s: %s", version, e)
+            self.failed[version] = str(e)
+            return False
+        inference.activate(model)
+        self.swaps += 1
+        return True
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                await self.check()
+            except Exception:
+                logger.exception("Model registry check failed")
+
+    def start(self):
+        if self.poll_seconds > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def stats(self):
+        return {
+            "registry_dir": str(self.registry_dir),
+            "watching": self._task is not None and not self._task.done(),
+            "poll_seconds": self.poll_seconds,
+            "active_version": active_version(self.registry_dir),
+            "swaps": self.swaps,
+            "failed_versions": self.failed,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish and activate model versions.")
+    parser.add_argument("--registry", default=str(REGISTRY_DIR), help="Registry directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    pub = sub.add_parser("publish", help="Add a model/scaler pair to the registry")
+    pub.add_argument("--model", required=True)
+    pub.add_argument("--scaler", required=True)
+    pub.add_argument("--background", help="Scaled training rows for SHAP (X_train.pkl)")
+    pub.add_argument("--no-activate", action="store_true", help="Publish without serving it")
+    act = sub.add_parser("activate", help="Serve a published version")
+    act.add_argument("version")
+    sub.add_parser("list", help="Show published versions")
+    args = parser.parse_args(argv)
+
+    if args.command == "publish":
+        manifest = publish(args.model, args.scaler, args.background, args.registry, activate=not args.no_activate)
+        print(json.dumps(manifest, indent=2))
+    elif args.command == "activate":
+        set_active(args.version, args.registry)
+        print(f"Active model -> {args.version}", file=sys.stderr)
+    else:
+        active = active_version(args.registry)
+        for manifest in list_versions(args.registry):
+            marker = "*" if manifest["version"] == active else " "
+            created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(manifest["created_at"]))
+            print(f"{marker} {manifest['version']}  {created}  {', '.join(manifest['files'])}")
+
+
+if __name__ == "__main__":
+    main()
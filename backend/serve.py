@@ -0,0 +1,74 @@
+"""Run the API as several worker processes sharing one copy of the model.
+
+Every worker memory-maps backend/models/lean_model.npz read-only, so the
+model tables and SHAP background live once in the page cache no matter
+how many workers are started. The parent process makes sure that file
+(and the university index cache) is current before any worker starts,
+so workers never unpickle the model or race to rebuild shared files.
+
+Usage:
+    python -m backend.serve --workers 4 --port 8000
+    python -m backend.serve --reload           # single worker, for development
+"""
+import argparse
+import logging
+import os
+import sys
+
+logger = logging.getLogger(__name__)
+
+# Falls back to one worker per core
+DEFAULT_WORKERS = int(os.getenv("BACKEND_WORKERS", "0")) or os.cpu_count() or 1
+# Explain warm-up is opt-in (--warmup predict,explain): it loads the
+# sklearn estimators into every worker, which the mapped model avoids
+DEFAULT_WARMUP = os.getenv("BACKEND_WARMUP", "predict")
+
+
+def prepare_shared_artifacts():
+    """Export the lean artifact and university cache once, before forking workers."""
+    from backend import inference
+    from backend.artifacts import export_pickles, load_lean
+    from backend.universities import UniversityIndex
+
+    UniversityIndex.load(inference.BASE_DIR.parent / "data" / "UpdatedWorldUniRank23.xlsx")
+
+    path = inference.LEAN_ARTIFACT_PATH
+    try:
+        if load_lean(path)[2]["source_version"] == inference.BUNDLED_VERSION:
+            return True
+    except (OSError, ValueError, KeyError):
+        pass
+    try:
+        tmp_path = path.with_name(path.stem + ".tmp.npz")
+        export_pickles(inference.MODEL_PATH, inference.SCALER_PATH, inference.BACKGROUND_PATH, tmp_path)
+        tmp_path.replace(path)
+        logger.info("Exported %s for version %s", path.name, inference.BUNDLED_VERSION)
+        return True
+    except Exception as e:
+        logger.warning("Workers will load the pickled model individually: %s", e)
+        return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the backend with N workers sharing the mapped model.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--reload", action="store_true", help="Single auto-reloading worker for development")
+    parser.add_argument("--warmup", default=DEFAULT_WARMUP, help="Paths each worker runs once before serving")
+    args = parser.parse_args(argv)
+    # Read by backend.main in each worker
+    os.environ["BACKEND_WARMUP"] = args.warmup
+
+    logging.basicConfig(level=logging.INFO)
+    import uvicorn
+
+    if not prepare_shared_artifacts() and args.workers > 1:
+        print("warning: no lean artifact; each worker holds its own model copy", file=sys.stderr)
+
+    workers = 1 if args.reload else max(1, args.workers)
+    uvicorn.run("backend.main:app", host=args.host, port=args.port, workers=workers, reload=args.reload)
+
+
+if __name__ == "__main__":
+    main()
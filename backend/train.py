@@ -0,0 +1,269 @@
+"""Reproducible training: cross-validated model search plus serving benchmarks.
+
+Every configuration in SEARCH_SPACE is scored with K-fold cross-validation
+on the training split, one configuration per process-pool task. The best
+configuration of each family is refit and measured for held-out accuracy,
+single-row serving latency (through the same compiled predictor the API
+uses) and artifact size. The chosen model is written in the layout
+backend.registry expects, with a report.json of every measurement.
+
+CLI usage:
+    python -m backend.train --output build/model
+    python -m backend.train --families linear,xgboost --max-latency-ms 0.5 --publish
+"""
+import argparse
+import io
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from backend.inference import BASE_DIR, build_predictor
+
+DATA_PATH = BASE_DIR.parent / "data" / "admission_data.csv"
+TARGET_COLUMN = "Chance of Admit"
+# Same split as notebooks/admission.ipynb
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+CV_FOLDS = 5
+LATENCY_CALLS = 200
+
+
+def _grid(**axes):
+    return [dict(zip(axes, values)) for values in itertools.product(*axes.values())]
+
+
+SEARCH_SPACE = {
+    # alpha=0 is plain least squares, as in the notebook
+    "linear": _grid(alpha=[0.0, 0.1, 1.0, 10.0]),
+    "random_forest": _grid(n_estimators=[100, 300], max_depth=[None, 8], min_samples_leaf=[1, 4]),
+    "xgboost": _grid(n_estimators=[200, 500], max_depth=[3, 5], learning_rate=[0.03, 0.1]),
+    "catboost": _grid(iterations=[300, 800], depth=[4, 6], learning_rate=[0.03, 0.1]),
+}
+
+
+def make_estimator(family, params):
+    """Unfitted estimator for one search-space entry, single-threaded for the pool."""
+    if family == "linear":
+        from sklearn.linear_model import LinearRegression, Ridge
+
+        return LinearRegression() if params["alpha"] == 0 else Ridge(alpha=params["alpha"])
+    if family == "random_forest":
+        from sklearn.ensemble import RandomForestRegressor
+
+        return RandomForestRegressor(random_state=RANDOM_STATE, n_jobs=1, **params)
+    if family == "xgboost":
+        from xgboost import XGBRegressor
+
+        return XGBRegressor(random_state=RANDOM_STATE, n_jobs=1, **params)
+    if family == "catboost":
+        from catboost import CatBoostRegressor
+
+        return CatBoostRegressor(random_seed=RANDOM_STATE, thread_count=1, verbose=0,
+                                 allow_writing_files=False, **params)
+    raise ValueError(f"Unknown model family: {family}")
+
+
+def load_data(path=DATA_PATH):
+    """(features, target) as float arrays; column names are stripped like in the notebook."""
+    import pandas as pd
+
+    df = pd.read_csv(path)
+    df.columns = df.columns.str.strip()
+    return df.drop(TARGET_COLUMN, axis=1).to_numpy(dtype=np.float64), df[TARGET_COLUMN].to_numpy(dtype=np.float64)
+
+
+def fit(family, params, X, y):
+    """Fit scaler + model on raw rows; returns (model, scaler)."""
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler().fit(X)
+    model = make_estimator(family, params).fit(scaler.transform(X), y)
+    return model, scaler
+
+
+def regression_metrics(y_true, y_pred):
+    error = y_pred - y_true
+    return {
+        "rmse": float(np.sqrt(np.mean(error ** 2))),
+        "mae": float(np.mean(np.abs(error))),
+        "r2": float(1 - np.sum(error ** 2) / np.sum((y_true - y_true.mean()) ** 2)),
+    }
+
+
+def cross_validate(family, params, X, y, folds=CV_FOLDS):
+    """Mean metrics over K folds; the scaler is refit inside every fold."""
+    from sklearn.model_selection import KFold
+
+    scores = []
+    for train_idx, val_idx in KFold(folds, shuffle=True, random_state=RANDOM_STATE).split(X):
+        model, scaler = fit(family, params, X[train_idx], y[train_idx])
+        scores.append(regression_metrics(y[val_idx], model.predict(scaler.transform(X[val_idx]))))
+    result = {key: float(np.mean([s[key] for s in scores])) for key in scores[0]}
+    result["rmse_std"] = float(np.std([s["rmse"] for s in scores]))
+    return {"family": family, "params": params, "cv": result}
+
+
+def search(X, y, families, workers=None):
+    """Cross-validate every configuration of the given families in parallel."""
+    tasks = [(family, params) for family in families for params in SEARCH_SPACE[family]]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(cross_validate, family, params, X, y) for family, params in tasks]
+        return [future.result() for future in futures]
+
+
+def measure_latency(predict, rows, calls=LATENCY_CALLS):
+    """p50/p95 milliseconds of predict() on single rows, after a short warm-up."""
+    for row in rows[:10]:
+        predict(row[None, :])
+    timings = []
+    for i in range(calls):
+        row = rows[i % len(rows)][None, :]
+        start = time.perf_counter()
+        predict(row)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"p50": float(np.percentile(timings, 50)), "p95": float(np.percentile(timings, 95))}
+
+
+def artifact_sizes(model, scaler, predictor, background):
+    """Bytes of the pickled model + scaler and of the exported lean artifact."""
+    import joblib
+
+    from backend.artifacts import export_lean
+    from backend.lean import UnsupportedModel
+
+    buf = io.BytesIO()
+    joblib.dump((model, scaler), buf)
+    sizes = {"pickle_bytes": buf.tell(), "lean_bytes": None}
+    try:
+        buf = io.BytesIO()
+        export_lean(predictor, buf, background=background)
+        sizes["lean_bytes"] = buf.tell()
+    except (UnsupportedModel, TypeError):
+        pass
+    return sizes
+
+
+def evaluate(family, params, X_train, y_train, X_test, y_test):
+    """Refit on the training split and measure what serving it would cost."""
+    model, scaler = fit(family, params, X_train, y_train)
+    background = scaler.transform(X_train)
+    predictor = build_predictor(model, scaler, background)
+    return {
+        "test": regression_metrics(y_test, predictor.predict(X_test)),
+        "predictor": type(predictor).__name__,
+        "latency_ms": measure_latency(predictor.predict, X_test),
+        "sklearn_latency_ms": measure_latency(lambda row: model.predict(scaler.transform(row)), X_test),
+        **artifact_sizes(model, scaler, predictor, background),
+    }, (model, scaler, background)
+
+
+def pareto_front(candidates):
+    """Families not beaten on both CV RMSE and p50 latency by another family."""
+    front = []
+    for c in candidates:
+        rmse, latency = c["cv"]["rmse"], c["latency_ms"]["p50"]
+        dominated = any(
+            o["cv"]["rmse"] <= rmse and o["latency_ms"]["p50"] <= latency
+            and (o["cv"]["rmse"] < rmse or o["latency_ms"]["p50"] < latency)
+            for o in candidates if o is not c
+        )
+        if not dominated:
+            front.append(c["family"])
+    return front
+
+
+def write_artifacts(output_dir, model, scaler, background, report):
+    """Write the files backend.registry.publish expects, plus report.json."""
+    import joblib
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = {
+        "model": output_dir / "admission_model.pkl",
+        "scaler": output_dir / "scaler.pkl",
+        "background": output_dir / "X_train.pkl",
+    }
+    joblib.dump(model, paths["model"])
+    joblib.dump(scaler, paths["scaler"])
+    joblib.dump(background, paths["background"])
+    (output_dir / "report.json").write_text(json.dumps(report, indent=2))
+    return paths
+
+
+def train(families, output_dir, data_path=DATA_PATH, workers=None, max_latency_ms=None):
+    """Search, benchmark and write the selected model; returns the report."""
+    from sklearn.model_selection import train_test_split
+
+    X, y = load_data(data_path)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+
+    results = search(X_train, y_train, families, workers)
+    fitted = {}
+    candidates = []
+    for family in families:
+        best = min((r for r in results if r["family"] == family), key=lambda r: r["cv"]["rmse"])
+        measurements, fitted[family] = evaluate(family, best["params"], X_train, y_train, X_test, y_test)
+        candidates.append({**best, **measurements})
+        print(f"{family:>14}: cv rmse {best['cv']['rmse']:.4f}  test rmse {measurements['test']['rmse']:.4f}  "
+              f"p50 {measurements['latency_ms']['p50']:.3f} ms", file=sys.stderr)
+
+    front = pareto_front(candidates)
+    eligible = [c for c in candidates if c["family"] in front
+                and (max_latency_ms is None or c["latency_ms"]["p50"] <= max_latency_ms)]
+    if not eligible:
+        raise ValueError(f"No candidate serves under {max_latency_ms} ms")
+    chosen = min(eligible, key=lambda c: c["cv"]["rmse"])
+
+    report = {
+        "data": {"path": str(data_path), "rows": len(X), "test_size": TEST_SIZE, "cv_folds": CV_FOLDS},
+        "search": results,
+        "candidates": candidates,
+        "pareto_front": front,
+        "selected": {"family": chosen["family"], "params": chosen["params"], "max_latency_ms": max_latency_ms},
+    }
+    model, scaler, background = fitted[chosen["family"]]
+    report["artifacts"] = {name: str(path) for name, path in write_artifacts(output_dir, model, scaler, background, report).items()}
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train, compare and export admission models.")
+    parser.add_argument("--data", default=str(DATA_PATH), help="CSV in the admission_data.csv schema")
+    parser.add_argument("--output", default="build/model", help="Directory for the selected model's artifacts")
+    parser.add_argument("--families", default=",".join(SEARCH_SPACE), help="Comma-separated model families")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Cross-validation processes")
+    parser.add_argument("--max-latency-ms", type=float, help="Only select models with p50 latency under this")
+    parser.add_argument("--publish", action="store_true", help="Publish the selected model to the registry")
+    parser.add_argument("--no-activate", action="store_true", help="With --publish, don't serve it yet")
+    args = parser.parse_args(argv)
+
+    families = [f.strip() for f in args.families.split(",") if f.strip()]
+    unknown = set(families) - set(SEARCH_SPACE)
+    if unknown:
+        parser.error(f"Unknown families: {', '.join(sorted(unknown))}")
+
+    report = train(families, args.output, args.data, args.workers, args.max_latency_ms)
+    selected = report["selected"]["family"]
+    print(f"Selected {selected} (Pareto front: {', '.join(report['pareto_front'])}) -> {args.output}", file=sys.stderr)
+
+    if args.publish:
+        from backend import registry
+
+        chosen = next(c for c in report["candidates"] if c["family"] == selected)
+        manifest = registry.publish(
+            report["artifacts"]["model"], report["artifacts"]["scaler"], report["artifacts"]["background"],
+            activate=not args.no_activate,
+            metadata={"family": selected, "params": chosen["params"], "cv": chosen["cv"],
+                      "test": chosen["test"], "latency_ms": chosen["latency_ms"]},
+        )
+        print(f"Published version {manifest['version']}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
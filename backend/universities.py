@@ -0,0 +1,239 @@
+import pickle
+import re
+from pathlib import Path
+
+import numpy as np
+
+from backend.metrics import stage
+
+CACHE_VERSION = 1
+
+# Words skipped when building acronyms, so "MIT" matches
+# "Massachusetts Institute of Technology"
+ACRONYM_STOPWORDS = {"of", "the", "and", "&", "for", "at", "in", "de", "la", "du", "des", "di", "-"}
+# Words that say what kind of institution it is rather than which one, so
+# "oxford" names "University of Oxford" exactly but not "Oxford Brookes University"
+GENERIC_WORDS = ACRONYM_STOPWORDS | {
+    "university", "universiti", "universitas", "universitat", "universiteit", "université", "università",
+    "universidad", "universidade", "college", "institute", "institut", "instituto", "school", "escuela",
+    # "Université" as it appears in the sheet's mis-decoded names
+    "universitã",
+}
+
+# Score of each kind of match; trigram similarity fills in below these
+EXACT_SCORE = 1.0
+DISTINCTIVE_SCORE = 0.97
+ACRONYM_SCORE = 0.95
+WHOLE_WORD_SCORE = 0.92
+PREFIX_SCORE = 0.9
+WORD_PREFIX_SCORE = 0.8
+
+
+def normalize_name(name):
+    """Lowercase and collapse whitespace so lookups ignore spacing/case."""
+    return " ".join(str(name).lower().split())
+
+
+def parse_rank(rank_str):
+    """Parse a rank cell (handles ranges like "101-150" by taking the midpoint)."""
+    try:
+        if "-" in rank_str:
+            low, high = map(int, rank_str.split("-"))
+            return (low + high) // 2
+        return int(rank_str)
+    except (TypeError, ValueError):
+        return 1000
+
+
+def trigrams(text):
+    """Character trigrams of a normalized string, padded at word boundaries."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def words(text):
+    return re.findall(r"\w+", text)
+
+
+def distinctive_words(text):
+    """The words of a normalized name that aren't GENERIC_WORDS."""
+    return frozenset(w for w in words(text) if w not in GENERIC_WORDS)
+
+
+def acronym(text):
+    return "".join(w[0] for w in text.split() if w not in ACRONYM_STOPWORDS and w[0].isalnum())
+
+
+def rank_to_rating(rank):
+    """Convert a world rank to the 1-5 university rating used by the model."""
+    if rank <= 100:
+        return 5
+    elif rank <= 250:
+        return 4
+    elif rank <= 500:
+        return 3
+    return 2
+
+
+class UniversityIndex:
+    """In-memory university lookup built once from the rankings sheet.
+
+    Every row is parsed up front, so a lookup is a single dict hit with
+    no pandas or rank parsing involved.
+    """
+
+    def __init__(self, records):
+        # records: list of dicts with name, rank_str, rank, rating, country
+        self.records = records
+        self.by_name = {}
+        self.norm_names = []
+        self.gram_counts = []
+        self.postings = {}
+        self.word_postings = {}
+        self.by_distinctive = {}
+        self.by_acronym = {}
+        self.ranks = np.array([rec["rank"] for rec in records], dtype=np.int32)
+        for i, rec in enumerate(records):
+            norm = normalize_name(rec["name"])
+            self.norm_names.append(norm)
+            # First occurrence wins, same as the old df.iloc[0] behaviour
+            self.by_name.setdefault(norm, i)
+
+            grams = trigrams(norm)
+            self.gram_counts.append(len(grams))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(i)
+
+            for word in set(words(norm)):
+                self.word_postings.setdefault(word, []).append(i)
+            key = distinctive_words(norm)
+            if key:
+                self.by_distinctive.setdefault(key, []).append(i)
+
+            short = acronym(norm)
+            if len(short) >= 2:
+                self.by_acronym.setdefault(short, []).append(i)
+
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in self.postings.items()}
+        self.word_postings = {word: np.array(ids, dtype=np.int32) for word, ids in self.word_postings.items()}
+
+        # Sorted suffixes starting at each word boundary, so prefix and
+        # word-prefix matches are a binary search instead of a scan
+        suffixes = []
+        for i, norm in enumerate(self.norm_names):
+            pos = 0
+            for word in norm.split(" "):
+                suffixes.append((norm[pos:], i, pos == 0))
+                pos += len(word) + 1
+        suffixes.sort()
+        self.suffixes = np.array([sfx for sfx, _, _ in suffixes])
+        self.suffix_ids = np.array([i for _, i, _ in suffixes], dtype=np.int32)
+        self.suffix_boost = np.array([PREFIX_SCORE if at_start else WORD_PREFIX_SCORE for _, _, at_start in suffixes])
+        self.gram_counts = np.array(self.gram_counts, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.records)
+
+    def lookup(self, name):
+        i = self.by_name.get(normalize_name(name))
+        return None if i is None else self.records[i]
+
+    def search(self, query, limit=10):
+        """Fuzzy/prefix/acronym search over university names.
+
+        Candidates are scored by trigram Dice similarity, with boosts for
+        exact, distinctive-word, acronym, whole-word, prefix and word-prefix
+        matches, in that order. Returns ``(record, score)`` pairs sorted
+        best first, scores in [0, 1].
+        """
+        q = normalize_name(query)
+        if not q:
+            return []
+
+        q_grams = trigrams(q)
+        hits = [self.postings[gram] for gram in q_grams if gram in self.postings]
+        overlap = np.bincount(np.concatenate(hits), minlength=len(self.records)) if hits else np.zeros(len(self.records), dtype=np.int64)
+        scores = 2.0 * overlap / (len(q_grams) + self.gram_counts)
+
+        lo, hi = np.searchsorted(self.suffixes, [q, q + "\uffff"])
+        np.maximum.at(scores, self.suffix_ids[lo:hi], self.suffix_boost[lo:hi])
+
+        # Every query word appears whole in the name: "oxford" in "University of Oxford"
+        q_words = set(words(q))
+        if q_words and q_words <= self.word_postings.keys():
+            ids = self.word_postings[min(q_words, key=lambda w: len(self.word_postings[w]))]
+            for word in q_words:
+                ids = np.intersect1d(ids, self.word_postings[word], assume_unique=True)
+            scores[ids] = np.maximum(scores[ids], WHOLE_WORD_SCORE)
+
+        if " " not in q:
+            for i in self.by_acronym.get(q, ()):
+                scores[i] = max(scores[i], ACRONYM_SCORE)
+
+        for i in self.by_distinctive.get(distinctive_words(q), ()):
+            scores[i] = max(scores[i], DISTINCTIVE_SCORE)
+
+        exact = self.by_name.get(q)
+        if exact is not None:
+            scores[exact] = EXACT_SCORE
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > limit:
+            top = np.argpartition(-scores[candidates], limit - 1)[:limit]
+            cutoff = scores[candidates[top]].min()
+            # Keep ties at the cutoff so rank can break them deterministically
+            candidates = candidates[scores[candidates] >= cutoff]
+        order = np.lexsort((self.ranks[candidates], -scores[candidates]))[:limit]
+        return [(self.records[i], round(float(scores[i]), 4)) for i in candidates[order]]
+
+    @classmethod
+    def from_excel(cls, xlsx_path):
+        import pandas as pd
+
+        df = pd.read_excel(xlsx_path)
+        records = []
+        for name, rank_cell, country in zip(df["University Name"], df["Rank"], df["Country"]):
+            if pd.isna(name):
+                continue
+            rank_str = str(rank_cell)
+            rank = parse_rank(rank_str)
+            records.append({
+                "name": str(name),
+                "rank_str": rank_str,
+                "rank": rank,
+                "rating": rank_to_rating(rank),
+                "country": "Unknown" if pd.isna(country) else str(country),
+            })
+        return cls(records)
+
+    @classmethod
+    def load(cls, xlsx_path, cache_path=None):
+        """Load from the binary cache next to the xlsx, rebuilding it when stale.
+
+        The cache is keyed on the sheet's mtime and size, so replacing the
+        rankings file triggers a rebuild on the next startup.
+        """
+        xlsx_path = Path(xlsx_path)
+        cache_path = Path(cache_path) if cache_path else xlsx_path.with_suffix(".idx.pkl")
+        stat = xlsx_path.stat()
+        stamp = (CACHE_VERSION, stat.st_mtime_ns, stat.st_size)
+
+        try:
+            with open(cache_path, "rb") as f:
+                cached = pickle.load(f)
+            if cached.get("stamp") == stamp:
+                return cls(cached["records"])
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, KeyError):
+            pass
+
+        with stage("excel_load"):
+            index = cls.from_excel(xlsx_path)
+        try:
+            tmp_path = cache_path.with_suffix(cache_path.suffix + ".tmp")
+            with open(tmp_path, "wb") as f:
+                pickle.dump({"stamp": stamp, "records": index.records}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            tmp_path.replace(cache_path)
+        except OSError:
+            # Read-only deployments just keep the in-memory index
+            pass
+        return index
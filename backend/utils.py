@@ -1,14 +1,76 @@
+import asyncio
 import json
+import os
+import random
 import re
-import requests
+from concurrent.futures import ThreadPoolExecutor
 
-def score_sop(text, api_key):
-    """Score SOP using Groq API via direct HTTP requests"""
-    if not api_key or api_key == "":
-        raise ValueError("GROQ_API_KEY is not set or empty")
+import httpx
 
-    try:
-        prompt = f"""Rate this Statement of Purpose on 7 criteria (1-5 scale).
+from backend.cache import ResultCache, content_key
+from backend.metrics import GROQ_ATTEMPT_SECONDS
+from backend.ratelimit import AdmissionGate
+
+# Point this at a local stub (see benchmarks/stub_groq.py) to test offline
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+MODELS_TO_TRY = ["llama-3.3-70b-versatile", "llama-3.1-8b-instant", "mixtral-8x7b-32768"]
+# Bump whenever build_prompt() changes so cached scores from the old prompt are ignored
+PROMPT_VERSION = "1"
+
+# Per-model attempt deadline and overall budget for one score_sop call, in seconds
+ATTEMPT_TIMEOUT = float(os.getenv("GROQ_ATTEMPT_TIMEOUT", "20"))
+TOTAL_BUDGET = float(os.getenv("GROQ_TOTAL_BUDGET", "45"))
+MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "100"))
+# "hedged" launches the next model after HEDGE_DELAY seconds without an answer;
+# "sequential" only moves on once the current attempt has failed
+FALLBACK_STRATEGY = os.getenv("GROQ_FALLBACK_STRATEGY", "hedged")
+HEDGE_DELAY = float(os.getenv("GROQ_HEDGE_DELAY", "3"))
+# Fraction of scorings that try models in configured order, so a model
+# ranked down on old figures gets measured again
+EXPLORE_RATE = float(os.getenv("GROQ_EXPLORE_RATE", "0.05"))
+# SOP scorings allowed to call Groq at once; up to GROQ_MAX_QUEUE more wait, the rest get 503
+MAX_IN_FLIGHT = int(os.getenv("GROQ_MAX_IN_FLIGHT", "32"))
+MAX_QUEUE = int(os.getenv("GROQ_MAX_QUEUE", "64"))
+
+groq_gate = AdmissionGate("Groq", MAX_IN_FLIGHT, MAX_QUEUE)
+
+_client = None
+_client_loop = None
+
+# Scores keyed on the normalized SOP text; set SOP_CACHE_DB to persist them
+sop_cache = ResultCache(
+    maxsize=int(os.getenv("SOP_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("SOP_CACHE_TTL", str(7 * 24 * 3600))),
+    db_path=os.getenv("SOP_CACHE_DB") or None,
+)
+
+
+def get_client():
+    """Shared keep-alive AsyncClient for the running event loop."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    # Connections are bound to the loop that opened them, so tests or
+    # scripts that spin up fresh loops get a fresh pool
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            base_url=GROQ_BASE_URL,
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+            timeout=httpx.Timeout(ATTEMPT_TIMEOUT, connect=5.0),
+        )
+        _client_loop = loop
+    return _client
+
+
+async def close_client():
+    global _client
+    # A client from another (already finished) loop can't be closed from here
+    if _client is not None and not _client.is_closed and _client_loop is asyncio.get_running_loop():
+        await _client.aclose()
+    _client = None
+
+
+def build_prompt(text):
+    return f"""Rate this Statement of Purpose on 7 criteria (1-5 scale).
 Return ONLY a valid JSON object with no additional text or markdown formatting.
 
 Criteria to rate:
@@ -26,70 +88,267 @@ Expected JSON format (no markdown, no code blocks):
 SOP Text:
 {text}"""
 
-        # Use direct HTTP requests instead of Groq SDK
-        url = "https://api.groq.com/openai/v1/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
+
+def parse_scores(response_text):
+    """Turn the model's reply into the {"scores", "average"} result dict."""
+    # Extract JSON from response
+    json_match = re.search(r'```json\s*(.+?)\s*```', response_text, re.DOTALL)
+    if json_match:
+        json_str = json_match.group(1)
+    else:
+        start = response_text.find('{')
+        end = response_text.rfind('}')
+        if start != -1 and end != -1:
+            json_str = response_text[start:end+1]
+        else:
+            json_str = response_text
+
+    # Parse JSON
+    try:
+        scores = json.loads(json_str)
+    except ValueError:
+        return {"scores": {}, "average": 0, "error": "Failed to parse JSON response"}
+
+    if not isinstance(scores, dict) or not scores:
+        return {"scores": {}, "average": 0, "error": "Invalid scores format"}
+
+    try:
+        avg_score = sum(float(v) for v in scores.values()) / len(scores)
+    except (TypeError, ValueError):
+        return {"scores": scores, "average": 0, "error": "Score values are not numeric"}
+
+    return {"scores": scores, "average": round(avg_score, 2)}
+
+
+async def request_completion(client, model, prompt, api_key, timeout):
+    """One chat completion attempt; returns the reply text or raises."""
+    payload = {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 0.7,
+        "max_tokens": 1024
+    }
+    headers = {"Authorization": f"Bearer {api_key}"}
+    response = await client.post("/chat/completions", headers=headers, json=payload, timeout=timeout)
+    if response.status_code != 200:
+        raise RuntimeError(f"HTTP {response.status_code}: {response.text}")
+    return response.json()["choices"][0]["message"]["content"].strip()
+
+
+class ModelStats:
+    """Running latency/success figures per model, used to order attempts."""
+
+    def __init__(self, models, alpha=0.2, explore=EXPLORE_RATE):
+        self.alpha = alpha
+        self.explore = explore
+        self.stats = {m: self._new_entry() for m in models}
+
+    @staticmethod
+    def _new_entry():
+        return {"attempts": 0, "successes": 0, "cancelled": 0, "ewma_latency": None}
+
+    def _update_latency(self, entry, latency):
+        prev = entry["ewma_latency"]
+        entry["ewma_latency"] = latency if prev is None else prev + self.alpha * (latency - prev)
+
+    def record(self, model, latency, ok):
+        entry = self.stats.setdefault(model, self._new_entry())
+        entry["attempts"] += 1
+        entry["successes"] += int(ok)
+        if ok:
+            self._update_latency(entry, latency)
+
+    def record_cancelled(self, model, elapsed):
+        """An attempt cancelled unanswered (a lost hedge race): its latency is at least elapsed."""
+        entry = self.stats.setdefault(model, self._new_entry())
+        entry["cancelled"] += 1
+        if entry["ewma_latency"] is None or entry["ewma_latency"] < elapsed:
+            self._update_latency(entry, elapsed)
+
+    def ordered(self, models):
+        """Models by expected time-to-success.
+
+        Models with no figures yet keep their configured position, and
+        models that have only failed go last. A fraction explore of calls
+        use the configured order as is.
+        """
+        if self.explore > 0 and random.random() < self.explore:
+            return list(models)
+        unmeasured, measured, failing = {}, [], []
+        for model in models:
+            entry = self.stats.get(model)
+            if entry is not None and entry["ewma_latency"] is not None:
+                # Laplace-smoothed success rate so one failure doesn't bury a model
+                success_rate = (entry["successes"] + 1) / (entry["attempts"] + 2)
+                measured.append((entry["ewma_latency"] / success_rate, len(measured), model))
+            elif entry is not None and entry["attempts"]:
+                failing.append(model)
+            else:
+                unmeasured[len(measured) + len(unmeasured)] = model
+        ranked = iter([model for *_, model in sorted(measured)])
+        head = [unmeasured[i] if i in unmeasured else next(ranked) for i in range(len(measured) + len(unmeasured))]
+        return head + failing
+
+    def snapshot(self):
+        return {
+            model: {
+                "attempts": entry["attempts"],
+                "successes": entry["successes"],
+                "cancelled": entry["cancelled"],
+                "ewma_latency_ms": None if entry["ewma_latency"] is None else round(entry["ewma_latency"] * 1000, 1),
+            }
+            for model, entry in self.stats.items()
         }
-        
-        models_to_try = ["llama-3.3-70b-versatile", "llama-3.1-8b-instant", "mixtral-8x7b-32768"]
-        
-        response_text = None
-        last_error = None
-        
-        for model in models_to_try:
-            try:
-                payload = {
-                    "model": model,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.7,
-                    "max_tokens": 1024
-                }
-                
-                response = requests.post(url, headers=headers, json=payload, timeout=30)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    response_text = data["choices"][0]["message"]["content"].strip()
-                    if response_text:
-                        break
-                else:
-                    last_error = f"HTTP {response.status_code}: {response.text}"
-            except Exception as e:
-                last_error = str(e)
+
+
+model_stats = ModelStats(MODELS_TO_TRY)
+
+
+async def attempt_model(client, model, prompt, api_key, timeout):
+    """Run one model attempt, record its stats and return the parsed result."""
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    try:
+        response_text = await asyncio.wait_for(
+            request_completion(client, model, prompt, api_key, timeout), timeout=timeout
+        )
+    except asyncio.TimeoutError:
+        model_stats.record(model, loop.time() - started, ok=False)
+        GROQ_ATTEMPT_SECONDS.observe(loop.time() - started, model, "timeout")
+        raise RuntimeError(f"{model} timed out after {timeout:.1f}s")
+    except asyncio.CancelledError:
+        # Lost a hedge race: not a failure, but it was slower than the winner
+        model_stats.record_cancelled(model, loop.time() - started)
+        GROQ_ATTEMPT_SECONDS.observe(loop.time() - started, model, "cancelled")
+        raise
+    except Exception:
+        model_stats.record(model, loop.time() - started, ok=False)
+        GROQ_ATTEMPT_SECONDS.observe(loop.time() - started, model, "error")
+        raise
+
+    result = parse_scores(response_text) if response_text else {"error": "Empty response"}
+    model_stats.record(model, loop.time() - started, ok="error" not in result)
+    GROQ_ATTEMPT_SECONDS.observe(loop.time() - started, model, "invalid" if "error" in result else "ok")
+    if "error" in result:
+        raise RuntimeError(f"{model}: {result['error']}")
+    return result
+
+
+async def run_attempts(client, models, prompt, api_key, deadline, hedge_delay):
+    """Try models until one returns valid scores.
+
+    With hedge_delay=None models run strictly one after another. Otherwise
+    the next model is launched whenever the running ones haven't answered
+    within hedge_delay (or as soon as one fails); the first valid response
+    wins and the others are cancelled.
+    """
+    loop = asyncio.get_running_loop()
+    queue = list(models)
+    pending = set()
+    last_error = None
+
+    def launch():
+        remaining = deadline - loop.time()
+        model = queue.pop(0)
+        pending.add(asyncio.ensure_future(
+            attempt_model(client, model, prompt, api_key, min(ATTEMPT_TIMEOUT, remaining))
+        ))
+
+    try:
+        while queue or pending:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                last_error = last_error or "request budget exhausted"
+                break
+            if not pending:
+                launch()
                 continue
 
-        if not response_text:
-            return {"scores": {}, "average": 0, "error": f"Groq API failed: {last_error}"}
+            wait = remaining if hedge_delay is None or not queue else min(hedge_delay, remaining)
+            done, _ = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                pending.discard(task)
+                if task.exception() is None:
+                    return task.result()
+                last_error = str(task.exception())
 
-        # Extract JSON from response
-        json_match = re.search(r'```json\s*(.+?)\s*```', response_text, re.DOTALL)
-        if json_match:
-            json_str = json_match.group(1)
-        else:
-            start = response_text.find('{')
-            end = response_text.rfind('}')
-            if start != -1 and end != -1:
-                json_str = response_text[start:end+1]
-            else:
-                json_str = response_text
+            # Nothing finished within the hedge delay: hedge with the next model
+            if not done and hedge_delay is not None and queue:
+                launch()
+    finally:
+        for task in pending:
+            task.cancel()
 
-        # Parse JSON
-        try:
-            scores = json.loads(json_str)
-        except:
-            return {"scores": {}, "average": 0, "error": "Failed to parse JSON response"}
+    return {"scores": {}, "average": 0, "error": f"Groq API failed: {last_error}"}
 
-        if not isinstance(scores, dict) or not scores:
-            return {"scores": {}, "average": 0, "error": "Invalid scores format"}
 
-        try:
-            avg_score = sum(float(v) for v in scores.values()) / len(scores)
-        except:
-            return {"scores": scores, "average": 0, "error": "Score values are not numeric"}
+async def score_sop_async(text, api_key, client=None):
+    """Score SOP using the Groq API over a shared async connection pool.
+
+    Models are tried fastest-reliable first (see ModelStats). With
+    GROQ_FALLBACK_STRATEGY=hedged (default) a backup model starts after
+    GROQ_HEDGE_DELAY seconds; "sequential" waits for each attempt to fail.
+    Each attempt gets ATTEMPT_TIMEOUT seconds but never more than what is
+    left of TOTAL_BUDGET.
+    """
+    if not api_key or api_key == "":
+        raise ValueError("GROQ_API_KEY is not set or empty")
+
+    try:
+        client = client or get_client()
+        prompt = build_prompt(text)
+        deadline = asyncio.get_running_loop().time() + TOTAL_BUDGET
+        hedge_delay = HEDGE_DELAY if FALLBACK_STRATEGY == "hedged" else None
+        return await run_attempts(client, model_stats.ordered(MODELS_TO_TRY), prompt, api_key, deadline, hedge_delay)
 
-        return {"scores": scores, "average": round(avg_score, 2)}
-    
     except Exception as e:
         return {"scores": {}, "average": 0, "error": f"SOP scoring error: {str(e)}"}
+
+
+def sop_cache_key(text):
+    return content_key(text, f"{PROMPT_VERSION}:{','.join(MODELS_TO_TRY)}")
+
+
+def cached_sop_score(text):
+    """The cached SOP result for text, or None; never calls Groq.
+
+    Callers check this before score_sop_cached() to charge their own
+    rate limits only on a miss.
+    """
+    return sop_cache.get(sop_cache_key(text))
+
+
+async def score_sop_cached(text, api_key):
+    """score_sop_async behind the content-addressed SOP cache.
+
+    Only successful results are cached; identical in-flight requests share
+    one upstream call, made through groq_gate, which raises
+    ratelimit.Rejected when it can't be made now.
+    """
+    if not api_key or api_key == "":
+        raise ValueError("GROQ_API_KEY is not set or empty")
+
+    return await sop_cache.get_or_compute(
+        sop_cache_key(text),
+        lambda: groq_gate.run(score_sop_async(text, api_key)),
+        cacheable=lambda result: isinstance(result, dict) and not result.get("error"),
+    )
+
+
+def score_sop(text, api_key):
+    """Blocking wrapper around score_sop_async for scripts and notebooks.
+
+    asyncio.run() can't start inside a running loop (a Jupyter cell, say),
+    so there the call runs on a helper thread with its own loop. Async code
+    should await score_sop_async instead of blocking its loop here.
+    """
+    async def run():
+        async with httpx.AsyncClient(base_url=GROQ_BASE_URL) as client:
+            return await score_sop_async(text, api_key, client=client)
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(run())
+    with ThreadPoolExecutor(1, thread_name_prefix="score-sop") as pool:
+        return pool.submit(asyncio.run, run()).result()
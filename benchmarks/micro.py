@@ -0,0 +1,106 @@
+"""Microbenchmarks for the pieces inside each endpoint.
+
+    python -m benchmarks.micro
+    python -m benchmarks.micro --repeat 500 -o micro.json
+
+Each case is timed call by call after a short warm-up; results are the
+median and p95 in microseconds.
+"""
+import argparse
+import json
+import sys
+import time
+import warnings
+
+import numpy as np
+
+SAMPLE_ROW = [[320, 110, 3, 3.5, 3.5, 8.5, 1]]
+SAMPLE_COMPLETION = (
+    "Here is my evaluation of the statement of purpose:\n```json\n"
+    + json.dumps({
+        "Clarity & Coherence": 4.2, "Grammar & Language Quality": 4.5, "Purpose & Goal Alignment": 4.0,
+        "Motivation & Passion": 3.8, "Relevance of Background": 4.1, "Research Fit": 3.6,
+        "Originality & Insight": 3.9,
+    })
+    + "\n```\nLet me know if you need anything else."
+)
+
+
+def time_calls(fn, repeat, warmup=3):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1e6)
+    return {
+        "calls": repeat,
+        "median_us": round(float(np.median(timings)), 2),
+        "p95_us": round(float(np.percentile(timings, 95)), 2),
+        "min_us": round(float(np.min(timings)), 2),
+    }
+
+
+def cases(repeat):
+    """(name, fn, calls) for every microbenchmark; slow cases get fewer calls."""
+    from backend import inference
+    from backend.explain import get_explainer
+    from backend.train import load_data
+    from backend.universities import UniversityIndex
+    from backend.utils import parse_scores
+
+    model, scaler = inference.load_sklearn_artifacts()
+    active = inference.current()
+    X, _ = load_data()
+    row = np.asarray(SAMPLE_ROW, dtype=np.float64)
+    batch = X[:256]
+    scaled_row, scaled_batch = scaler.transform(row), scaler.transform(batch)
+    explainer = get_explainer(active)
+    xlsx = inference.BASE_DIR.parent / "data" / "UpdatedWorldUniRank23.xlsx"
+    index = UniversityIndex.load(xlsx)
+
+    return [
+        ("scaler.transform[1]", lambda: scaler.transform(row), repeat),
+        ("scaler.transform[256]", lambda: scaler.transform(batch), repeat),
+        ("model.predict[1]", lambda: model.predict(scaled_row), repeat),
+        ("model.predict[256]", lambda: model.predict(scaled_batch), repeat),
+        ("lean.predict[1]", lambda: active.predictor.predict(row), repeat),
+        ("lean.predict[256]", lambda: active.predictor.predict(batch), repeat),
+        ("shap.explain[1]", lambda: explainer.explain(active.predictor.transform(row)), max(3, repeat // 20)),
+        ("excel.load", lambda: UniversityIndex.from_excel(xlsx), 3),
+        ("universities.load_cached", lambda: UniversityIndex.load(xlsx), max(3, repeat // 20)),
+        ("universities.lookup", lambda: index.lookup("Stanford University"), repeat),
+        ("universities.search", lambda: index.search("stanf"), repeat),
+        ("json.extract", lambda: parse_scores(SAMPLE_COMPLETION), repeat),
+    ]
+
+
+def run(repeat=200, only=None):
+    # The bundled scaler was fitted on a DataFrame; the raw-array calls here are intended
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    results = {}
+    for name, fn, calls in cases(repeat):
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        results[name] = time_calls(fn, calls)
+        print(f"{name:>26}: median {results[name]['median_us']:>12.1f} us  p95 {results[name]['p95_us']:>12.1f} us",
+              file=sys.stderr)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the backend's building blocks.")
+    parser.add_argument("--repeat", type=int, default=200, help="Calls per fast case")
+    parser.add_argument("--only", help="Comma-separated case name prefixes, e.g. 'lean,shap'")
+    parser.add_argument("-o", "--output", help="Write results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat, args.only.split(",") if args.only else None)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"micro": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
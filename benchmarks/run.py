@@ -0,0 +1,322 @@
+"""End-to-end latency/throughput benchmarks for the backend endpoints.
+
+Requests are driven either in-process (through the ASGI app, no sockets)
+or over HTTP against a uvicorn server started for the run. /sop and
+/analyze talk to benchmarks/stub_groq.py, so no Groq key or network is
+needed. Inputs are randomized per request so caches see realistic
+traffic rather than one repeated profile.
+
+    python -m benchmarks.run                                   # in-process, every endpoint
+    python -m benchmarks.run --mode http --concurrency 1,16,64 -o bench.json
+    python -m benchmarks.run --endpoints predict,university --micro -o bench.json
+    python -m benchmarks.run compare base.json bench.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import time
+import zlib
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+# Every request comes from one client, so the per-client rate limits would dominate
+UNLIMITED = {"SOP_RATE_PER_KEY": "0", "SOP_RATE_PER_CLIENT": "0", "EXPLAIN_RATE_PER_CLIENT": "0"}
+
+SOP_TEXT = (
+    "I am applying to the graduate program in computer science to deepen my research in machine "
+    "learning systems. During my undergraduate studies I worked on efficient inference for tabular "
+    "models and published a workshop paper on model compression."
+)
+
+
+def random_profile(rng):
+    """A profile on the UI's input grid (sliders step by 0.5 / 0.1)."""
+    return {
+        "gre_score": int(rng.integers(290, 341)),
+        "toefl_score": int(rng.integers(92, 121)),
+        "university_rating": int(rng.integers(1, 6)),
+        "sop": float(rng.integers(2, 11) / 2),
+        "lor": float(rng.integers(2, 11) / 2),
+        "cgpa": round(float(rng.uniform(6.8, 9.9)), 1),
+        "research": int(rng.integers(0, 2)),
+    }
+
+
+def unique_sop(rng):
+    return f"{SOP_TEXT} (#{int(rng.integers(1 << 62))})"
+
+
+def university_names():
+    from backend.universities import UniversityIndex
+
+    index = UniversityIndex.load(ROOT / "data" / "UpdatedWorldUniRank23.xlsx")
+    return [record["name"] for record in index.records]
+
+
+def make_workloads():
+    """name -> fn(i, rng) returning (method, url, request kwargs)."""
+    names = university_names()
+    return {
+        "predict": lambda i, rng: ("POST", "/predict", {"json": random_profile(rng)}),
+        "explain": lambda i, rng: ("POST", "/explain", {"json": random_profile(rng)}),
+        "university": lambda i, rng: ("GET", "/university", {"params": {"name": names[rng.integers(len(names))]}}),
+        "university_search": lambda i, rng: (
+            "GET", "/university/search", {"params": {"q": names[rng.integers(len(names))][:int(rng.integers(3, 9))]}}
+        ),
+        # A distinct text per request, so every call reaches the (stub) Groq API
+        "sop": lambda i, rng: ("POST", "/sop", {"json": {"sop": unique_sop(rng), "api_key": "bench"}}),
+        "analyze": lambda i, rng: (
+            "POST", "/analyze", {"json": {**random_profile(rng), "sop_text": unique_sop(rng), "api_key": "bench"}}
+        ),
+    }
+
+
+def summarize(latencies, errors, wall):
+    latencies = np.asarray(latencies) * 1000
+    if len(latencies) == 0:
+        return {"requests": 0, "errors": errors}
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        "mean_ms": round(float(latencies.mean()), 3),
+        "throughput_rps": round(len(latencies) / wall, 2),
+    }
+
+
+async def drive(client, workload, requests, concurrency, seed=0, warmup=10):
+    """Issue requests with `concurrency` in flight at a time; returns the summary."""
+    rng = np.random.default_rng(seed)
+    for i in range(warmup):
+        method, url, kwargs = workload(-1 - i, rng)
+        await client.request(method, url, **kwargs)
+
+    counter = itertools.count()
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while (i := next(counter)) < requests:
+            method, url, kwargs = workload(i, rng)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                # /sop reports scorer failures in the body to keep the UI stable
+                failed = response.status_code >= 400 or (url == "/sop" and "error" in response.json())
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - start)
+            errors += failed
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def run_levels(client, endpoints, levels, requests):
+    workloads = make_workloads()
+    results = {}
+    for name in endpoints:
+        results[name] = {}
+        for level in levels:
+            # Seeded per run, so one run's inputs aren't cache hits for the next
+            summary = await drive(client, workloads[name], requests, level, seed=zlib.crc32(f"{name}:{level}".encode()))
+            results[name][str(level)] = summary
+            print(f"{name:>18} c={level:<4} p50 {summary.get('p50_ms', 0):>9.2f} ms  p99 {summary.get('p99_ms', 0):>9.2f} ms  "
+                  f"{summary.get('throughput_rps', 0):>9.1f} req/s  errors {summary['errors']}", file=sys.stderr)
+    return results
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def start_process(args, env=None):
+    return subprocess.Popen([sys.executable, *args], cwd=ROOT, env={**os.environ, **(env or {})})
+
+
+def start_stub_groq():
+    port = free_port()
+    proc = start_process(["-m", "uvicorn", "benchmarks.stub_groq:app", "--port", str(port), "--log-level", "warning"])
+    wait_until_up(f"http://127.0.0.1:{port}/stats")
+    return proc, f"http://127.0.0.1:{port}/openai/v1"
+
+
+def peak_rss_mb(pid):
+    """Peak resident set (VmHWM) of pid plus its children, from /proc; None elsewhere."""
+    try:
+        pids = [pid]
+        for task in Path(f"/proc/{pid}/task").iterdir():
+            pids += [int(child) for child in (task / "children").read_text().split()]
+        total_kb = 0
+        for p in pids:
+            for line in Path(f"/proc/{p}/status").read_text().splitlines():
+                if line.startswith("VmHWM:"):
+                    total_kb += int(line.split()[1])
+        return round(total_kb / 1024, 1)
+    except (OSError, ValueError):
+        return None
+
+
+async def run_inprocess(endpoints, levels, requests, groq_url):
+    # Settings are read at import, so point the backend at the stub first
+    os.environ["GROQ_BASE_URL"] = groq_url
+    os.environ.update(UNLIMITED)
+    from backend.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            results = await run_levels(client, endpoints, levels, requests)
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return results, round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1)
+
+
+async def run_http(endpoints, levels, requests, groq_url, url=None, workers=1):
+    server = None
+    if url is None:
+        port = free_port()
+        if workers > 1:
+            args = ["-m", "backend.serve", "--port", str(port), "--workers", str(workers)]
+        else:
+            args = ["-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning"]
+        server = start_process(args, {"GROQ_BASE_URL": groq_url, **UNLIMITED})
+        url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_up(url + "/health")
+        limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+        async with httpx.AsyncClient(base_url=url, timeout=120, limits=limits) as client:
+            results = await run_levels(client, endpoints, levels, requests)
+        return results, peak_rss_mb(server.pid) if server is not None else None
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(base_path, new_path):
+    """Print per-endpoint/level and microbenchmark changes between two result files."""
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    def change(old, cur):
+        return f"{old:>10.2f} -> {cur:>10.2f} ({(cur - old) / old * 100:+6.1f}%)" if old else f"{'':>10} -> {cur:>10.2f}"
+
+    print(f"{base['meta'].get('commit')} -> {new['meta'].get('commit')}")
+    for name, levels in new.get("endpoints", {}).items():
+        for level, cur in levels.items():
+            old = base.get("endpoints", {}).get(name, {}).get(level)
+            if not old or "p50_ms" not in old or "p50_ms" not in cur:
+                continue
+            print(f"{name:>18} c={level:<4} p50 {change(old['p50_ms'], cur['p50_ms'])}  "
+                  f"p99 {change(old['p99_ms'], cur['p99_ms'])}  req/s {change(old['throughput_rps'], cur['throughput_rps'])}")
+    for name, cur in new.get("micro", {}).items():
+        old = base.get("micro", {}).get(name)
+        if old:
+            print(f"{name:>26} median us {change(old['median_us'], cur['median_us'])}")
+    if base.get("peak_rss_mb") and new.get("peak_rss_mb"):
+        print(f"{'peak RSS MB':>18} {change(base['peak_rss_mb'], new['peak_rss_mb'])}")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["compare"]:
+        parser = argparse.ArgumentParser(prog="benchmarks.run compare", description="Compare two result files.")
+        parser.add_argument("base")
+        parser.add_argument("new")
+        args = parser.parse_args(argv[1:])
+        compare(args.base, args.new)
+        return
+
+    parser = argparse.ArgumentParser(description="Benchmark the backend endpoints.")
+    parser.add_argument("--mode", choices=["inprocess", "http"], default="inprocess")
+    parser.add_argument("--endpoints", default="predict,explain,university,university_search,sop,analyze")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated in-flight request counts")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint and concurrency level")
+    parser.add_argument("--url", help="With --mode http, benchmark this running server instead of starting one")
+    parser.add_argument("--workers", type=int, default=1, help="With --mode http, worker processes to start")
+    parser.add_argument("--micro", action="store_true", help="Also run benchmarks.micro")
+    parser.add_argument("-o", "--output", help="Write results as JSON")
+    args = parser.parse_args(argv)
+
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    unknown = set(endpoints) - set(make_workloads())
+    if unknown:
+        parser.error(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    stub, groq_url = start_stub_groq()
+    try:
+        if args.mode == "inprocess":
+            results, rss = asyncio.run(run_inprocess(endpoints, levels, args.requests, groq_url))
+        else:
+            results, rss = asyncio.run(run_http(endpoints, levels, args.requests, groq_url, args.url, args.workers))
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    output = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "mode": args.mode,
+            "requests": args.requests,
+            "concurrency": levels,
+            "workers": args.workers,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "endpoints": results,
+        "peak_rss_mb": rss,
+    }
+    if args.micro:
+        from benchmarks import micro
+
+        output["micro"] = micro.run()
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(output, f, indent=2)
+    print(f"peak RSS: {rss} MB", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
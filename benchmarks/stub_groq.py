@@ -0,0 +1,62 @@
+"""Local stand-in for the Groq chat completions API.
+
+Run it and point the backend at it to exercise /sop offline:
+
+    uvicorn benchmarks.stub_groq:app --port 9000
+    GROQ_BASE_URL=http://localhost:9000/openai/v1 uvicorn backend.main:app
+
+Behaviour is configured through environment variables:
+    STUB_GROQ_LATENCY       seconds to wait before replying (default 0.05)
+    STUB_GROQ_FAIL_MODELS   comma-separated models that answer HTTP 503
+    STUB_GROQ_SLOW_MODELS   comma-separated models that sleep STUB_GROQ_SLOW_LATENCY
+    STUB_GROQ_SLOW_LATENCY  seconds for slow models (default 60)
+"""
+import asyncio
+import json
+import os
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+SCORES = {
+    "Clarity & Coherence": 4.2,
+    "Grammar & Language Quality": 4.5,
+    "Purpose & Goal Alignment": 4.0,
+    "Motivation & Passion": 3.8,
+    "Relevance of Background": 4.1,
+    "Research Fit": 3.6,
+    "Originality & Insight": 3.9,
+}
+
+
+def _model_set(name):
+    return {m.strip() for m in os.getenv(name, "").split(",") if m.strip()}
+
+
+app = FastAPI()
+app.state.requests = 0
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "")
+    app.state.requests += 1
+
+    if model in _model_set("STUB_GROQ_SLOW_MODELS"):
+        await asyncio.sleep(float(os.getenv("STUB_GROQ_SLOW_LATENCY", "60")))
+    else:
+        await asyncio.sleep(float(os.getenv("STUB_GROQ_LATENCY", "0.05")))
+
+    if model in _model_set("STUB_GROQ_FAIL_MODELS"):
+        return JSONResponse({"error": {"message": f"{model} unavailable"}}, status_code=503)
+
+    return {
+        "model": model,
+        "choices": [{"message": {"role": "assistant", "content": json.dumps(SCORES)}}],
+    }
+
+
+@app.get("/stats")
+def stats():
+    return {"requests": app.state.requests}
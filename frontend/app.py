@@ -26,6 +26,22 @@ except Exception as e:
 BACKEND_URL = st.secrets.get("BACKEND_URL", "http://localhost:8000")
 
 
+@st.cache_data(ttl=3600, show_spinner=False)
+def _fetch_university_matches(query, limit):
+    resp = requests.get(f"{BACKEND_URL}/university/search", params={"q": query, "limit": limit}, timeout=5)
+    resp.raise_for_status()
+    return resp.json().get("results", [])
+
+
+def search_universities(query, limit=8):
+    """Autocomplete candidates from the backend's /university/search index."""
+    # Failures raise inside the cached call, so they aren't cached
+    try:
+        return _fetch_university_matches(query.strip(), limit)
+    except Exception:
+        return []
+
+
 # Custom CSS for better styling
 st.markdown("""
 <style>
@@ -222,27 +238,21 @@ if st.session_state.page == 'main':
         
         st.markdown("### 🏫 University & Application")
         
-        # University lookup with better UX
-        uni_name = st.text_input("🔍 University Name", placeholder="e.g., Stanford University, Princeton University")
+        # University lookup with autocomplete from the backend search index
+        uni_name = st.text_input("🔍 University Name", placeholder="e.g., Stanford, MIT, Oxford")
         
         col_lookup, col_rating = st.columns([1, 1])
         with col_lookup:
-            if st.button("🔍 Get University Rating", type="secondary"):
-                if uni_name:
-                    with st.spinner("Looking up university..."):
-                        try:
-                            resp = requests.get(f"{BACKEND_URL}/university", params={"name": uni_name})
-                            data = resp.json()
-                            if data['found']:
-                                st.session_state.uni_rating = data['rating']
-                                st.success(f"✅ Found: {data['name']}\n📊 Rating: {data['rating']}/5\n🌍 Country: {data['country']}")
-                            else:
-                                st.warning("⚠️ University not found in database")
-                                st.session_state.uni_rating = 1
-                        except:
-                            st.error("❌ Failed to lookup university. Check if backend is running.")
-                else:
-                    st.warning("Please enter university name first")
+            matches = search_universities(uni_name) if uni_name.strip() else []
+            if matches:
+                labels = [f"{m['name']} ({m['country']}, #{m['rank']})" for m in matches]
+                choice = st.selectbox("Matching universities", range(len(matches)), format_func=lambda i: labels[i])
+                if st.button("✅ Use This University", type="secondary"):
+                    selected = matches[choice]
+                    st.session_state.uni_rating = selected['rating']
+                    st.success(f"✅ Found: {selected['name']}\n📊 Rating: {selected['rating']}/5\n🌍 Country: {selected['country']}")
+            elif uni_name.strip():
+                st.warning("⚠️ No matching university found (or backend is not running)")
         with col_rating:
             university_rating = st.selectbox(
                 "University Rating",
@@ -291,31 +301,24 @@ if st.session_state.page == 'main':
                     }
                     
                     try:
-                        pred_resp = requests.post(f"{BACKEND_URL}/predict", json=profile_data)
-                        prediction = pred_resp.json()
-                        
-                        exp_resp = requests.post(f"{BACKEND_URL}/explain", json=profile_data)  
-                        explanation = exp_resp.json()
+                        # One round-trip: the backend runs prediction, SHAP and SOP scoring together
+                        analyze_resp = requests.post(f"{BACKEND_URL}/analyze", json={
+                            **profile_data,
+                            "sop_text": sop_text,
+                            "api_key": GROQ_API_KEY
+                        }, timeout=60)
+                        analysis = analyze_resp.json()
+                        prediction = analysis['prediction']
+                        explanation = analysis['explanation']
+                        sop_scores = analysis.get('sop_scores') or {"scores": {}, "average": 0}
                         
-                        # Passing API key with SOP request
-                        if GROQ_API_KEY:
-                            try:
-                                sop_resp = requests.post(f"{BACKEND_URL}/sop", json={
-                                    "sop": sop_text,
-                                    "api_key": GROQ_API_KEY
-                                }, timeout=30)
-                                sop_scores = sop_resp.json()
-                                # Handle backend-reported errors gracefully
-                                if isinstance(sop_scores, dict) and sop_scores.get('error'):
-                                    st.warning(f"⚠️ SOP analysis: {sop_scores.get('error')}")
-                                    sop_scores.setdefault('scores', {})
-                                    sop_scores.setdefault('average', 0)
-                            except Exception as e:
-                                st.warning(f"⚠️ SOP analysis failed: {str(e)}")
-                                sop_scores = {"scores": {}, "average": 0}
-                        else:
+                        if not GROQ_API_KEY:
                             st.error("⚠️ Cannot analyze SOP - Groq API key not configured")
-                            sop_scores = {"scores": {}, "average": 0}
+                        elif sop_scores.get('error'):
+                            # Handle backend-reported errors gracefully
+                            st.warning(f"⚠️ SOP analysis: {sop_scores.get('error')}")
+                        sop_scores.setdefault('scores', {})
+                        sop_scores.setdefault('average', 0)
                         
                         st.session_state.prediction_data = {
                             'prediction': prediction,
@@ -505,6 +508,41 @@ elif st.session_state.page == 'shap':
         
         with col3:
             st.metric("Final Score", f"{explanation['final_score']}%", help="Final admission probability")
+        
+        # What-if sensitivity: the whole grid comes back from a single backend call
+        st.markdown("### 🔮 What-If Explorer")
+        sweep_options = {
+            "GRE Score": ("gre_score", {"start": 290, "stop": 340, "step": 2}),
+            "TOEFL Score": ("toefl_score", {"start": 90, "stop": 120, "step": 1}),
+            "CGPA": ("cgpa", {"start": 7.0, "stop": 10.0, "step": 0.1}),
+            "SOP Quality": ("sop", {"start": 1.0, "stop": 5.0, "step": 0.5}),
+            "LOR Quality": ("lor", {"start": 1.0, "stop": 5.0, "step": 0.5}),
+        }
+        col_x, col_y = st.columns(2)
+        with col_x:
+            x_label = st.selectbox("Vary", list(sweep_options), index=2)
+        with col_y:
+            y_label = st.selectbox("Against", ["(none)"] + [k for k in sweep_options if k != x_label], index=1)
+        
+        sweeps = [{"feature": sweep_options[x_label][0], **sweep_options[x_label][1]}]
+        if y_label != "(none)":
+            sweeps.insert(0, {"feature": sweep_options[y_label][0], **sweep_options[y_label][1]})
+        try:
+            whatif = requests.post(f"{BACKEND_URL}/whatif", json={
+                "profile": data['profile_data'],
+                "sweeps": sweeps
+            }, timeout=30).json()
+            if y_label == "(none)":
+                fig = px.line(x=whatif['axes'][0], y=whatif['probabilities'],
+                              labels={"x": x_label, "y": "Admission Probability (%)"})
+            else:
+                fig = px.imshow(whatif['probabilities'], x=whatif['axes'][1], y=whatif['axes'][0],
+                                origin="lower", aspect="auto", color_continuous_scale="RdYlGn",
+                                labels={"x": x_label, "y": y_label, "color": "Probability (%)"})
+            fig.update_layout(template="plotly_white", height=450)
+            st.plotly_chart(fig, use_container_width=True)
+        except Exception:
+            st.warning("⚠️ Could not load what-if analysis. Check if backend is running.")
 
 elif st.session_state.page == 'sop':
     data = st.session_state.prediction_data
@@ -54,9 +54,10 @@ if [ ! -f "$STREAMLIT_PATH" ]; then
   fi
 fi
 
-# Start FastAPI backend
+# Start FastAPI backend: one auto-reloading worker for development; use
+# `python -m backend.serve --workers N` to serve several
 echo "🚀 Starting FastAPI backend"
-"$PYTHON_PATH" -m uvicorn backend.main:app --reload &
+"$PYTHON_PATH" -m backend.serve --reload &
 BACKEND_PID=$!
 
 # Wait for backend to initialize
@@ -0,0 +1,37 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import main, utils
+
+PROFILE = {"gre_score": 318, "toefl_score": 108, "university_rating": 4, "sop": 4.0, "lor": 3.5, "cgpa": 8.9, "research": 1}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def fake_groq(text, api_key, client=None):
+        return {"scores": {"Clarity": 7}, "average": 7.0}
+
+    monkeypatch.setattr(utils, "score_sop_async", fake_groq)
+    monkeypatch.setattr(utils, "sop_cache", utils.ResultCache())
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+def test_analyze_combines_predict_explain_and_sop(client):
+    combined = client.post("/analyze", json={**PROFILE, "sop_text": "My essay.", "api_key": "k"})
+    assert combined.status_code == 200
+    body = combined.json()
+
+    assert body["prediction"]["probability"] == pytest.approx(client.post("/predict", json=PROFILE).json()["probability"])
+    assert body["explanation"] == client.post("/explain", json=PROFILE).json()
+    assert body["sop_scores"] == client.post("/sop", json={"sop": "My essay.", "api_key": "k"}).json()
+    assert combined.headers[main.MODEL_VERSION_HEADER]
+
+
+def test_analyze_without_sop_still_predicts(client):
+    no_key = client.post("/analyze", json={**PROFILE, "sop_text": "My essay."}).json()
+    assert no_key["sop_scores"]["error"] == "Groq API key not provided"
+    no_text = client.post("/analyze", json={**PROFILE, "sop_text": "  ", "api_key": "k"}).json()
+    assert no_text["sop_scores"]["error"] == "SOP text not provided"
+    assert no_key["prediction"] == no_text["prediction"]
+    assert no_key["prediction"]["probability"] > 0
@@ -0,0 +1,117 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import inference, main, ratelimit, utils
+from backend.executor import Overloaded
+from backend.ratelimit import RateLimiter, Rejected
+
+PROFILE = {"gre_score": 320, "toefl_score": 110, "university_rating": 3, "sop": 3.5, "lor": 3.5, "cgpa": 8.5, "research": 1}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    calls = []
+
+    async def fake_groq(text, api_key, client=None):
+        calls.append(text)
+        return {"scores": {"Clarity": 8}, "average": 8.0}
+
+    monkeypatch.setattr(utils, "score_sop_async", fake_groq)
+    monkeypatch.setattr(utils, "sop_cache", utils.ResultCache())
+    # One SOP scoring per key, no waiting for the next token
+    monkeypatch.setitem(main.rate_limiters, "sop_key", RateLimiter("SOP scoring per API key", 1, burst=1, max_wait=0))
+    with TestClient(main.app) as test_client:
+        test_client.groq_calls = calls
+        yield test_client
+
+
+def test_cached_sops_do_not_use_up_the_limit(client):
+    for _ in range(3):
+        response = client.post("/sop", json={"sop": "I love statistics.", "api_key": "k"})
+        assert response.status_code == 200
+        assert response.json()["average"] == 8.0
+    assert client.groq_calls == ["I love statistics."]
+
+    response = client.post("/sop", json={"sop": "A different essay.", "api_key": "k"})
+    assert response.status_code == 429
+
+
+def test_analyze_degrades_when_sop_limit_is_exhausted(client):
+    first = client.post("/analyze", json={**PROFILE, "sop_text": "First essay.", "api_key": "k"})
+    assert first.status_code == 200
+    assert first.json()["sop_scores"]["average"] == 8.0
+
+    second = client.post("/analyze", json={**PROFILE, "sop_text": "Second essay.", "api_key": "k"})
+    assert second.status_code == 200
+    body = second.json()
+    assert body["prediction"]["probability"] > 0
+    assert body["explanation"]["final_score"] == pytest.approx(first.json()["explanation"]["final_score"])
+    assert "Rate limit exceeded" in body["sop_scores"]["error"]
+
+
+def test_explain_batch_row_limit_and_per_row_charge(client, monkeypatch):
+    monkeypatch.setattr(main, "EXPLAIN_BATCH_MAX_ROWS", 5)
+    monkeypatch.setitem(main.rate_limiters, "explain_client",
+                        RateLimiter("explanations per client", 1, burst=4, max_wait=0))
+
+    response = client.post("/explain/batch", json={"profiles": [PROFILE] * 6})
+    assert response.status_code == 413
+
+    assert client.post("/explain/batch", json={"profiles": [PROFILE] * 3}).status_code == 200
+    # Three of the four tokens are spent, so a two-row batch is over the limit
+    response = client.post("/explain/batch", json={"profiles": [PROFILE] * 2})
+    assert response.status_code == 429
+    assert client.post("/explain/batch", json={"profiles": [PROFILE]}).status_code == 200
+
+
+def test_large_predict_batches_are_shed_by_the_cpu_pool(client, monkeypatch):
+    class FullPool:
+        async def run(self, fn, *args):
+            raise Overloaded("cpu")
+
+    monkeypatch.setattr(main, "cpu_pool", FullPool())
+    small = client.post("/predict/batch", json={"profiles": [PROFILE] * inference.LEAN_MAX_ROWS})
+    assert small.status_code == 200
+    assert small.json()["count"] == inference.LEAN_MAX_ROWS
+
+    large = client.post("/predict/batch", json={"profiles": [PROFILE] * (inference.LEAN_MAX_ROWS + 1)})
+    assert large.status_code == 503
+    assert "Retry-After" in large.headers
+
+
+def test_coalesced_sop_callers_are_charged_to_their_own_limits(monkeypatch):
+    calls = []
+
+    async def slow_groq(text, api_key, client=None):
+        calls.append(api_key)
+        await asyncio.sleep(0.05)
+        return {"scores": {"Clarity": 8}, "average": 8.0}
+
+    monkeypatch.setattr(utils, "score_sop_async", slow_groq)
+    monkeypatch.setattr(utils, "sop_cache", utils.ResultCache())
+    monkeypatch.setitem(main.rate_limiters, "sop_key", RateLimiter("SOP scoring per API key", 1, burst=1, max_wait=0))
+    monkeypatch.setitem(main.rate_limiters, "sop_client", RateLimiter("SOP scoring per client", 60, burst=60, max_wait=0))
+
+    def request(host):
+        return SimpleNamespace(client=SimpleNamespace(host=host), headers={})
+
+    async def scenario():
+        await main.rate_limiters["sop_key"].acquire(ratelimit.api_key_id("spent"))
+        callers = [
+            main.run_sop_scoring("Same essay.", "spent", request("a")),
+            main.run_sop_scoring("Same essay.", "fresh", request("b")),
+            main.run_sop_scoring("Same essay.", "fresh", request("c")),
+            main.run_sop_scoring("Same essay.", "other", request("d")),
+        ]
+        return await asyncio.gather(*callers, return_exceptions=True)
+
+    spent, fresh, fresh_again, other = asyncio.run(scenario())
+    # Each caller is judged by its own key, whether it leads or joins the call
+    assert isinstance(spent, Rejected)
+    assert fresh["average"] == 8.0
+    assert isinstance(fresh_again, Rejected)
+    assert other["average"] == 8.0
+    assert calls == ["fresh"]
@@ -0,0 +1,63 @@
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import inference, main
+from backend.batching import MicroBatcher
+
+
+def test_concurrent_rows_share_one_model_call_and_get_their_own_result():
+    calls = []
+
+    def predict(features):
+        calls.append(len(features))
+        return features[:, 0] * 10
+
+    async def scenario():
+        batcher = MicroBatcher(predict, window_ms=50, max_batch=4)
+        try:
+            results = await asyncio.gather(*(batcher.submit(np.array([[i, 0.0]])) for i in range(6)))
+        finally:
+            await batcher.stop()
+        return results, batcher.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert results == [0, 10, 20, 30, 40, 50]
+    # Four rows fill a batch at once; the other two wait out the window
+    assert calls == [4, 2]
+    assert (stats["batches"], stats["rows"]) == (2, 6)
+    assert stats["batch_size_histogram"]["2"] == 1 and stats["batch_size_histogram"]["4"] == 1
+
+
+def test_a_failed_batch_fails_every_row_in_it_and_the_next_batch_runs():
+    def predict(features):
+        if (features < 0).any():
+            raise ValueError("bad row")
+        return features[:, 0]
+
+    async def scenario():
+        batcher = MicroBatcher(predict, window_ms=20)
+        try:
+            failed = await asyncio.gather(batcher.submit(np.array([[1.0]])), batcher.submit(np.array([[-1.0]])),
+                                          return_exceptions=True)
+            return failed, await batcher.submit(np.array([[2.0]]))
+        finally:
+            await batcher.stop()
+
+    failed, after = asyncio.run(scenario())
+    assert all(isinstance(result, ValueError) for result in failed)
+    assert after == pytest.approx(2.0)
+
+
+def test_predict_through_the_batcher_matches_the_direct_path(monkeypatch):
+    profile = {"gre_score": 311, "toefl_score": 104, "university_rating": 3, "sop": 3.0, "lor": 3.5, "cgpa": 8.3, "research": 0}
+    with TestClient(main.app) as client:
+        direct = client.post("/predict", json=profile).json()["probability"]
+        monkeypatch.setattr(main.profile_cache, "entries", None)
+        monkeypatch.setattr(main, "batcher", MicroBatcher(main.predict_with_version, window_ms=1))
+        response = client.post("/predict", json=profile)
+    assert response.json()["probability"] == pytest.approx(direct)
+    assert response.headers[main.MODEL_VERSION_HEADER] == inference.current().version
+    assert main.batcher.stats()["rows"] == 1
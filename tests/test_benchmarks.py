@@ -0,0 +1,35 @@
+import json
+import subprocess
+import sys
+
+from backend.inference import BASE_DIR
+from benchmarks import run
+
+
+def test_summary_percentiles_and_throughput():
+    summary = run.summarize([0.001 * i for i in range(1, 101)], errors=2, wall=0.5)
+    assert summary["requests"] == 100 and summary["errors"] == 2
+    assert summary["p50_ms"] == 50.5
+    assert summary["p99_ms"] == 99.01
+    assert summary["throughput_rps"] == 200.0
+    assert run.summarize([], errors=3, wall=1) == {"requests": 0, "errors": 3}
+
+
+def test_inprocess_run_against_the_stub_groq_server(tmp_path, capsys):
+    output = tmp_path / "bench.json"
+    subprocess.run([sys.executable, "-m", "benchmarks.run", "--endpoints", "predict,sop", "--concurrency", "1,4",
+                    "--requests", "12", "-o", str(output)], cwd=BASE_DIR.parent, capture_output=True, check=True)
+    result = json.loads(output.read_text())
+
+    assert result["meta"]["mode"] == "inprocess"
+    assert result["peak_rss_mb"] > 0
+    for endpoint in ("predict", "sop"):
+        for level in ("1", "4"):
+            summary = result["endpoints"][endpoint][level]
+            assert (summary["requests"], summary["errors"]) == (12, 0)
+            assert summary["p50_ms"] <= summary["p99_ms"]
+
+    run.compare(output, output)
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 1 + 4 + 1
+    assert all("(  +0.0%)" in line for line in lines[1:])
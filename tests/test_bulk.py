@@ -0,0 +1,50 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import bulk, inference, main
+
+HEADER = "GRE Score,TOEFL Score,University Rating,SOP,LOR ,CGPA,Research\n"
+VALID = "320,110,3,3.5,3.5,8.5,1\n"
+INVALID = [",110,3,3.5,3.5,8.5,1\n", "320,abc,3,3.5,3.5,8.5,1\n", "320,110,3,3.5,3.5,11,1\n"]
+
+
+def applicants(rows):
+    """rows applicants, with an invalid one every tenth row."""
+    lines = [INVALID[(i // 10) % len(INVALID)] if i % 10 == 5 else VALID for i in range(rows)]
+    return HEADER + "".join(lines)
+
+
+# Chunks at or below LEAN_MAX_ROWS go through the numpy model, larger ones through sklearn
+@pytest.mark.parametrize("chunk_size", [inference.LEAN_MAX_ROWS, inference.LEAN_MAX_ROWS + 50])
+def test_invalid_rows_are_reported_not_scored(chunk_size):
+    rows = 2 * chunk_size
+    chunks = bulk.iter_chunks(io.StringIO(applicants(rows)), "csv", chunk_size)
+    scored = pd.concat(list(bulk.score_chunks(chunks)), ignore_index=True)
+
+    assert len(scored) == rows
+    invalid = scored.index % 10 == 5
+    assert scored.loc[invalid, bulk.OUTPUT_COLUMN].isna().all()
+    assert scored.loc[~invalid, bulk.OUTPUT_COLUMN].notna().all()
+    assert (scored.loc[~invalid, bulk.ERROR_COLUMN] == "").all()
+    assert scored.loc[5, bulk.ERROR_COLUMN] == "gre_score is missing or not a number"
+    assert scored.loc[15, bulk.ERROR_COLUMN] == "toefl_score is missing or not a number"
+    assert scored.loc[25, bulk.ERROR_COLUMN] == "cgpa must be between 0 and 10"
+    expected = inference.predict_probabilities(np.array([[320, 110, 3, 3.5, 3.5, 8.5, 1]], dtype=np.float64))[0]
+    np.testing.assert_allclose(scored.loc[~invalid, bulk.OUTPUT_COLUMN], expected)
+
+
+def test_bulk_endpoint_streams_every_row_and_removes_the_upload(monkeypatch, tmp_path):
+    monkeypatch.setattr(main.tempfile, "tempdir", str(tmp_path))
+    with TestClient(main.app) as client:
+        response = client.post("/predict/bulk", params={"chunk_size": 40},
+                               files={"file": ("applicants.csv", applicants(150), "text/csv")})
+    assert response.status_code == 200
+    scored = pd.read_csv(io.StringIO(response.text), keep_default_na=False)
+    assert len(scored) == 150
+    assert list(scored.columns[-2:]) == [bulk.OUTPUT_COLUMN, bulk.ERROR_COLUMN]
+    assert (scored[bulk.ERROR_COLUMN] != "").sum() == 15
+    assert not list(tmp_path.iterdir())
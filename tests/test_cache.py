@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from backend.cache import ProfileCache, ResultCache
+
+
+def test_cancelled_leader_does_not_fail_coalesced_callers():
+    async def scenario():
+        cache = ResultCache()
+        calls = []
+
+        async def upstream():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"score": 7}
+
+        leader = asyncio.ensure_future(cache.get_or_compute("k", upstream))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(cache.get_or_compute("k", upstream))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        assert await follower == {"score": 7}
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert len(calls) == 1
+        assert cache.get("k") == {"score": 7}
+
+    asyncio.run(scenario())
+
+
+def test_upstream_call_is_cancelled_once_every_caller_is_gone():
+    async def scenario():
+        cache = ResultCache()
+        cancelled = asyncio.Event()
+
+        async def upstream():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        callers = [asyncio.ensure_future(cache.get_or_compute("k", upstream)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        callers[0].cancel()
+        callers[1].cancel()
+        await asyncio.sleep(0.01)
+        assert not cancelled.is_set()
+        callers[2].cancel()
+        await asyncio.wait_for(cancelled.wait(), 1)
+
+        async def fresh():
+            return {"score": 5}
+
+        # A later caller starts a new call rather than joining the cancelled one
+        assert await cache.get_or_compute("k", fresh) == {"score": 5}
+
+    asyncio.run(scenario())
+
+
+def test_profile_cache_survives_requests_pinned_to_an_old_version():
+    cache = ProfileCache(maxsize=8)
+    cache.clear("new")
+    cache.set("predict", (1,), "new", 0.7)
+
+    # A request that started before the swap still holds the old model
+    assert cache.get("predict", (1,), "old") is None
+    cache.set("predict", (2,), "old", 0.1)
+
+    assert cache.get("predict", (1,), "new") == 0.7
+    assert cache.get("predict", (2,), "new") is None
+    assert cache.stats()["invalidations"] == 0
+
+    cache.clear("newer")
+    assert cache.get("predict", (1,), "new") is None
+    assert cache.stats()["invalidations"] == 1
@@ -0,0 +1,50 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import encoding, main
+
+PROFILE = {"gre_score": 320, "toefl_score": 110, "university_rating": 3, "sop": 3.5, "lor": 3.5, "cgpa": 8.5, "research": 1}
+COHORT = {"profiles": [{**PROFILE, "gre_score": 290 + i % 50} for i in range(300)]}
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+def test_accept_headers_are_ordered_by_quality():
+    assert encoding.parse_accept("application/json;q=0.5, application/msgpack, text/html;q=0") == [
+        encoding.MSGPACK, encoding.JSON]
+    assert encoding.choose_format("text/csv, */*;q=0.1") == encoding.JSON
+    assert encoding.choose_format(encoding.ARROW, tabular=False) is None
+    assert encoding.choose_coding("gzip;q=0.5, zstd") == ("zstd" if encoding.HAS_ZSTD else "gzip")
+    assert encoding.choose_coding("identity") is None
+
+
+def test_every_format_carries_the_same_probabilities(client):
+    expected = client.post("/predict/batch", json=COHORT).json()["probabilities"]
+
+    msgpack = pytest.importorskip("msgpack")
+    response = client.post("/predict/batch", json=COHORT, headers={"Accept": encoding.MSGPACK})
+    assert response.headers["content-type"] == encoding.MSGPACK
+    assert msgpack.unpackb(response.content)["probabilities"] == pytest.approx(expected)
+
+    pa = pytest.importorskip("pyarrow")
+    response = client.post("/predict/batch", json=COHORT, headers={"Accept": encoding.ARROW})
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.column("probability").to_pylist() == pytest.approx(expected)
+
+
+def test_large_bodies_are_compressed_and_small_ones_are_not(client):
+    large = client.post("/predict/batch", json=COHORT, headers={"Accept-Encoding": "gzip"})
+    assert large.headers["content-encoding"] == "gzip"
+    assert large.json()["count"] == len(COHORT["profiles"])
+
+    small = client.post("/predict", json=PROFILE, headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    assert small.headers["vary"] == "Accept, Accept-Encoding"
+
+
+def test_unservable_accept_header_gets_406(client):
+    assert client.post("/predict/batch", json=COHORT, headers={"Accept": "text/csv"}).status_code == 406
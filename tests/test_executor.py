@@ -0,0 +1,50 @@
+import asyncio
+import threading
+
+import pytest
+
+from backend.executor import BoundedExecutor, Overloaded
+
+
+def test_run_waiting_waits_for_a_slot_instead_of_failing():
+    async def scenario():
+        pool = BoundedExecutor("test", workers=1, max_queue=0)
+        release = threading.Event()
+        busy = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0.05)
+
+        with pytest.raises(Overloaded):
+            await pool.run(lambda: "new request")
+        waiting = asyncio.ensure_future(pool.run_waiting(lambda: "next chunk"))
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        assert pool.stats()["waiting"] == 1
+
+        release.set()
+        assert await waiting == "next chunk"
+        await busy
+        stats = pool.stats()
+        assert (stats["running"], stats["queued"], stats["waiting"]) == (0, 0, 0)
+        assert stats["rejected"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_passes_its_slot_on():
+    async def scenario():
+        pool = BoundedExecutor("test", workers=1, max_queue=0)
+        release = threading.Event()
+        busy = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0.05)
+
+        first = asyncio.ensure_future(pool.run_waiting(lambda: "first"))
+        second = asyncio.ensure_future(pool.run_waiting(lambda: "second"))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        release.set()
+        assert await second == "second"
+        await busy
+        # The pool is empty again: a fresh request isn't turned away
+        assert await pool.run(lambda: "after") == "after"
+
+    asyncio.run(scenario())
@@ -0,0 +1,56 @@
+import time
+
+import numpy as np
+import pytest
+
+from backend import explain, inference
+
+
+class Curved:
+    """A small non-linear model with feature interactions."""
+
+    def predict(self, X):
+        return np.tanh(X[:, 0] * X[:, 1]) + X[:, 2] ** 2 - 0.5 * X[:, 3] * X[:, 4] + np.maximum(X[:, 5], X[:, 6])
+
+
+def test_matches_shap_exact_explainer():
+    shap = pytest.importorskip("shap")
+    rng = np.random.default_rng(0)
+    background = rng.normal(size=(3, 7))
+    rows = rng.normal(size=(4, 7))
+    # Three rows and room for four centres: the summary is the background itself
+    explainer = explain.AdmissionExplainer(Curved(), background)
+    values, base_values = explainer.explain(rows)
+
+    expected = shap.Explainer(Curved().predict, shap.maskers.Independent(background))(rows, silent=True)
+    np.testing.assert_allclose(values, expected.values, atol=1e-10)
+    np.testing.assert_allclose(base_values, expected.base_values, atol=1e-10)
+
+
+def test_attributions_add_up_to_the_prediction():
+    model = inference.load_model()
+    rows = np.asarray(model.background[:20])
+    values, base_values = explain.get_explainer(model).explain(rows)
+    np.testing.assert_allclose(base_values + values.sum(axis=1), model.predictor.predict_scaled(rows), atol=1e-9)
+
+
+def test_explaining_the_shipped_model_is_fast_and_quiet(capfd):
+    model = inference.load_model()
+    explainer = explain.get_explainer(model)
+    row = np.asarray(model.background[:1])
+    explainer.explain(row)
+    capfd.readouterr()
+
+    timings = []
+    for _ in range(5):
+        started = time.perf_counter()
+        explainer.explain(row)
+        timings.append(time.perf_counter() - started)
+    started = time.perf_counter()
+    explainer.explain(np.asarray(model.background[:20]))
+    batch = time.perf_counter() - started
+
+    # ~30 ms and ~0.3 s here; the old 50-row shap.Explainer took ~400 ms and 5.4 s
+    assert np.median(timings) < 0.15
+    assert batch < 1.5
+    assert capfd.readouterr().err == ""
@@ -0,0 +1,29 @@
+from fastapi.testclient import TestClient
+
+from backend import inference, main, profiling
+
+PROFILE = {"gre_score": 320, "toefl_score": 110, "university_rating": 3, "sop": 3.5, "lor": 3.5, "cgpa": 8.5, "research": 1}
+
+
+def test_requests_are_timed_and_carry_the_model_version():
+    with TestClient(main.app) as client:
+        for path in ("/predict", "/health"):
+            response = client.post(path, json=PROFILE) if path == "/predict" else client.get(path)
+            assert response.status_code == 200
+            assert response.headers[main.MODEL_VERSION_HEADER] == inference.current().version
+
+        scrape = client.get("/metrics").text
+    assert 'admission_http_request_seconds_count{method="POST",route="/predict",status="200"}' in scrape
+    assert "admission_http_requests_in_flight 1" in scrape
+
+
+def test_profiled_request_names_its_profile(monkeypatch, tmp_path):
+    finish = profiling.finish
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "finish", lambda *args: finish(*args, directory=tmp_path))
+    with TestClient(main.app) as client:
+        response = client.post("/predict", json=PROFILE, headers={main.PROFILE_HEADER: "1", "X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    name = response.headers[main.PROFILE_ID_HEADER]
+    assert "-post-predict-200-" in name
+    assert (tmp_path / name).exists()
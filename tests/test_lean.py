@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from backend import inference
+from backend.artifacts import load_lean
+from backend.lean import FlatTrees
+
+
+@pytest.fixture(scope="module")
+def reference():
+    model, scaler = inference.load_sklearn_artifacts(inference.MODEL_PATH, inference.SCALER_PATH)
+    # X_train.pkl holds scaled rows; the predictors take raw ones
+    X = scaler.inverse_transform(inference.load_background(inference.BACKGROUND_PATH))
+    return X, model.predict(scaler.transform(X))
+
+
+@pytest.mark.parametrize("rows", [1, inference.LEAN_MAX_ROWS, inference.LEAN_MAX_ROWS + 1, None])
+def test_lean_artifact_matches_sklearn(reference, rows):
+    X, expected = reference
+    lean, _, meta = load_lean(inference.LEAN_ARTIFACT_PATH)
+    assert meta["source_version"] == inference.BUNDLED_VERSION
+    np.testing.assert_allclose(lean.predict(X[:rows]), expected[:rows], rtol=0, atol=1e-6)
+
+
+def test_served_model_matches_sklearn(reference):
+    X, expected = reference
+    assert len(X) > inference.LEAN_MAX_ROWS
+    # As served: the lean artifact, handing batches above LEAN_MAX_ROWS to sklearn
+    model = inference.load_model()
+    assert isinstance(model.predictor.estimator, inference.LazyEstimator)
+    for rows in (1, inference.LEAN_MAX_ROWS, len(X)):
+        np.testing.assert_allclose(model.predictor.predict(X[:rows]), expected[:rows], rtol=0, atol=1e-6)
+
+
+def test_flattened_tree_tables_are_memory_mapped():
+    lean, _, _ = load_lean(inference.LEAN_ARTIFACT_PATH)
+    trees = [node.trees for node in lean.root.estimators if isinstance(getattr(node, "trees", None), FlatTrees)]
+    assert trees
+    for table in trees:
+        for array in (table.children, table.feature, table.threshold, table.value):
+            # A view over the file mapping, shared between workers, not a per-process copy
+            assert isinstance(array.base, np.memmap)
@@ -0,0 +1,40 @@
+from backend.utils import ModelStats
+
+MODELS = ["llama-3.3-70b-versatile", "llama-3.1-8b-instant", "mixtral-8x7b-32768"]
+
+
+def test_unmeasured_models_keep_their_configured_position():
+    stats = ModelStats(MODELS, explore=0)
+    stats.record("llama-3.1-8b-instant", 0.4, ok=True)
+    # 70b was never measured, so one 8b success doesn't push it down
+    assert stats.ordered(MODELS) == MODELS
+
+    stats.record("mixtral-8x7b-32768", 0.2, ok=True)
+    assert stats.ordered(MODELS) == ["llama-3.3-70b-versatile", "mixtral-8x7b-32768", "llama-3.1-8b-instant"]
+
+
+def test_failing_models_go_last():
+    stats = ModelStats(MODELS, explore=0)
+    stats.record("llama-3.3-70b-versatile", 1.0, ok=False)
+    assert stats.ordered(MODELS) == MODELS[1:] + MODELS[:1]
+
+
+def test_hedge_losers_are_ranked_on_how_long_they_ran():
+    stats = ModelStats(MODELS, explore=0)
+    stats.record("llama-3.1-8b-instant", 0.5, ok=True)
+    stats.record_cancelled("llama-3.3-70b-versatile", 3.5)
+    assert stats.ordered(MODELS)[0] == "llama-3.1-8b-instant"
+    assert stats.snapshot()["llama-3.3-70b-versatile"]["cancelled"] == 1
+
+    # A loser that has been fast before only has its estimate raised
+    stats.record("mixtral-8x7b-32768", 0.1, ok=True)
+    stats.record_cancelled("mixtral-8x7b-32768", 0.6)
+    assert 0.1 < stats.stats["mixtral-8x7b-32768"]["ewma_latency"] < 0.6
+    assert stats.ordered(MODELS)[0] == "mixtral-8x7b-32768"
+
+
+def test_exploration_uses_the_configured_order():
+    stats = ModelStats(MODELS, explore=1)
+    stats.record("llama-3.1-8b-instant", 0.4, ok=True)
+    stats.record_cancelled("llama-3.3-70b-versatile", 3.5)
+    assert stats.ordered(MODELS) == MODELS
@@ -0,0 +1,55 @@
+import shutil
+
+import pandas as pd
+
+from backend import online
+from backend.inference import BASE_DIR
+
+HISTORY = BASE_DIR.parent / "data" / "admission_data.csv"
+NEW_ROWS = (
+    "GRE Score,TOEFL Score,University Rating,SOP,LOR ,CGPA,Research,Chance of Admit \n"
+    "318,109,3,3.5,4,8.7,1,0.78\n"
+    "301,102,2,3,3,8.1,0,0.61\n"
+)
+
+
+def test_cli_ingest_keeps_history_parseable(tmp_path):
+    data = tmp_path / "admission_data.csv"
+    shutil.copy(HISTORY, data)
+    assert not data.read_bytes().endswith(b"\n")
+    before = pd.read_csv(data)
+    outcomes = tmp_path / "outcomes.csv"
+    outcomes.write_text(NEW_ROWS)
+
+    online.main(["--state", str(tmp_path / "state.npz"), "--data", str(data), "ingest", str(outcomes), "--no-publish"])
+
+    after = pd.read_csv(data)
+    assert len(after) == len(before) + 2
+    pd.testing.assert_frame_equal(after.iloc[:len(before)], before)
+    assert after.iloc[-2].tolist() == [318, 109, 3, 3.5, 4, 8.7, 1, 0.78]
+    assert after.iloc[-1].tolist() == [301, 102, 2, 3, 3, 8.1, 0, 0.61]
+    # The appended history must still rebuild the statistics
+    assert online.init_state(data, tmp_path / "rebuilt.npz").stats.n == len(after)
+
+
+def test_append_rows_to_file_ending_in_newline(tmp_path):
+    data = tmp_path / "history.csv"
+    data.write_text(HISTORY.read_text().rstrip("\n") + "\n")
+    rows = len(pd.read_csv(data))
+
+    online.append_rows([[318, 109, 3, 3.5, 4, 8.7, 1]], [0.78], data)
+
+    assert len(pd.read_csv(data)) == rows + 1
+    assert b"\n\n" not in data.read_bytes()
+
+
+def test_ingest_seeds_its_own_history_and_leaves_the_bundled_csv_alone(tmp_path):
+    bundled = online.SEED_DATA_PATH.read_bytes()
+    history = tmp_path / "models" / "admission_history.csv"
+
+    result = online.ingest([[318, 109, 3, 3.5, 4, 8.7, 1]], [0.78], state_path=tmp_path / "state.npz",
+                           data_path=history, publish=False)
+
+    assert online.SEED_DATA_PATH.read_bytes() == bundled
+    assert len(pd.read_csv(history)) == len(pd.read_csv(online.SEED_DATA_PATH)) + 1
+    assert result["rows"] == len(pd.read_csv(history))
@@ -0,0 +1,60 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import main
+
+PROFILES = [
+    {"gre_score": 320, "toefl_score": 110, "university_rating": 3, "sop": 3.5, "lor": 3.5, "cgpa": 8.5, "research": 1},
+    {"gre_score": 300, "toefl_score": 100, "university_rating": 2, "sop": 2.5, "lor": 3.0, "cgpa": 7.6, "research": 0},
+    {"gre_score": 335, "toefl_score": 118, "university_rating": 5, "sop": 4.5, "lor": 5.0, "cgpa": 9.6, "research": 1},
+]
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+def test_batch_matches_single_predictions_in_both_payload_forms(client):
+    single = [client.post("/predict", json=profile).json()["probability"] for profile in PROFILES]
+
+    by_row = client.post("/predict/batch", json={"profiles": PROFILES}).json()
+    columns = {field: [profile[field] for profile in PROFILES] for field in PROFILES[0]}
+    by_column = client.post("/predict/batch", json={"columns": columns}).json()
+
+    assert by_row["count"] == by_column["count"] == len(PROFILES)
+    assert by_row["probabilities"] == pytest.approx(single)
+    assert by_column["probabilities"] == pytest.approx(single)
+
+
+def test_batch_rejects_malformed_payloads(client):
+    columns = {field: [profile[field] for profile in PROFILES] for field in PROFILES[0]}
+    columns["cgpa"] = columns["cgpa"][:2]
+    assert client.post("/predict/batch", json={"columns": columns}).status_code == 422
+    assert client.post("/predict/batch", json={}).status_code == 422
+    assert client.post("/predict/batch", json={"profiles": []}).json() == {"count": 0, "probabilities": []}
+
+
+def test_whatif_grid_matches_predicting_each_cell(client):
+    base = PROFILES[0]
+    sweeps = [{"feature": "gre_score", "start": 300, "stop": 320, "step": 10}, {"feature": "cgpa", "values": [8.0, 9.0]}]
+    result = client.post("/whatif", json={"profile": base, "sweeps": sweeps}).json()
+
+    assert result["axes"] == [[300, 310, 320], [8.0, 9.0]]
+    cells = [{**base, "gre_score": gre, "cgpa": cgpa} for gre in result["axes"][0] for cgpa in result["axes"][1]]
+    expected = client.post("/predict/batch", json={"profiles": cells}).json()["probabilities"]
+    assert [p for row in result["probabilities"] for p in row] == pytest.approx(expected)
+    assert result["base_probability"] == pytest.approx(client.post("/predict", json=base).json()["probability"])
+
+
+def test_whatif_rejects_bad_sweeps(client, monkeypatch):
+    base = PROFILES[0]
+    unknown = {"profile": base, "sweeps": [{"feature": "height", "values": [1]}]}
+    assert client.post("/whatif", json=unknown).status_code == 422
+    repeated = {"profile": base, "sweeps": [{"feature": "cgpa", "values": [8]}, {"feature": "cgpa", "values": [9]}]}
+    assert client.post("/whatif", json=repeated).status_code == 422
+
+    monkeypatch.setattr(main, "WHATIF_MAX_CELLS", 10)
+    grid = [{"feature": "gre_score", "values": [300, 310, 320, 330]}, {"feature": "cgpa", "values": [7, 8, 9]}]
+    assert client.post("/whatif", json={"profile": base, "sweeps": grid}).status_code == 400
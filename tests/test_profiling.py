@@ -0,0 +1,53 @@
+import contextvars
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import main, profiling
+
+
+def spin(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_profile_records_stacks_of_threads_bound_to_the_request(tmp_path):
+    def request():
+        profile = profiling.start()
+        worker = threading.Thread(target=profiling.bind(spin), args=(0.1,), name="pool-worker")
+        worker.start()
+        worker.join()
+        unbound = threading.Thread(target=spin, args=(0.05,), name="unrelated")
+        unbound.start()
+        unbound.join()
+        return profiling.finish(profile, "POST", "/explain", 200, 0.15, directory=tmp_path)
+
+    # Its own context, as a request has, so the profile doesn't outlive the test
+    name = contextvars.copy_context().run(request)
+
+    stacks = (tmp_path / name).read_text().splitlines()
+    assert any(line.startswith("thread:pool-worker;") and "spin (" in line for line in stacks)
+    assert not any("thread:unrelated" in line for line in stacks)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in stacks)
+
+    (listed,) = profiling.list_profiles(tmp_path)
+    assert (listed["name"], listed["route"], listed["status"], listed["duration_ms"]) == (name, "/explain", 200, 150)
+    assert profiling.profile_path(name, tmp_path) == tmp_path / name
+    with pytest.raises(FileNotFoundError):
+        profiling.profile_path("../" + name, tmp_path)
+
+
+def test_profiles_are_admin_only(monkeypatch):
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    profile = {"gre_score": 320, "toefl_score": 110, "university_rating": 3, "sop": 3.5, "lor": 3.5, "cgpa": 8.5, "research": 1}
+    with TestClient(main.app) as client:
+        wrong = client.post("/predict", json=profile, headers={main.PROFILE_HEADER: "1", "X-Admin-Token": "guess"})
+        assert main.PROFILE_ID_HEADER not in wrong.headers
+        assert client.get("/admin/profiles").status_code == 403
+        assert client.get("/admin/profiles", headers={"X-Admin-Token": "guess"}).status_code == 403
+        assert client.get("/admin/profiles", headers={"X-Admin-Token": "secret"}).status_code == 200
+        missing = client.get("/admin/profiles/not-a-profile.folded", headers={"X-Admin-Token": "secret"})
+        assert missing.status_code == 404
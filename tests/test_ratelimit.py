@@ -0,0 +1,30 @@
+import asyncio
+
+import pytest
+
+from backend.ratelimit import RateLimiter, Rejected
+
+
+def test_cost_is_charged_per_unit():
+    async def scenario():
+        limiter = RateLimiter("test", per_minute=60, burst=10, max_wait=0)
+        await limiter.acquire("client", cost=8)
+        await limiter.acquire("client", cost=2)
+        with pytest.raises(Rejected) as exc:
+            await limiter.acquire("client")
+        assert exc.value.status_code == 429
+
+    asyncio.run(scenario())
+
+
+def test_cost_above_burst_is_admitted_once_then_repaid():
+    async def scenario():
+        limiter = RateLimiter("test", per_minute=60, burst=10, max_wait=0)
+        # Larger than the bucket: let through on a full bucket, which is left in debt
+        await limiter.acquire("client", cost=50)
+        with pytest.raises(Rejected) as exc:
+            await limiter.acquire("client")
+        assert exc.value.retry_after >= 40
+        await limiter.acquire("other client", cost=5)
+
+    asyncio.run(scenario())
@@ -0,0 +1,67 @@
+import asyncio
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.linear_model import LinearRegression
+from sklearn.preprocessing import StandardScaler
+
+from backend import inference, main, registry
+from backend.inference import BASE_DIR
+
+PROFILE = {"gre_score": 320, "toefl_score": 110, "university_rating": 3, "sop": 3.5, "lor": 3.5, "cgpa": 8.5, "research": 1}
+
+
+@pytest.fixture
+def linear_pickles(tmp_path):
+    data = pd.read_csv(BASE_DIR.parent / "data" / "admission_data.csv")
+    X, y = data.iloc[:, :7].to_numpy(dtype=np.float64), data.iloc[:, 7].to_numpy(dtype=np.float64)
+    scaler = StandardScaler().fit(X)
+    model = LinearRegression().fit(scaler.transform(X), y)
+    paths = tmp_path / "model.pkl", tmp_path / "scaler.pkl"
+    joblib.dump(model, paths[0])
+    joblib.dump(scaler, paths[1])
+    return paths, model.predict(scaler.transform([list(PROFILE.values())]))[0] * 100
+
+
+@pytest.fixture
+def restore_model():
+    original = inference.current()
+    yield
+    inference.activate(original)
+
+
+def test_activated_version_is_swapped_in_warm_and_reported(tmp_path, linear_pickles, restore_model):
+    (model_path, scaler_path), expected = linear_pickles
+    registry_dir = tmp_path / "registry"
+    warmed = []
+    watcher = registry.RegistryWatcher(registry_dir, poll_seconds=0, warm_up=warmed.append)
+
+    manifest = registry.publish(model_path, scaler_path, registry_dir=registry_dir, activate=False)
+    assert not asyncio.run(watcher.check())
+    registry.set_active(manifest["version"], registry_dir)
+    assert asyncio.run(watcher.check())
+
+    assert [model.version for model in warmed] == [manifest["version"]]
+    assert inference.current().version == manifest["version"]
+    with TestClient(main.app) as client:
+        response = client.post("/predict", json=PROFILE)
+    assert response.headers[main.MODEL_VERSION_HEADER] == manifest["version"]
+    assert response.json()["probability"] == pytest.approx(max(0, round(expected, 2)))
+
+
+def test_version_not_matching_its_manifest_is_never_served(tmp_path, linear_pickles, restore_model):
+    (model_path, scaler_path), _ = linear_pickles
+    registry_dir = tmp_path / "registry"
+    manifest = registry.publish(model_path, scaler_path, registry_dir=registry_dir)
+    with open(registry_dir / manifest["version"] / registry.MODEL_FILE, "ab") as f:
+        f.write(b"corrupt")
+
+    served = inference.current().version
+    watcher = registry.RegistryWatcher(registry_dir, poll_seconds=0)
+    assert not asyncio.run(watcher.check())
+    assert inference.current().version == served
+    assert manifest["version"] in watcher.failed
+    assert registry.load_active(registry_dir).version == inference.BUNDLED_VERSION
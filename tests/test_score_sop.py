@@ -0,0 +1,26 @@
+import asyncio
+
+from backend import utils
+
+
+def fake_scores(monkeypatch):
+    async def fake_groq(text, api_key, client=None):
+        await asyncio.sleep(0)
+        return {"scores": {"Clarity": 4}, "average": 4.0}
+
+    monkeypatch.setattr(utils, "score_sop_async", fake_groq)
+
+
+def test_score_sop_from_plain_code(monkeypatch):
+    fake_scores(monkeypatch)
+    assert utils.score_sop("My statement.", "key")["average"] == 4.0
+
+
+def test_score_sop_inside_a_running_loop(monkeypatch):
+    fake_scores(monkeypatch)
+
+    # What a notebook cell does: a blocking call while the kernel's loop runs
+    async def cell():
+        return utils.score_sop("My statement.", "key")
+
+    assert asyncio.run(cell())["average"] == 4.0
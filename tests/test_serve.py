@@ -0,0 +1,28 @@
+import uvicorn
+
+from backend import serve
+
+
+def run_serve(monkeypatch, argv):
+    calls = []
+    monkeypatch.setattr(serve, "prepare_shared_artifacts", lambda: True)
+    monkeypatch.setattr(uvicorn, "run", lambda app, **kwargs: calls.append((app, kwargs)))
+    monkeypatch.delenv("BACKEND_WARMUP", raising=False)
+    serve.main(argv)
+    return calls[0][1]
+
+
+def test_workers_only_warm_up_predictions_by_default(monkeypatch):
+    options = run_serve(monkeypatch, ["--workers", "3"])
+    assert options["workers"] == 3
+    assert serve.os.environ["BACKEND_WARMUP"] == "predict"
+
+
+def test_explain_warm_up_is_opt_in(monkeypatch):
+    run_serve(monkeypatch, ["--warmup", "predict,explain"])
+    assert serve.os.environ["BACKEND_WARMUP"] == "predict,explain"
+
+
+def test_reload_runs_a_single_worker(monkeypatch):
+    options = run_serve(monkeypatch, ["--reload", "--workers", "4"])
+    assert options["workers"] == 1 and options["reload"]
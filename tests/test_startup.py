@@ -0,0 +1,40 @@
+import json
+import subprocess
+import sys
+
+import numpy as np
+
+from backend import inference
+from backend.artifacts import export_lean, load_lean
+from backend.inference import BASE_DIR
+
+HEAVY_MODULES = ["shap", "sklearn", "pandas", "xgboost", "catboost", "joblib", "openpyxl"]
+
+
+def test_serving_a_prediction_imports_no_heavy_dependencies():
+    script = (
+        "import json, sys\n"
+        "from fastapi.testclient import TestClient\n"
+        "from backend import main\n"
+        "profile = dict(gre_score=320, toefl_score=110, university_rating=3, sop=3.5, lor=3.5, cgpa=8.5, research=1)\n"
+        "with TestClient(main.app) as client:\n"
+        "    assert client.post('/predict', json=profile).status_code == 200\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", script], cwd=BASE_DIR.parent, capture_output=True, text=True, check=True)
+    assert json.loads(out.stdout.splitlines()[-1]) == []
+
+
+def test_stale_lean_artifact_falls_back_to_the_pickles(tmp_path):
+    lean, background, _ = load_lean(inference.LEAN_ARTIFACT_PATH)
+    stale = tmp_path / "lean_model.npz"
+    export_lean(lean, stale, background=background, source_version="built-from-older-pickles")
+
+    model = inference.load_model(lean_path=stale)
+    assert model.source == str(inference.MODEL_PATH)
+    assert model.version == inference.BUNDLED_VERSION
+
+    served = inference.load_model()
+    assert served.source == str(inference.LEAN_ARTIFACT_PATH)
+    X = background[:5] * served.predictor.scale + served.predictor.mean
+    np.testing.assert_allclose(model.predictor.predict(X), served.predictor.predict(X), rtol=0, atol=1e-6)
@@ -0,0 +1,34 @@
+import json
+
+import pytest
+
+from backend import inference, train
+
+
+def candidate(family, rmse, p50):
+    return {"family": family, "cv": {"rmse": rmse}, "latency_ms": {"p50": p50}}
+
+
+def test_pareto_front_drops_models_beaten_on_accuracy_and_latency():
+    candidates = [
+        candidate("linear", 0.060, 0.02),
+        candidate("random_forest", 0.062, 0.50),
+        candidate("xgboost", 0.058, 0.30),
+        candidate("catboost", 0.058, 0.40),
+    ]
+    assert train.pareto_front(candidates) == ["linear", "xgboost"]
+
+
+def test_train_writes_servable_artifacts_and_a_report(tmp_path):
+    report = train.train(["linear"], tmp_path, workers=2)
+
+    assert report["selected"]["family"] == "linear"
+    assert len(report["search"]) == len(train.SEARCH_SPACE["linear"])
+    assert {"test", "latency_ms", "sklearn_latency_ms", "lean_bytes"} <= report["candidates"][0].keys()
+    assert json.loads((tmp_path / "report.json").read_text())["selected"] == report["selected"]
+
+    model = inference.load_model(tmp_path / "admission_model.pkl", tmp_path / "scaler.pkl",
+                                 tmp_path / "X_train.pkl", lean_path=None)
+    X, y = train.load_data()
+    rmse = float(((model.predictor.predict(X) - y) ** 2).mean() ** 0.5)
+    assert rmse == pytest.approx(report["candidates"][0]["test"]["rmse"], abs=0.02)
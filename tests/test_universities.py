@@ -0,0 +1,76 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.universities import UniversityIndex
+
+
+def record(name, rank):
+    return {"name": name, "rank_str": str(rank), "rank": rank, "rating": 5, "country": "UK"}
+
+
+@pytest.fixture(scope="module")
+def index():
+    return UniversityIndex([
+        record("Oxford Brookes University", 700),
+        record("University of Oxford", 1),
+        record("University of Salford", 900),
+        record("Toronto Metropolitan University", 900),
+        record("University of Toronto", 18),
+        record("Imperial College London", 10),
+        record("London South Bank University", 700),
+    ])
+
+
+def names(index, query):
+    return [rec["name"] for rec, _ in index.search(query)]
+
+
+def test_distinctive_word_match_outranks_a_name_starting_with_it(index):
+    assert names(index, "oxford")[:2] == ["University of Oxford", "Oxford Brookes University"]
+    assert names(index, "Toronto")[:2] == ["University of Toronto", "Toronto Metropolitan University"]
+    assert names(index, "oxford brookes")[0] == "Oxford Brookes University"
+
+
+def test_whole_word_match_outranks_a_bare_prefix(index):
+    # Both contain "london" as a word, so the better-ranked one comes first
+    assert names(index, "london")[:2] == ["Imperial College London", "London South Bank University"]
+    # A partial word is still a prefix match
+    assert names(index, "oxf")[:2] == ["Oxford Brookes University", "University of Oxford"]
+
+
+def test_exact_name_scores_highest(index):
+    (top, score), *_ = index.search("university of oxford")
+    assert (top["name"], score) == ("University of Oxford", 1.0)
+
+
+def test_lookup_ignores_case_and_spacing(index):
+    assert index.lookup("  university of   OXFORD ")["rank"] == 1
+    assert index.lookup("University of Atlantis") is None
+
+
+def test_load_reuses_the_binary_cache_until_the_sheet_changes(tmp_path, monkeypatch):
+    built = []
+
+    def from_excel(cls, path):
+        built.append(path)
+        return cls([record("University of Oxford", 1)])
+
+    monkeypatch.setattr(UniversityIndex, "from_excel", classmethod(from_excel))
+    sheet = tmp_path / "rankings.xlsx"
+    sheet.write_bytes(b"first")
+
+    assert UniversityIndex.load(sheet).lookup("university of oxford")["rank"] == 1
+    assert UniversityIndex.load(sheet).lookup("university of oxford")["rank"] == 1
+    assert len(built) == 1
+    assert (tmp_path / "rankings.idx.pkl").exists()
+
+    sheet.write_bytes(b"replaced")
+    UniversityIndex.load(sheet)
+    assert len(built) == 2
+
+
+def test_university_endpoint_uses_the_preloaded_index():
+    with TestClient(main.app) as client:
+        body = client.get("/university", params={"name": "university of oxford"}).json()
+    assert body["found"] and body["rating"] == 5